@@ -1,37 +1,97 @@
 """Improved agent definitions with better configuration and error handling."""
 from crewai import Agent, LLM
-from crewai_tools import SerperDevTool
 from stock_research_crew.perf import TimingLLM, CachingLLM
 from stock_research_crew.cache import cache_manager
+from stock_research_crew.ollama_client import ollama_client
+from stock_research_crew.limiter import llm_limiter, rate_limiter_for
+from stock_research_crew.resilience import circuit_breaker_for
+from stock_research_crew.marketdata import market_store
+from stock_research_crew.tools import market_data_tool, search_tool, local_search_tool
+from stock_research_crew.docsearch import document_index
 from config import Config
+from typing import Dict
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Initialize search tool with error handling
+# Cached web search (Serper), shared across tickers and runs; without an
+# API key, research uses the offline index of local documents instead
+research_tools = [search_tool] if search_tool else []
+if not search_tool:
+    try:
+        if document_index.has_documents():
+            research_tools = [local_search_tool]
+            logger.info(f"SERPER_API_KEY not configured - searching local documents in {Config.DOCS_DIR}")
+        else:
+            logger.warning("SERPER_API_KEY not configured and no local documents - research search disabled")
+    except Exception as e:
+        logger.error(f"Failed to open local document index: {e}")
+
+_llms: Dict[str, CachingLLM] = {}
+_timed_llms: Dict[str, TimingLLM] = {}
+_stream_callback = None
+
+
+def llm_for(model: str) -> CachingLLM:
+    """Timing/caching LLM wrapper for model, shared by every agent that uses it.
+    
+    Prompt cache entries, rate limits and circuit breakers are all per
+    model; the adaptive concurrency limit is shared because every model
+    runs on the same Ollama host.
+    """
+    if model not in _llms:
+        base_llm = LLM(
+            model=model,
+            base_url=Config.LLM_BASE_URL,
+            temperature=Config.LLM_TEMPERATURE,
+            timeout=Config.LLM_TIMEOUT
+        )
+        
+        # Circuit state changes are written to the profile log
+        breaker = circuit_breaker_for(model)
+        breaker.set_log_callback(cache_manager.log_profile)
+        
+        # Wrap with timing and caching; async and streamed calls talk to Ollama
+        # directly over pooled connections
+        client = ollama_client.for_model(model) if model.startswith("ollama") else None
+        timed = TimingLLM(
+            base_llm,
+            model_name=model,
+            client=client,
+            limiter=llm_limiter,
+            rate_limiter=rate_limiter_for(model),
+            breaker=breaker
+        )
+        timed.set_log_callback(cache_manager.log_profile)
+        timed.set_stream_callback(_stream_callback)
+        
+        _timed_llms[model] = timed
+        _llms[model] = CachingLLM(timed, model_name=model, cache_manager=cache_manager)
+        logger.info(f"Initialized LLM {model}")
+    return _llms[model]
+
+
+def set_stream_callback(callback):
+    """Send streamed output of every agent's LLM to callback(caller, text)."""
+    global _stream_callback
+    _stream_callback = callback
+    for timed in _timed_llms.values():
+        timed.set_stream_callback(callback)
+
+
+# Price history tool, only offered when local market data has been dropped in
 try:
-    search_tool = SerperDevTool() if Config.SERPER_API_KEY else None
-    if not search_tool:
-        logger.warning("SerperDevTool not configured - web search disabled")
+    market_tools = [market_data_tool] if market_store.symbols() else []
+    if not market_tools:
+        logger.info(f"No market data in {Config.MARKET_DATA_DIR} - price history tool disabled")
 except Exception as e:
-    logger.error(f"Failed to initialize search tool: {e}")
-    search_tool = None
+    logger.error(f"Failed to open market data store: {e}")
+    market_tools = []
 
 # Configure base LLM
 try:
-    _base_llm = LLM(
-        model=Config.LLM_MODEL,
-        base_url=Config.LLM_BASE_URL,
-        temperature=Config.LLM_TEMPERATURE,
-        timeout=Config.LLM_TIMEOUT
-    )
-    
-    # Wrap with timing and caching
-    timed_llm = TimingLLM(_base_llm, model_name=Config.LLM_MODEL)
-    timed_llm.set_log_callback(cache_manager.log_profile)
-    
-    llm = CachingLLM(timed_llm, model_name=Config.LLM_MODEL, cache_manager=cache_manager)
-    
+    llm = llm_for(Config.LLM_MODEL)
+    timed_llm = _timed_llms[Config.LLM_MODEL]
 except Exception as e:
     logger.error(f"Failed to initialize LLM: {e}")
     raise
@@ -41,8 +101,8 @@ market_researcher = Agent(
     role="Market Research Analyst",
     goal="Research company background, sector, competitors, and recent developments",
     backstory="Expert in equity research and macro trends with 10+ years experience",
-    tools=[search_tool] if search_tool else [],
-    llm=llm,
+    tools=research_tools,
+    llm=llm_for(Config.MARKET_RESEARCHER_MODEL),
     verbose=False
 )
 
@@ -51,7 +111,8 @@ fundamental_analyst = Agent(
     role="Fundamental Analyst",
     goal="Analyze business strength, valuation logic, and performance trends",
     backstory="Experienced analyst focused on fundamentals, financial statements, and business models",
-    llm=llm,
+    tools=market_tools,
+    llm=llm_for(Config.FUNDAMENTAL_ANALYST_MODEL),
     verbose=False
 )
 
@@ -59,7 +120,8 @@ risk_manager = Agent(
     role="Risk Assessment Analyst",
     goal="Identify key risks and downside scenarios",
     backstory="Risk-focused analyst with expertise in identifying threats to capital preservation",
-    llm=llm,
+    tools=market_tools,
+    llm=llm_for(Config.RISK_MANAGER_MODEL),
     verbose=False
 )
 
@@ -71,6 +133,6 @@ investment_advisor = Agent(
         "Senior portfolio manager with 15+ years experience balancing growth and risk. "
         "Expert at synthesizing research into actionable investment decisions with clear scoring."
     ),
-    llm=llm,
+    llm=llm_for(Config.INVESTMENT_ADVISOR_MODEL),
     verbose=False
 )
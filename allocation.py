@@ -0,0 +1,273 @@
+"""Deterministic portfolio weights from decision scores and optional return history."""
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+from stock_research_crew.decision import InvestmentDecision
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("score", "risk_parity", "mean_variance")
+TRADING_DAYS = 252
+MIN_HISTORY = 20  # Daily returns needed before a stock's history is used
+
+DatedReturns = Tuple[Sequence[Any], Sequence[float]]  # (dates, daily returns ending on them)
+
+
+@dataclass
+class Allocation:
+    """Weights and dollar amounts per stock; cash holds whatever the caps leave over."""
+
+    method: str
+    portfolio_size: float
+    weights: Dict[str, float]
+    amounts: Dict[str, float]
+    cash: float = 0.0
+    excluded: Dict[str, str] = field(default_factory=dict)
+    expected_return: Optional[float] = None
+    volatility: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def table(self) -> str:
+        """Allocation table for prompts and console output."""
+        lines = [f"Method: {self.method}, portfolio ${self.portfolio_size:,.0f}"]
+        for stock, weight in sorted(self.weights.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {stock:<8} {weight:7.2%}  ${self.amounts[stock]:>14,.2f}")
+        if self.cash > 0:
+            lines.append(f"  {'CASH':<8} {self.cash:7.2%}  ${self.cash * self.portfolio_size:>14,.2f}")
+        if self.expected_return is not None:
+            lines.append(f"  Expected annual return {self.expected_return:.2%}, volatility {self.volatility:.2%} "
+                         f"(from return history)")
+        for stock, reason in self.excluded.items():
+            lines.append(f"  Excluded {stock}: {reason}")
+        return "\n".join(lines)
+
+
+def cap_weights(weights: np.ndarray, max_weight: float) -> np.ndarray:
+    """Cap weights at max_weight, handing the excess to uncapped names pro rata.
+
+    Whatever cannot be placed (fewer than 1/max_weight names) stays unallocated.
+    """
+    w = weights / weights.sum()
+    capped = np.zeros(len(w), dtype=bool)
+    for _ in range(len(w)):
+        over = ~capped & (w > max_weight + 1e-12)
+        if not over.any():
+            break
+        capped |= over
+        w[capped] = max_weight
+        free = ~capped
+        remaining = 1.0 - capped.sum() * max_weight
+        if not free.any() or w[free].sum() <= 0:
+            break
+        w[free] *= max(remaining, 0.0) / w[free].sum()
+    return w
+
+
+def project_capped_simplex(v: np.ndarray, max_weight: float) -> np.ndarray:
+    """Euclidean projection onto {w : sum(w) = 1, 0 <= w <= max_weight} by bisection."""
+    if len(v) * max_weight <= 1.0:
+        return np.full(len(v), max_weight)
+    lo, hi = v.min() - max_weight, v.max()
+    for _ in range(100):
+        tau = (lo + hi) / 2
+        if np.clip(v - tau, 0.0, max_weight).sum() > 1.0:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(v - hi, 0.0, max_weight)
+
+
+def score_weights(scores: np.ndarray, min_score: float) -> np.ndarray:
+    """Weights proportional to each stock's score above the eligibility floor."""
+    return scores - min_score + 1.0
+
+
+def risk_parity_weights(cov: np.ndarray, sweeps: int = 200, tol: float = 1e-10) -> np.ndarray:
+    """Long-only equal-risk-contribution weights.
+
+    Cyclical coordinate descent on 1/2 w'Σw - sum(log w) / n: each step
+    solves one coordinate's quadratic exactly and keeps the weight
+    positive, so it converges even for ill-conditioned covariances.
+    """
+    n = len(cov)
+    diag = np.diag(cov)
+    w = 1.0 / np.sqrt(diag)
+    w /= np.sqrt(w @ cov @ w)
+    sigma_w = cov @ w
+    budget = 1.0 / n
+    for _ in range(sweeps):
+        previous = w.copy()
+        for i in range(n):
+            b = sigma_w[i] - diag[i] * w[i]
+            new = (-b + np.sqrt(b * b + 4 * diag[i] * budget)) / (2 * diag[i])
+            sigma_w += cov[:, i] * (new - w[i])
+            w[i] = new
+        if np.abs(w - previous).max() < tol * w.max():
+            break
+    return w / w.sum()
+
+
+def mean_variance_weights(mu: np.ndarray, cov: np.ndarray, risk_aversion: float,
+                          max_weight: float, iterations: int = 2000, tol: float = 1e-10) -> np.ndarray:
+    """Maximize mu'w - risk_aversion/2 * w'Σw, fully invested, 0 <= w <= max_weight.
+
+    Projected gradient ascent with step 1/L, L the largest eigenvalue of the
+    quadratic term; the problem is concave, so it converges to the optimum.
+    """
+    step = 1.0 / max(risk_aversion * np.linalg.eigvalsh(cov)[-1], 1e-12)
+    w = project_capped_simplex(np.full(len(mu), 1.0 / len(mu)), max_weight)
+    for _ in range(iterations):
+        new = project_capped_simplex(w + step * (mu - risk_aversion * (cov @ w)), max_weight)
+        if np.abs(new - w).max() < tol:
+            return new
+        w = new
+    return w
+
+
+def _history_matrix(stocks: List[str], returns: Mapping[str, DatedReturns],
+                    window: Optional[int] = None) -> Optional[np.ndarray]:
+    """(business days x stocks) daily returns joined on date.
+
+    The calendar is the last window business days (ANALYTICS_WINDOW_DAYS,
+    as in analytics.py) up to the latest date any stock has; days a stock
+    has no return are NaN. Stocks with fewer than MIN_HISTORY returns in
+    the window are all-NaN columns; None if no stock has enough.
+    """
+    window = window or Config.ANALYTICS_WINDOW_DAYS
+    series = {}
+    for stock in stocks:
+        if stock in returns:
+            dates, values = returns[stock]
+            dates = np.asarray(dates).astype("datetime64[D]")
+            if len(dates):
+                series[stock] = (dates, np.asarray(values, dtype=float))
+    if not series:
+        return None
+    end = max(dates[-1] for dates, _ in series.values())
+    start = np.busday_offset(end, -(window - 1), roll="backward")
+    calendar = np.arange(start, end + 1, dtype="datetime64[D]")
+    calendar = calendar[np.is_busday(calendar)]
+
+    matrix = np.full((len(calendar), len(stocks)), np.nan)
+    for i, stock in enumerate(stocks):
+        if stock not in series:
+            continue
+        dates, values = series[stock]
+        positions = np.searchsorted(calendar, dates)
+        hit = positions < len(calendar)
+        hit[hit] = calendar[positions[hit]] == dates[hit]
+        column = np.full(len(calendar), np.nan)
+        column[positions[hit]] = values[hit]
+        if np.count_nonzero(~np.isnan(column)) >= MIN_HISTORY:
+            matrix[:, i] = column
+    if np.isnan(matrix).all():
+        return None
+    return matrix
+
+
+def _pairwise_covariance(data: np.ndarray) -> np.ndarray:
+    """Sample covariance of each pair of columns over the days both have (NaN = missing)."""
+    mask = (~np.isnan(data)).astype(float)
+    values = np.nan_to_num(data)
+    n = mask.T @ mask
+    sums = values.T @ mask  # [i, j]: sum of column i over the days j is present
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (values.T @ values - sums * sums.T / n) / (n - 1)
+    return np.where(n >= 2, cov, 0.0)
+
+
+def estimate_moments(history: np.ndarray, shrinkage: float = 0.1):
+    """Annualized mean returns and covariance, shrunk toward the diagonal.
+
+    Moments use every day a stock (or pair) has data, so gaps do not
+    shift or truncate other series. Stocks without history get the
+    median variance, zero correlation and the median mean return.
+    """
+    known = np.count_nonzero(~np.isnan(history), axis=0) >= MIN_HISTORY
+    mu = np.full(history.shape[1], np.nan)
+    cov = np.zeros((history.shape[1], history.shape[1]))
+    data = history[:, known]
+    mu[known] = np.nanmean(data, axis=0) * TRADING_DAYS
+    sample = _pairwise_covariance(data) * TRADING_DAYS
+    sample = (1 - shrinkage) * sample + shrinkage * np.diag(np.diag(sample))
+    # Pairwise estimates need not be positive semidefinite; clip negative eigenvalues
+    eigenvalues, vectors = np.linalg.eigh(sample)
+    sample = (vectors * np.maximum(eigenvalues, 0.0)) @ vectors.T
+    cov[np.ix_(known, known)] = sample
+    missing = np.flatnonzero(~known)
+    if len(missing):
+        cov[missing, missing] = np.median(np.diag(sample))
+        mu[missing] = np.median(mu[known])
+    # Floor the diagonal so flat or constant series keep the matrix invertible
+    cov[np.diag_indices_from(cov)] = np.maximum(np.diag(cov), 1e-8)
+    return mu, cov
+
+
+def allocate(decisions: Sequence[InvestmentDecision], portfolio_size: float,
+             returns: Optional[Mapping[str, DatedReturns]] = None,
+             method: Optional[str] = None, max_weight: Optional[float] = None,
+             min_score: Optional[float] = None, risk_aversion: Optional[float] = None) -> Allocation:
+    """Allocate portfolio_size across stocks scoring at least min_score.
+
+    score: weights proportional to total score above the floor.
+    risk_parity: equal risk contribution from the return covariance.
+    mean_variance: long-only, capped mean-variance optimum on historical
+    mean returns and covariance.
+    Both history-based methods fall back to score weights without history.
+    returns maps each stock to (dates, daily returns); series are joined
+    on date, never by position.
+    """
+    method = method or Config.ALLOCATION_METHOD
+    if method not in METHODS:
+        raise ValueError(f"Unknown allocation method '{method}'; expected one of {', '.join(METHODS)}")
+    max_weight = Config.ALLOCATION_MAX_WEIGHT if max_weight is None else max_weight
+    min_score = Config.ALLOCATION_MIN_SCORE if min_score is None else min_score
+    risk_aversion = Config.ALLOCATION_RISK_AVERSION if risk_aversion is None else risk_aversion
+
+    excluded = {d.stock: f"total score {d.total_score} below {min_score:g}"
+                for d in decisions if d.total_score < min_score}
+    eligible = [d for d in decisions if d.total_score >= min_score]
+    if not eligible:
+        return Allocation(method, portfolio_size, {}, {}, cash=1.0, excluded=excluded)
+
+    stocks = [d.stock for d in eligible]
+    scores = np.array([d.total_score for d in eligible], dtype=float)
+    history = _history_matrix(stocks, returns or {})
+    if method != "score" and history is None:
+        logger.warning(f"No return history for {', '.join(stocks)}; using score weights instead of {method}")
+        method = "score"
+
+    mu = cov = None
+    if history is not None:
+        mu, cov = estimate_moments(history)
+
+    if method == "score":
+        weights = cap_weights(score_weights(scores, min_score), max_weight)
+    elif method == "risk_parity":
+        weights = cap_weights(risk_parity_weights(cov), max_weight)
+    else:
+        weights = mean_variance_weights(mu, cov, risk_aversion, max_weight)
+
+    weights = np.where(weights < 1e-6, 0.0, weights)
+    for stock, weight in zip(stocks, weights):
+        if weight == 0.0:
+            excluded[stock] = f"zero weight under {method}"
+
+    amounts = np.round(weights * portfolio_size, 2)
+    held = weights > 0
+    allocation = Allocation(
+        method=method,
+        portfolio_size=portfolio_size,
+        weights={s: round(float(w), 6) for s, w, h in zip(stocks, weights, held) if h},
+        amounts={s: float(a) for s, a, h in zip(stocks, amounts, held) if h},
+        cash=round(max(0.0, 1.0 - float(weights.sum())), 6),
+        excluded=excluded
+    )
+    if mu is not None:
+        allocation.expected_return = round(float(weights @ mu), 6)
+        allocation.volatility = round(float(np.sqrt(weights @ cov @ weights)), 6)
+    return allocation
@@ -0,0 +1,228 @@
+"""Correlation, concentration and clustering analytics for a portfolio's tickers."""
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from stock_research_crew.marketdata import MarketDataStore, market_store, TRADING_DAYS
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MIN_OVERLAP = 20  # Common observations needed before a pair's correlation is reported
+
+
+class PortfolioAnalytics:
+    """Pairwise correlation/covariance over a fixed window of daily returns.
+
+    Returns are placed on one business-day calendar (the window ending at
+    the latest date of the first stocks added), with NaN where a stock has
+    no data. Statistics are pairwise over overlapping dates, so adding a
+    ticker only computes its new row and column: O(window x tickers).
+    """
+
+    def __init__(self, store: MarketDataStore = None, window: int = None):
+        self.store = store or market_store
+        self.window = window or Config.ANALYTICS_WINDOW_DAYS
+        self._lock = threading.Lock()
+        self.symbols: List[str] = []
+        self.missing: List[str] = []  # Tickers without enough return history
+        self._calendar: Optional[np.ndarray] = None
+        self._values = np.empty((self.window, 0))  # Returns, NaN -> 0
+        self._mask = np.empty((self.window, 0))  # 1.0 where a return exists
+        self._cov = np.empty((0, 0))
+        self._corr = np.empty((0, 0))
+        self._overlap = np.empty((0, 0))
+
+    def _ensure_calendar(self, stocks: Sequence[str]) -> bool:
+        if self._calendar is not None:
+            return True
+        ends = []
+        for stock in stocks:
+            dated = self.store.dated_returns(stock)
+            if dated is not None and len(dated[0]):
+                ends.append(int(dated[0][-1]))
+        if not ends:
+            return False
+        end = np.datetime64(max(ends), "D")
+        start = np.busday_offset(end, -(self.window - 1), roll="backward")
+        self._calendar = np.arange(start, end + 1, dtype="datetime64[D]")
+        self._calendar = self._calendar[np.is_busday(self._calendar)].astype(np.int32)
+        self._values = np.empty((len(self._calendar), 0))
+        self._mask = np.empty((len(self._calendar), 0))
+        return True
+
+    def _column(self, stock: str):
+        """Returns of stock on the calendar (NaN -> 0) and its presence mask."""
+        dated = self.store.dated_returns(stock)
+        values = np.zeros(len(self._calendar))
+        mask = np.zeros(len(self._calendar))
+        if dated is not None:
+            dates, returns = dated
+            positions = np.searchsorted(self._calendar, dates)
+            hit = (positions < len(self._calendar))
+            hit[hit] = self._calendar[positions[hit]] == dates[hit]
+            hit &= ~np.isnan(returns)
+            values[positions[hit]] = returns[hit]
+            mask[positions[hit]] = 1.0
+        return values, mask
+
+    def add(self, stocks: Sequence[str]) -> List[str]:
+        """Add tickers not yet included; returns those that had enough history."""
+        added = []
+        with self._lock:
+            new = [s for s in dict.fromkeys(stocks) if s not in self.symbols and s not in self.missing]
+            if not new or not self._ensure_calendar(new):
+                self.missing.extend(new)
+                return added
+            for stock in new:
+                values, mask = self._column(stock)
+                if mask.sum() < MIN_OVERLAP:
+                    self.missing.append(stock)
+                    continue
+                self._append(stock, values, mask)
+                added.append(stock)
+        return added
+
+    def _append(self, stock: str, x: np.ndarray, m: np.ndarray):
+        """Extend the matrices by one row/column from pairwise overlapping sums."""
+        X, M = self._values, self._mask
+        # Against every existing column (restricted to common dates) and itself
+        X = np.column_stack([X, x])
+        M = np.column_stack([M, m])
+        n = M.T @ m
+        sx = (X * m[:, None]).sum(axis=0)  # Existing columns over the overlap
+        sy = M.T @ x  # New column over the overlap
+        sxx = (X * X).T @ m
+        syy = M.T @ (x * x)
+        sxy = X.T @ x
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = (sxy - sx * sy / n) / (n - 1)
+            var_x = (sxx - sx * sx / n) / (n - 1)
+            var_y = (syy - sy * sy / n) / (n - 1)
+            corr = cov / np.sqrt(var_x * var_y)
+        too_short = n < MIN_OVERLAP
+        cov[too_short] = np.nan
+        corr[too_short] = np.nan
+        corr[-1] = 1.0
+
+        k = len(self.symbols)
+        for name, row in (("_cov", cov * TRADING_DAYS), ("_corr", corr), ("_overlap", n)):
+            grown = np.full((k + 1, k + 1), np.nan)
+            grown[:k, :k] = getattr(self, name)
+            grown[k, :] = row
+            grown[:, k] = row
+            setattr(self, name, grown)
+        self._values, self._mask = X, M
+        self.symbols.append(stock)
+
+    def correlation(self) -> np.ndarray:
+        """Pairwise correlation matrix (NaN where two stocks overlap too little)."""
+        return self._corr.copy()
+
+    def covariance(self) -> np.ndarray:
+        """Annualized pairwise covariance matrix."""
+        return self._cov.copy()
+
+    def top_pairs(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Most correlated pairs, highest first."""
+        upper = np.triu_indices(len(self.symbols), k=1)
+        values = self._corr[upper]
+        order = [i for i in np.argsort(-np.nan_to_num(values, nan=-2.0)) if not np.isnan(values[i])][:limit]
+        return [{"pair": (self.symbols[upper[0][i]], self.symbols[upper[1][i]]),
+                 "correlation": round(float(values[i]), 3)} for i in order]
+
+    def average_correlation(self) -> Optional[float]:
+        values = self._corr[np.triu_indices(len(self.symbols), k=1)]
+        values = values[~np.isnan(values)]
+        return round(float(values.mean()), 3) if len(values) else None
+
+    def clusters(self, threshold: float = None) -> List[List[str]]:
+        """Average-linkage clusters of stocks whose correlation is at least threshold.
+
+        Distance is sqrt((1 - corr) / 2); pairs without enough overlap count as
+        uncorrelated.
+        """
+        threshold = Config.ANALYTICS_CLUSTER_CORRELATION if threshold is None else threshold
+        n = len(self.symbols)
+        if n == 0:
+            return []
+        distance = np.sqrt(np.clip((1.0 - np.nan_to_num(self._corr, nan=0.0)) / 2, 0.0, 1.0))
+        cutoff = np.sqrt((1.0 - threshold) / 2)
+        members = [[i] for i in range(n)]
+        np.fill_diagonal(distance, np.inf)
+        active = np.ones(n, dtype=bool)
+        sizes = np.ones(n)
+        while active.sum() > 1:
+            masked = np.where(active[:, None] & active[None, :], distance, np.inf)
+            i, j = np.unravel_index(np.argmin(masked), masked.shape)
+            if masked[i, j] > cutoff:
+                break
+            # Merge j into i; average linkage distance is the size-weighted mean
+            distance[i, :] = (distance[i, :] * sizes[i] + distance[j, :] * sizes[j]) / (sizes[i] + sizes[j])
+            distance[:, i] = distance[i, :]
+            distance[i, i] = np.inf
+            sizes[i] += sizes[j]
+            members[i] += members[j]
+            active[j] = False
+        groups = [sorted(self.symbols[k] for k in members[i]) for i in np.flatnonzero(active)]
+        return sorted(groups, key=lambda g: (-len(g), g))
+
+    def sector_concentration(self, weights: Optional[Dict[str, float]] = None,
+                             stocks: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Sector weights and Herfindahl-Hirschman index (equal weights unless given).
+
+        Sectors come from the market-data fundamentals; missing ones are Unknown.
+        """
+        stocks = list(weights) if weights else list(stocks or self.symbols + self.missing)
+        if not stocks:
+            return {"sectors": {}, "hhi": None, "effective_sectors": None}
+        raw = np.array([weights[s] if weights else 1.0 for s in stocks], dtype=float)
+        shares = raw / raw.sum()
+        sectors: Dict[str, float] = {}
+        for stock, share in zip(stocks, shares):
+            sector = str(self.store.fundamentals(stock).get("sector") or "Unknown")
+            sectors[sector] = sectors.get(sector, 0.0) + float(share)
+        hhi = float(np.sum(np.square(list(sectors.values()))))
+        return {
+            "sectors": {k: round(v, 4) for k, v in sorted(sectors.items(), key=lambda kv: -kv[1])},
+            "hhi": round(hhi, 4),
+            "effective_sectors": round(1.0 / hhi, 2)
+        }
+
+    def summary(self, weights: Optional[Dict[str, float]] = None,
+                stocks: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        return {
+            "window_days": len(self._calendar) if self._calendar is not None else 0,
+            "symbols": list(self.symbols),
+            "missing_history": list(self.missing),
+            "average_correlation": self.average_correlation(),
+            "top_pairs": self.top_pairs(),
+            "clusters": [c for c in self.clusters() if len(c) > 1],
+            "concentration": self.sector_concentration(weights, stocks)
+        }
+
+    def summary_text(self, weights: Optional[Dict[str, float]] = None,
+                     stocks: Optional[Sequence[str]] = None) -> str:
+        """Compact numeric summary for the portfolio crew's context."""
+        summary = self.summary(weights, stocks)
+        concentration = summary["concentration"]
+        lines = ["COMPUTED PORTFOLIO ANALYTICS:"]
+        if summary["symbols"]:
+            lines.append(f"  Return history: {summary['window_days']}-day window, "
+                         f"average pairwise correlation {summary['average_correlation']}")
+            if summary["top_pairs"]:
+                lines.append("  Most correlated: " + ", ".join(
+                    f"{a}/{b} {p['correlation']:.2f}" for p in summary["top_pairs"] for a, b in [p["pair"]]
+                ))
+            if summary["clusters"]:
+                lines.append("  Correlated clusters: " + "; ".join(", ".join(c) for c in summary["clusters"]))
+        if summary["missing_history"]:
+            lines.append(f"  No return history: {', '.join(summary['missing_history'])}")
+        if concentration["sectors"]:
+            basis = "allocation" if weights else "equal"
+            lines.append(f"  Sector weights ({basis} weights): " + ", ".join(
+                f"{sector} {share:.0%}" for sector, share in concentration["sectors"].items()
+            ))
+            lines.append(f"  Sector HHI {concentration['hhi']:.2f} "
+                         f"(effective number of sectors {concentration['effective_sectors']})")
+        return "\n".join(lines)
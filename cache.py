@@ -1,10 +1,13 @@
 """Improved caching with expiration and size management."""
-from pathlib import Path
-import json
-from datetime import datetime, timedelta
+import time
 import hashlib
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+from stock_research_crew.store import SQLiteStore
+from stock_research_crew.profile_log import ProfileLog
+from stock_research_crew.locks import InterProcessLock
+from stock_research_crew.symbols import resolve_symbol
+from stock_research_crew.decision import InvestmentDecision, parse_decision
 from config import Config
 
 logging.basicConfig(level=logging.INFO)
@@ -13,102 +16,158 @@ logger = logging.getLogger(__name__)
 
 class CacheManager:
     def __init__(self):
+        self._store: Optional[SQLiteStore] = None
+        self._profile_log: Optional[ProfileLog] = None
+        self._migration_lock = InterProcessLock(Config.CACHE_LOCK_FILE)
         self._ensure_cache_dir()
-        self._cache_data: Optional[Dict] = None
-        self._profile_data: Optional[Dict] = None
     
     def _ensure_cache_dir(self):
-        """Create cache directory if it doesn't exist."""
+        """Create cache directory and open the store if needed."""
         try:
             Config.CACHE_DIR.mkdir(parents=True, exist_ok=True)
-            if not Config.CACHE_FILE.exists():
-                Config.CACHE_FILE.write_text(json.dumps({"final": {}, "prompts": {}}))
-            if not Config.PROFILE_FILE.exists():
-                Config.PROFILE_FILE.write_text(json.dumps({"calls": []}))
+            self._store = SQLiteStore(
+                Config.CACHE_DB_FILE,
+                flush_interval=Config.CACHE_FLUSH_INTERVAL_S,
+                max_bytes=Config.MAX_CACHE_SIZE_MB * 1024 * 1024,
+                hot_max_bytes=Config.HOT_CACHE_SIZE_MB * 1024 * 1024,
+                eviction_policy=Config.CACHE_EVICTION_POLICY,
+                compression_level=Config.CACHE_COMPRESSION_LEVEL,
+                default_ttl=Config.CACHE_EXPIRY_HOURS * 3600,
+                sweep_interval=Config.CACHE_SWEEP_INTERVAL_S,
+                sweep_batch=Config.CACHE_SWEEP_BATCH,
+                # The document index never expires and is costly to rebuild
+                pinned_namespaces=("docs",)
+            )
+            self._profile_log = ProfileLog(
+                Config.PROFILE_FILE,
+                flush_interval=Config.PROFILE_FLUSH_INTERVAL_S,
+                max_bytes=Config.PROFILE_MAX_SIZE_MB * 1024 * 1024,
+                backup_count=Config.PROFILE_BACKUP_COUNT
+            )
+            # Another process may be migrating the same legacy files
+            with self._migration_lock:
+                self._migrate_legacy_cache()
+                self._migrate_legacy_profile()
         except Exception as e:
             logger.error(f"Failed to initialize cache: {e}")
     
-    def _load_cache(self) -> Dict:
-        """Load cache with in-memory caching."""
-        if self._cache_data is None:
-            try:
-                self._cache_data = json.loads(Config.CACHE_FILE.read_text())
-            except Exception as e:
-                logger.error(f"Failed to load cache: {e}")
-                self._cache_data = {"final": {}, "prompts": {}}
-        return self._cache_data
-    
-    def _save_cache(self, data: Dict):
-        """Save cache and update in-memory copy."""
+    def _migrate_legacy_cache(self):
+        """Import the old cache.json into the store once, then set it aside."""
+        if not Config.CACHE_FILE.exists():
+            return
         try:
-            self._check_cache_size()
-            Config.CACHE_FILE.write_text(json.dumps(data, indent=2))
-            self._cache_data = data
+            imported = self._store.import_legacy_json(Config.CACHE_FILE)
+            Config.CACHE_FILE.replace(Config.CACHE_FILE.with_suffix(".json.migrated"))
+            logger.info(f"Migrated {imported} entries from {Config.CACHE_FILE.name}")
         except Exception as e:
-            logger.error(f"Failed to save cache: {e}")
+            logger.error(f"Failed to migrate legacy cache: {e}")
     
-    def _check_cache_size(self):
-        """Remove old entries if cache exceeds size limit."""
+    def _migrate_legacy_profile(self):
+        """Append the old profile.json calls to the JSONL log once, then set it aside."""
+        if not Config.LEGACY_PROFILE_FILE.exists():
+            return
         try:
-            size_mb = Config.CACHE_FILE.stat().st_size / (1024 * 1024)
-            if size_mb > Config.MAX_CACHE_SIZE_MB:
-                logger.warning(f"Cache size {size_mb:.2f}MB exceeds limit, cleaning...")
-                self._clean_old_entries()
+            imported = self._profile_log.import_legacy_json(Config.LEGACY_PROFILE_FILE)
+            Config.LEGACY_PROFILE_FILE.replace(Config.LEGACY_PROFILE_FILE.with_suffix(".json.migrated"))
+            logger.info(f"Migrated {imported} profile records from {Config.LEGACY_PROFILE_FILE.name}")
         except Exception as e:
-            logger.error(f"Failed to check cache size: {e}")
+            logger.error(f"Failed to migrate legacy profile: {e}")
     
-    def _clean_old_entries(self):
-        """Remove entries older than expiry time."""
-        data = self._load_cache()
-        cutoff = datetime.utcnow() - timedelta(hours=Config.CACHE_EXPIRY_HOURS)
-        
-        # Clean final results
-        finals = data.get("final", {})
-        data["final"] = {
-            k: v for k, v in finals.items()
-            if self._is_recent(v.get("saved_at"), cutoff)
-        }
-        
-        # Clean prompt cache
-        prompts = data.get("prompts", {})
-        data["prompts"] = {
-            k: v for k, v in prompts.items()
-            if self._is_recent(v.get("saved_at"), cutoff)
-        }
-        
-        self._save_cache(data)
-        logger.info(f"Cleaned cache: {len(finals) - len(data['final'])} final, {len(prompts) - len(data['prompts'])} prompt entries removed")
+    def _get(self, namespace: str, key: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Load a non-expired entry (or, with allow_stale, one still in its grace period)."""
+        if self._store is None:
+            return None
+        try:
+            entry = self._store.get(namespace, key)
+        except Exception as e:
+            logger.error(f"Failed to load cache: {e}")
+            return None
+        if not entry:
+            return None
+        deadline = entry["purge_at"] if allow_stale else entry["expires_at"]
+        if deadline > time.time():
+            return entry
+        return None
     
-    def _is_recent(self, timestamp_str: Optional[str], cutoff: datetime) -> bool:
-        """Check if timestamp is more recent than cutoff."""
-        if not timestamp_str:
-            return False
+    def _put(self, namespace: str, key: str, value: str, meta: Optional[Dict[str, Any]] = None,
+             ttl: Optional[float] = None, grace: float = 0):
+        """Upsert a single entry in the store; ttl defaults to CACHE_EXPIRY_HOURS."""
+        if self._store is None:
+            return
         try:
-            ts = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-            return ts > cutoff
-        except Exception:
-            return False
+            self._store.put(namespace, key, value, meta, ttl=ttl, grace=grace)
+        except Exception as e:
+            logger.error(f"Failed to save cache: {e}")
+    
+    def _clean_old_entries(self):
+        """Remove expired entries now instead of waiting for the background sweeper."""
+        removed = self._store.delete_expired()
+        logger.info(f"Cleaned cache: {removed.get('final', 0)} final, {removed.get('prompts', 0)} prompt entries removed")
     
     def get_cached_result(self, stock: str) -> Optional[str]:
         """Get cached final result for stock."""
-        data = self._load_cache()
-        entry = data.get("final", {}).get(stock)
-        if entry and self._is_recent(entry.get("saved_at"), 
-                                     datetime.utcnow() - timedelta(hours=Config.CACHE_EXPIRY_HOURS)):
+        entry = self._get("final", resolve_symbol(stock))
+        if entry:
             logger.info(f"Cache hit for stock: {stock}")
-            return entry.get("result")
+            return entry["value"]
         return None
     
-    def save_result(self, stock: str, result: str):
-        """Save final result for stock."""
-        data = self._load_cache()
-        finals = data.get("final", {})
-        finals[stock] = {
-            "result": result,
-            "saved_at": datetime.utcnow().isoformat() + "Z"
+    def get_result_entry(self, stock: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Get cached final result for stock with its age and whether it is stale."""
+        entry = self._get("final", resolve_symbol(stock), allow_stale=allow_stale)
+        if not entry:
+            return None
+        return {
+            "result": entry["value"],
+            "decision": entry["meta"].get("decision"),
+            "saved_at": entry["saved_at"],
+            "expires_at": entry["expires_at"],
+            "stale": entry["expires_at"] <= time.time()
         }
-        data["final"] = finals
-        self._save_cache(data)
+    
+    def save_result(self, stock: str, result: str, decision: Optional[InvestmentDecision] = None,
+                    ttl_hours: Optional[float] = None):
+        """Save final result for stock, with its parsed decision record if available.
+        
+        Expires after ttl_hours (default CACHE_EXPIRY_HOURS) and is kept
+        for CACHE_STALE_GRACE_HOURS after that.
+        """
+        meta = {"decision": decision.to_dict()} if decision else None
+        self._put("final", resolve_symbol(stock), result, meta,
+                  ttl=ttl_hours * 3600 if ttl_hours is not None else None,
+                  grace=Config.CACHE_STALE_GRACE_HOURS * 3600)
+    
+    def get_decision(self, stock: str, allow_stale: bool = True) -> Optional[InvestmentDecision]:
+        """Structured decision for stock's cached report; parsed from the text for older entries."""
+        symbol = resolve_symbol(stock)
+        entry = self._get("final", symbol, allow_stale=allow_stale)
+        if not entry:
+            return None
+        if entry["meta"].get("decision"):
+            return InvestmentDecision.from_dict(entry["meta"]["decision"])
+        return parse_decision(entry["value"], symbol)
+    
+    def _task_key(self, stock: str, stage: str) -> str:
+        return f"{resolve_symbol(stock)}|{stage}"
+    
+    def get_task_result(self, stock: str, stage: str) -> Optional[str]:
+        """Get cached output of one pipeline stage for stock."""
+        entry = self.get_task_entry(stock, stage)
+        if entry:
+            return entry["result"]
+        return None
+    
+    def get_task_entry(self, stock: str, stage: str) -> Optional[Dict[str, Any]]:
+        """Get cached output of one pipeline stage for stock with its expiry time."""
+        entry = self._get("tasks", self._task_key(stock, stage))
+        if not entry:
+            return None
+        return {"result": entry["value"], "expires_at": entry["expires_at"]}
+    
+    def save_task_result(self, stock: str, stage: str, output: str, ttl_hours: float):
+        """Save output of one pipeline stage with its own lifetime."""
+        self._put("tasks", self._task_key(stock, stage), output,
+                  {"stock": resolve_symbol(stock), "stage": stage}, ttl=ttl_hours * 3600)
     
     def _prompt_key(self, prompt: str, model: str, temperature: float) -> str:
         """Generate cache key including temperature."""
@@ -117,41 +176,87 @@ class CacheManager:
     
     def get_prompt_cache(self, prompt: str, model: str, temperature: float = 0.2) -> Optional[str]:
         """Get cached prompt response."""
-        data = self._load_cache()
-        prompts = data.get("prompts", {})
-        entry = prompts.get(self._prompt_key(prompt, model, temperature))
-        if entry and self._is_recent(entry.get("saved_at"),
-                                     datetime.utcnow() - timedelta(hours=Config.CACHE_EXPIRY_HOURS)):
-            return entry.get("response")
+        entry = self._get("prompts", self._prompt_key(prompt, model, temperature))
+        if entry:
+            return entry["value"]
         return None
     
     def save_prompt_cache(self, prompt: str, model: str, temperature: float, response: str):
         """Save prompt response to cache."""
-        data = self._load_cache()
-        prompts = data.get("prompts", {})
-        prompts[self._prompt_key(prompt, model, temperature)] = {
+        self._put("prompts", self._prompt_key(prompt, model, temperature), response, {
             "model": model,
             "temperature": temperature,
-            "prompt": prompt[:500],  # Truncate for storage
-            "response": response,
-            "saved_at": datetime.utcnow().isoformat() + "Z"
-        }
-        data["prompts"] = prompts
-        self._save_cache(data)
+            "prompt": prompt[:500]  # Truncate for storage
+        })
+    
+    def get_search_result(self, key: str) -> Optional[str]:
+        """Get cached web search results for a normalized query."""
+        entry = self.get_search_entry(key)
+        if entry:
+            return entry["result"]
+        return None
+    
+    def get_search_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached web search results for a normalized query with their expiry time."""
+        entry = self._get("search", key)
+        if not entry:
+            return None
+        return {"result": entry["value"], "expires_at": entry["expires_at"]}
+    
+    def save_search_result(self, key: str, query: str, result: str, ttl_hours: float):
+        """Save web search results for a normalized query."""
+        self._put("search", key, result, {"query": query[:500]}, ttl=ttl_hours * 3600)
+    
+    def iter_documents(self) -> Iterator[Tuple[str, str]]:
+        """(path, serialized passages) for every indexed local document."""
+        if self._store is None:
+            return
+        try:
+            for path, entry in self._store.items("docs"):
+                yield path, entry["value"]
+        except Exception as e:
+            logger.error(f"Failed to load document index: {e}")
+    
+    def save_document(self, path: str, passages: str):
+        """Save one document's passages; its stamp, not age, invalidates it."""
+        self._put("docs", path, passages, ttl=float("inf"))
+    
+    def delete_documents(self, paths: List[str]):
+        """Drop removed documents from the index."""
+        if self._store is None or not paths:
+            return
+        try:
+            self._store.delete("docs", paths)
+        except Exception as e:
+            logger.error(f"Failed to delete documents from the index: {e}")
     
     def log_profile(self, call_info: Dict[str, Any]):
         """Log performance profile."""
+        if self._profile_log is None:
+            return
         try:
-            if self._profile_data is None:
-                self._profile_data = json.loads(Config.PROFILE_FILE.read_text())
-            
-            calls = self._profile_data.get("calls", [])
-            calls.append(call_info)
-            self._profile_data["calls"] = calls
-            
-            Config.PROFILE_FILE.write_text(json.dumps(self._profile_data, indent=2))
+            self._profile_log.append(call_info)
         except Exception as e:
             logger.error(f"Failed to log profile: {e}")
+    
+    def flush(self):
+        """Write queued cache entries and profile records to disk now."""
+        if self._store is not None:
+            self._store.flush()
+        if self._profile_log is not None:
+            self._profile_log.flush()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache size, budget, compression and hot-tier statistics."""
+        if self._store is None:
+            return {}
+        return self._store.stats()
+    
+    def iter_profile(self, include_rotated: bool = True) -> Iterator[Dict[str, Any]]:
+        """Stream logged profile records, oldest first."""
+        if self._profile_log is None:
+            return iter(())
+        return self._profile_log.iter_records(include_rotated=include_rotated)
 
 
 # Singleton instance
@@ -172,3 +277,6 @@ def save_prompt_cache(prompt: str, model: str, response: str):
 
 def log_profile(call_info: Dict[str, Any]):
     cache_manager.log_profile(call_info)
+
+def iter_profile(include_rotated: bool = True) -> Iterator[Dict[str, Any]]:
+    return cache_manager.iter_profile(include_rotated)
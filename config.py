@@ -6,23 +6,95 @@ import os
 class Config:
     # Paths
     BASE_DIR = Path(__file__).parent
-    CACHE_DIR = BASE_DIR / ".cache"
-    CACHE_FILE = CACHE_DIR / "cache.json"
-    PROFILE_FILE = CACHE_DIR / "profile.json"
+    CACHE_DIR = Path(os.getenv("CACHE_DIR", str(BASE_DIR / ".cache")))  # Cache DB, profile log, market store
+    CACHE_DB_FILE = CACHE_DIR / "cache.db"
+    CACHE_FILE = CACHE_DIR / "cache.json"  # Legacy JSON cache, migrated into CACHE_DB_FILE
+    CACHE_LOCK_FILE = CACHE_DIR / "cache.lock"
+    SYMBOL_MASTER_FILE = Path(os.getenv("SYMBOL_MASTER_FILE", str(BASE_DIR / "data" / "symbols.csv")))
+    MARKET_DATA_DIR = Path(os.getenv("MARKET_DATA_DIR", str(BASE_DIR / "data" / "market")))  # CSV/Parquet drops
+    MARKET_STORE_DIR = CACHE_DIR / "market"  # Memory-mapped columns built from MARKET_DATA_DIR
+    DOCS_DIR = Path(os.getenv("DOCS_DIR", str(BASE_DIR / "data" / "docs")))  # Filings, transcripts, news (.txt/.md/.html)
+    PROFILE_FILE = CACHE_DIR / "profile.jsonl"
+    LEGACY_PROFILE_FILE = CACHE_DIR / "profile.json"  # Migrated into PROFILE_FILE
     
     # LLM Settings
     LLM_MODEL = os.getenv("LLM_MODEL", "ollama/mistral")
     LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:11434")
     LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
     LLM_TIMEOUT = int(os.getenv("LLM_TIMEOUT", "120"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))  # Keep-alive pool for async calls
+    LLM_STREAM = os.getenv("LLM_STREAM", "true").lower() == "true"  # Show agent output as it is generated
+    
+    # Per-agent models (default LLM_MODEL), e.g. a small fast model for
+    # research and risk enumeration and a larger one for the final decision
+    MARKET_RESEARCHER_MODEL = os.getenv("MARKET_RESEARCHER_MODEL", LLM_MODEL)
+    FUNDAMENTAL_ANALYST_MODEL = os.getenv("FUNDAMENTAL_ANALYST_MODEL", LLM_MODEL)
+    RISK_MANAGER_MODEL = os.getenv("RISK_MANAGER_MODEL", LLM_MODEL)
+    INVESTMENT_ADVISOR_MODEL = os.getenv("INVESTMENT_ADVISOR_MODEL", LLM_MODEL)
+    PORTFOLIO_ANALYST_MODEL = os.getenv("PORTFOLIO_ANALYST_MODEL", LLM_MODEL)
+    DIVERSIFICATION_ANALYST_MODEL = os.getenv("DIVERSIFICATION_ANALYST_MODEL", LLM_MODEL)
+    
+    # Adaptive LLM concurrency (AIMD) and optional per-model request rate limits
+    LLM_CONCURRENCY_INITIAL = int(os.getenv("LLM_CONCURRENCY_INITIAL", "4"))
+    LLM_CONCURRENCY_MIN = int(os.getenv("LLM_CONCURRENCY_MIN", "1"))
+    LLM_CONCURRENCY_MAX = int(os.getenv("LLM_CONCURRENCY_MAX", "16"))
+    LLM_LATENCY_TARGET_S = float(os.getenv("LLM_LATENCY_TARGET_S", str(LLM_TIMEOUT / 2)))  # Slower calls count as overload
+    LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", "0"))  # 0 disables
+    LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")  # Per-model overrides: "ollama/mistral=30,ollama/llama3.1=10"
+    LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "5"))
     
     # Cache Settings
     CACHE_EXPIRY_HOURS = int(os.getenv("CACHE_EXPIRY_HOURS", "24"))
+    CACHE_SWEEP_INTERVAL_S = float(os.getenv("CACHE_SWEEP_INTERVAL_S", "60"))  # 0 disables the sweeper
+    CACHE_SWEEP_BATCH = int(os.getenv("CACHE_SWEEP_BATCH", "500"))
+    
+    # Per-stage cache lifetimes for the stock pipeline
+    RESEARCH_TTL_HOURS = float(os.getenv("RESEARCH_TTL_HOURS", "72"))
+    ANALYSIS_TTL_HOURS = float(os.getenv("ANALYSIS_TTL_HOURS", "24"))
+    RISK_TTL_HOURS = float(os.getenv("RISK_TTL_HOURS", "24"))
+    DECISION_TTL_HOURS = float(os.getenv("DECISION_TTL_HOURS", "6"))
+    
+    # Serve expired reports immediately while refreshing them in the background
+    STALE_WHILE_REVALIDATE = os.getenv("STALE_WHILE_REVALIDATE", "false").lower() == "true"
+    CACHE_STALE_GRACE_HOURS = int(os.getenv("CACHE_STALE_GRACE_HOURS", "72"))
+    REVALIDATE_WORKERS = int(os.getenv("REVALIDATE_WORKERS", "2"))
+    REVALIDATE_WAIT = os.getenv("REVALIDATE_WAIT", "false").lower() == "true"  # CLIs wait for refreshes of stale reports before exiting
     MAX_CACHE_SIZE_MB = int(os.getenv("MAX_CACHE_SIZE_MB", "100"))
+    HOT_CACHE_SIZE_MB = int(os.getenv("HOT_CACHE_SIZE_MB", "16"))
+    CACHE_EVICTION_POLICY = os.getenv("CACHE_EVICTION_POLICY", "lru").lower()  # lru or lfu
+    CACHE_COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", "6"))  # zlib 1-9
+    CACHE_FLUSH_INTERVAL_S = float(os.getenv("CACHE_FLUSH_INTERVAL_S", "0.05"))
+    
+    # Profile Log Settings
+    PROFILE_FLUSH_INTERVAL_S = float(os.getenv("PROFILE_FLUSH_INTERVAL_S", "1.0"))
+    PROFILE_MAX_SIZE_MB = int(os.getenv("PROFILE_MAX_SIZE_MB", "10"))
+    PROFILE_BACKUP_COUNT = int(os.getenv("PROFILE_BACKUP_COUNT", "5"))
     
     # Performance
     ENABLE_PARALLEL_TASKS = os.getenv("ENABLE_PARALLEL_TASKS", "true").lower() == "true"
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+    LLM_RETRY_BUDGET_S = float(os.getenv("LLM_RETRY_BUDGET_S", str(LLM_TIMEOUT * 2)))  # All attempts of one call
+    LLM_RETRY_BASE_DELAY_S = float(os.getenv("LLM_RETRY_BASE_DELAY_S", "1.0"))
+    LLM_RETRY_MAX_DELAY_S = float(os.getenv("LLM_RETRY_MAX_DELAY_S", "30"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # Consecutive failures to open
+    CIRCUIT_RECOVERY_S = float(os.getenv("CIRCUIT_RECOVERY_S", "30"))  # Open time before a probe call
+    PORTFOLIO_WORKERS = int(os.getenv("PORTFOLIO_WORKERS", "3"))  # Stocks analyzed at once; LLM calls are still governed by the limiter
+    CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", str(PORTFOLIO_WORKERS + REVALIDATE_WORKERS)))  # Isolated agent sets for concurrent analyses
+    PORTFOLIO_PROCESSES = int(os.getenv("PORTFOLIO_PROCESSES", "0"))  # >0: parallel portfolio mode uses this many worker processes instead of threads
+    
+    # Portfolio allocation (computed, not generated by the LLM)
+    ALLOCATION_METHOD = os.getenv("ALLOCATION_METHOD", "score").lower()  # score, risk_parity or mean_variance
+    ALLOCATION_MAX_WEIGHT = float(os.getenv("ALLOCATION_MAX_WEIGHT", "0.25"))  # Cap per position; the rest stays in cash
+    ALLOCATION_MIN_SCORE = float(os.getenv("ALLOCATION_MIN_SCORE", "50"))  # Stocks below (AVOID) get no allocation
+    ALLOCATION_RISK_AVERSION = float(os.getenv("ALLOCATION_RISK_AVERSION", "3.0"))  # mean_variance only
+    ANALYTICS_WINDOW_DAYS = int(os.getenv("ANALYTICS_WINDOW_DAYS", "252"))  # Business days of returns for correlations
+    ANALYTICS_CLUSTER_CORRELATION = float(os.getenv("ANALYTICS_CLUSTER_CORRELATION", "0.7"))  # Cluster stocks at least this correlated
     
     # Search
     SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
+    SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")  # Point at a local stand-in for tests
+    SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "10"))
+    SEARCH_CACHE_TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24"))
+    DOCS_REFRESH_S = float(os.getenv("DOCS_REFRESH_S", "60"))  # How often searches check DOCS_DIR for changes
+    MARKET_DATA_REFRESH_S = float(os.getenv("MARKET_DATA_REFRESH_S", "60"))  # How often lookups check MARKET_DATA_DIR for changes
+    MARKET_STORE_GRACE_S = float(os.getenv("MARKET_STORE_GRACE_S", "3600"))  # Superseded store generations are kept this long
@@ -1,47 +1,47 @@
-"""Improved crew configuration with parallel processing support."""
-from crewai import Crew
-from stock_research_crew.tasks import (
-    research_task,
-    analysis_task,
-    risk_task,
-    investment_decision_task
-)
-from stock_research_crew.agents import (
-    market_researcher,
-    fundamental_analyst,
-    risk_manager,
-    investment_advisor
-)
-from config import Config
+"""Stock analysis entry point: pooled, per-stage cached pipeline runs."""
+from stock_research_crew.pipeline import pipeline_pool
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.symbols import resolve_symbol
+from stock_research_crew.singleflight import SingleFlight
+from stock_research_crew.tokens import track_tokens
+from stock_research_crew.decision import parse_decision
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-# Note: CrewAI supports parallel execution for independent tasks
-# Research, analysis, and risk tasks can run in parallel since they don't depend on each other
-# The final investment decision task depends on all three
-
-try:
-    stock_crew = Crew(
-        agents=[
-            market_researcher,
-            fundamental_analyst,
-            risk_manager,
-            investment_advisor
-        ],
-        tasks=[
-            research_task,
-            analysis_task,
-            risk_task,
-            investment_decision_task
-        ],
-        verbose=True,
-        # Enable parallel execution if configured (requires CrewAI Pro or specific setup)
-        # process="parallel" if Config.ENABLE_PARALLEL_TASKS else "sequential"
-    )
-    
-    logger.info("Stock research crew initialized successfully")
-    
-except Exception as e:
-    logger.error(f"Failed to initialize crew: {e}")
-    raise
+
+# Concurrent analyses of the same ticker share one pipeline run
+stock_flight = SingleFlight("stock")
+stock_flight.set_log_callback(cache_manager.log_profile)
+
+
+def run_stock_analysis(stock: str) -> str:
+    """Run the stock pipeline and cache the final report.
+
+    Stages whose cached output is still valid are reused, so a refresh only
+    reruns the stages that expired (and the stages downstream of them).
+    Callers asking for a ticker that is already being analyzed wait for
+    that run instead of starting another. Different tickers run on
+    separate pipelines from pipeline_pool, so they never share agents.
+    """
+    stock = resolve_symbol(stock)
+    return stock_flight.do(stock, lambda: _analyze(stock), label=stock)
+
+
+def report_ttl_hours() -> float:
+    """Lifetime of a freshly analyzed report: that of its shortest-lived stage."""
+    return min(stage.ttl_hours for stage in pipeline_pool.template.stages)
+
+
+def _analyze(stock: str) -> str:
+    with track_tokens(stock) as usage, pipeline_pool.checkout() as pipeline:
+        outputs, expires_at = pipeline.run(stock)
+    cache_manager.log_profile({"time": time.time(), "event": "run_tokens", **usage.summary()})
+    output = outputs["decision"]
+    # The report expires with the first of the stage outputs it was built from,
+    # including reused ones that were already close to expiring
+    ttl_hours = max(0.0, expires_at - time.time()) / 3600
+    cache_manager.save_result(stock, output, parse_decision(output, stock), ttl_hours=ttl_hours)
+    logger.info(f"Analysis completed and cached for {stock}")
+    return output
@@ -0,0 +1,171 @@
+"""Typed investment decision record parsed from investment_decision_task output."""
+import json
+import logging
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sub-score name -> (label in the task prompt, maximum points)
+SCORE_FIELDS = {
+    "business_quality": ("Business Quality", 30),
+    "growth_potential": ("Growth Potential", 25),
+    "valuation": ("Valuation", 20),
+    "risk_profile": ("Risk Profile", 25),
+}
+DECISIONS = ("BUY", "HOLD", "AVOID")
+CONFIDENCE_LEVELS = ("Low", "Medium", "High")
+MAX_REASONS = 8
+
+# Appended to the decision task so the scores can be read without parsing
+# prose (no braces: CrewAI interpolates {placeholders} in task descriptions)
+JSON_INSTRUCTIONS = """
+    5. MACHINE-READABLE SUMMARY:
+       Finish with the same result as a JSON object in a ```json code block, with keys
+       business_quality, growth_potential, valuation, risk_profile, total_score (integers),
+       decision ("BUY", "HOLD" or "AVOID"), confidence ("Low", "Medium" or "High")
+       and reasoning (list of the bullet points as strings).
+    """
+
+
+def decision_for_score(total: int) -> str:
+    """Decision band used by the task prompt."""
+    if total >= 75:
+        return "BUY"
+    if total >= 50:
+        return "HOLD"
+    return "AVOID"
+
+
+@dataclass
+class InvestmentDecision:
+    """Scores, decision, confidence and reasoning bullets for one stock."""
+
+    stock: str
+    business_quality: int
+    growth_potential: int
+    valuation: int
+    risk_profile: int
+    total_score: int
+    decision: str
+    confidence: Optional[str] = None
+    reasoning: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InvestmentDecision":
+        return cls(**{k: data[k] for k in cls.__dataclass_fields__ if k in data})
+
+    def summary_line(self) -> str:
+        """One-line score table row for prompts and console output."""
+        return (f"{self.stock}: total {self.total_score}/100 "
+                f"(quality {self.business_quality}/30, growth {self.growth_potential}/25, "
+                f"valuation {self.valuation}/20, risk {self.risk_profile}/25) "
+                f"-> {self.decision}, confidence {self.confidence or 'n/a'}")
+
+
+def _validate(stock: str, data: Dict[str, Any]) -> Optional[InvestmentDecision]:
+    """Clamp and cross-check parsed fields; None if a sub-score is missing."""
+    scores = {}
+    for name, (label, maximum) in SCORE_FIELDS.items():
+        value = data.get(name)
+        try:
+            value = int(round(float(value)))
+        except (TypeError, ValueError):
+            logger.warning(f"Decision for {stock} has no usable {label} score")
+            return None
+        if not 0 <= value <= maximum:
+            logger.warning(f"{label} score {value} for {stock} outside 0-{maximum}; clamped")
+            value = min(max(value, 0), maximum)
+        scores[name] = value
+
+    total = sum(scores.values())
+    reported = data.get("total_score")
+    if reported is not None and str(reported).strip() != str(total):
+        logger.warning(f"Total score {reported} for {stock} does not match sub-scores ({total}); using {total}")
+
+    decision = str(data.get("decision") or "").upper()
+    if decision not in DECISIONS:
+        decision = decision_for_score(total)
+    elif decision != decision_for_score(total):
+        logger.warning(f"Decision {decision} for {stock} disagrees with score band {decision_for_score(total)}")
+
+    confidence = str(data.get("confidence") or "").capitalize() or None
+    if confidence not in CONFIDENCE_LEVELS:
+        confidence = None
+
+    reasoning = [str(r).strip()[:300] for r in (data.get("reasoning") or []) if str(r).strip()]
+    return InvestmentDecision(stock=stock, total_score=total, decision=decision,
+                              confidence=confidence, reasoning=reasoning[:MAX_REASONS], **scores)
+
+
+def _parse_json_block(text: str) -> Optional[Dict[str, Any]]:
+    """Last ```json block (or bare JSON object) in text that holds the scores."""
+    candidates = re.findall(r"```(?:json)?\s*(\{.*?\})\s*```", text, re.S)
+    candidates += re.findall(r"(\{[^{}]*\"business_quality\"[^{}]*\})", text, re.S)
+    for candidate in reversed(candidates):
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict) and "business_quality" in data:
+            return data
+    return None
+
+
+def _score_after(label: str, text: str) -> Optional[str]:
+    """First number following label on the same line, skipping '(0-30)' style ranges."""
+    for match in re.finditer(rf"{re.escape(label)}([^\n]*)", text, re.I):
+        line = re.sub(r"\(\s*0\s*[-–]\s*\d+\s*\)", "", match.group(1))
+        number = re.search(r"(\d+(?:\.\d+)?)", line)
+        if number:
+            return number.group(1)
+    return None
+
+
+def _parse_prose(text: str) -> Dict[str, Any]:
+    data: Dict[str, Any] = {name: _score_after(label, text) for name, (label, _) in SCORE_FIELDS.items()}
+    data["total_score"] = _score_after("Total Score", text)
+
+    decision = re.search(r"decision[^\n]*?\b(BUY|HOLD|AVOID)\b", text, re.I)
+    if decision:
+        data["decision"] = decision.group(1)
+    confidence = re.search(r"confidence[^\n]*?\b(low|medium|high)\b", text, re.I)
+    if confidence:
+        data["confidence"] = confidence.group(1)
+
+    reasoning = re.search(r"reasoning[^\n]*\n(.*)", text, re.I | re.S)
+    if reasoning:
+        # The section ends at a code block or the next all-caps heading
+        section = re.split(r"```|^\s*(?:\d+\.\s*)?[A-Z][A-Z &/-]{3,}:?\s*$",
+                           reasoning.group(1), maxsplit=1, flags=re.M)[0]
+        bullets = re.findall(r"^\s*(?:[-*•]|\d+[.)])\s+(.+)$", section, re.M)
+        data["reasoning"] = [re.sub(r"\*\*", "", b) for b in bullets]
+    return data
+
+
+def parse_decision(text: str, stock: str) -> Optional[InvestmentDecision]:
+    """Parse the decision task's output; None when the scores cannot be read."""
+    if not text:
+        return None
+    data = _parse_json_block(text)
+    if data is None:
+        data = _parse_prose(text)
+    elif not data.get("reasoning"):
+        data["reasoning"] = _parse_prose(text).get("reasoning", [])
+    record = _validate(stock, data)
+    if record is None:
+        logger.warning(f"Could not extract structured decision for {stock}")
+    return record
+
+
+def rank_decisions(decisions: List[InvestmentDecision]) -> List[InvestmentDecision]:
+    """Highest total score first; confidence breaks ties."""
+    confidence_rank = {level: i for i, level in enumerate(CONFIDENCE_LEVELS)}
+    return sorted(
+        decisions,
+        key=lambda d: (-d.total_score, -confidence_rank.get(d.confidence, -1), d.stock)
+    )
@@ -0,0 +1,252 @@
+"""Offline full-text search over local filings, transcripts and news dumps (BM25)."""
+import html
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.symbols import symbol_index, normalize_name
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {".txt", ".md", ".html", ".htm"}
+PASSAGE_WORDS = 200  # Documents are indexed as passages of about this many words
+SNIPPET_WORDS = 40
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)?")
+_WORD_SPAN_RE = re.compile(r"\S+")
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.S | re.I)
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "we", "our"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def read_text(path: Path) -> str:
+    text = path.read_text(encoding="utf-8", errors="replace")
+    if path.suffix.lower() in (".html", ".htm"):
+        text = html.unescape(_TAG_RE.sub(" ", text))
+    return text
+
+
+def passages(text: str) -> List[Tuple[int, int]]:
+    """(start, end) character offsets of consecutive passages of PASSAGE_WORDS words."""
+    spans = [m.span() for m in _WORD_SPAN_RE.finditer(text)]
+    return [(spans[i][0], spans[min(i + PASSAGE_WORDS, len(spans)) - 1][1])
+            for i in range(0, len(spans), PASSAGE_WORDS)]
+
+
+def expand_query(query: str) -> List[str]:
+    """Query terms plus the ticker for company names and the name for tickers."""
+    terms = tokenize(query)
+    extra = []
+    for word in re.findall(r"[A-Za-z][A-Za-z.&-]*", query):
+        symbol = symbol_index.exact_name(word)
+        if symbol:
+            extra += tokenize(symbol)
+        elif word.isupper() and symbol_index.lookup(word) == word:
+            extra += tokenize(normalize_name(symbol_index.display_name(word)))
+    return list(dict.fromkeys(terms + extra))
+
+
+class DocumentIndex:
+    """Incrementally maintained inverted index with BM25 ranking.
+
+    Each file is split into passages; passage term frequencies are
+    persisted as one row per file in the cache store, so a restart re-reads
+    only files whose size or mtime changed and a change rewrites only its
+    own row. Postings live in memory and are patched per changed file.
+    Nothing is loaded until the first search. Snippets are cut from the
+    best passages at query time.
+    """
+
+    def __init__(self, docs_dir: Path, k1: float = 1.5, b: float = 0.75,
+                 refresh_interval: float = 60.0):
+        self.docs_dir = Path(docs_dir)
+        self.k1 = k1
+        self.b = b
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._files: Optional[Dict[str, Dict[str, Any]]] = None  # path -> stamp, passages
+        self._postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._lengths: Dict[Tuple[str, int], int] = {}
+        self._total_length = 0
+        self._checked_at = 0.0
+
+    def _walk(self) -> Iterator[Tuple[str, os.DirEntry]]:
+        """(relative path, entry) for every indexable file."""
+        pending = [("", str(self.docs_dir))] if self.docs_dir.is_dir() else []
+        while pending:
+            prefix, directory = pending.pop()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append((prefix + entry.name + "/", entry.path))
+                    elif os.path.splitext(entry.name)[1].lower() in EXTENSIONS:
+                        yield prefix + entry.name, entry
+
+    def _scan(self) -> Dict[str, List[int]]:
+        """Relative path -> [mtime_ns, size] for every indexable file."""
+        sources = {}
+        for path, entry in self._walk():
+            stat = entry.stat()
+            sources[path] = [stat.st_mtime_ns, stat.st_size]
+        return sources
+
+    def has_documents(self) -> bool:
+        """Whether docs_dir holds anything to index, without building the index."""
+        return next(self._walk(), None) is not None
+
+    def _load(self):
+        self._files = {}
+        for path, value in cache_manager.iter_documents():
+            try:
+                self._files[path] = json.loads(value)
+            except ValueError as e:
+                logger.error(f"Failed to load index entry for {path}, re-indexing: {e}")
+        for path, entry in self._files.items():
+            self._add_postings(path, entry)
+
+    def _add_postings(self, path: str, entry: Dict[str, Any]):
+        for i, passage in enumerate(entry["passages"]):
+            key = (path, i)
+            self._lengths[key] = passage["length"]
+            self._total_length += passage["length"]
+            for term, tf in passage["terms"].items():
+                self._postings.setdefault(term, {})[key] = tf
+
+    def _remove_postings(self, path: str, entry: Dict[str, Any]):
+        for i, passage in enumerate(entry["passages"]):
+            key = (path, i)
+            self._total_length -= self._lengths.pop(key, 0)
+            for term in passage["terms"]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def _index_file_entry(self, path: str, stamp: List[int]) -> Dict[str, Any]:
+        text = read_text(self.docs_dir / path)
+        entries = []
+        for start, end in passages(text):
+            terms = tokenize(text[start:end])
+            entries.append({"span": [start, end], "length": len(terms), "terms": dict(Counter(terms))})
+        return {"stamp": stamp, "passages": entries}
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-index new, changed and removed files; returns how many changed."""
+        with self._lock:
+            if self._files is None:
+                self._load()
+            elif not force and time.time() - self._checked_at < self.refresh_interval:
+                return 0
+            self._checked_at = time.time()
+            sources = self._scan()
+            changed = [p for p, stamp in sources.items() if self._files.get(p, {}).get("stamp") != stamp]
+            removed = [p for p in self._files if p not in sources]
+            if not changed and not removed:
+                return 0
+
+            start = time.time()
+            for path in removed + changed:
+                if path in self._files:
+                    self._remove_postings(path, self._files.pop(path))
+            cache_manager.delete_documents(removed)
+            for path in changed:
+                try:
+                    entry = self._index_file_entry(path, sources[path])
+                except Exception as e:
+                    logger.error(f"Failed to index {path}: {e}")
+                    continue
+                self._files[path] = entry
+                self._add_postings(path, entry)
+                cache_manager.save_document(path, json.dumps(entry))
+            logger.info(f"Indexed {len(changed)} changed and dropped {len(removed)} removed documents "
+                        f"in {time.time() - start:.2f}s ({len(self._files)} total)")
+            return len(changed) + len(removed)
+
+    def document_count(self) -> int:
+        self.refresh()
+        return len(self._files)
+
+    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Top passages by BM25 with a snippet around the matching terms."""
+        self.refresh()
+        terms = expand_query(query)
+        with self._lock:
+            count = len(self._lengths)
+            if not count or not terms:
+                return []
+            average = self._total_length / count or 1.0
+            scores: Dict[Tuple[str, int], float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[key] / average)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / norm
+            # One result per document: its best passage
+            best: Dict[str, Tuple[float, int]] = {}
+            for (path, i), score in scores.items():
+                if score > best.get(path, (0.0, -1))[0]:
+                    best[path] = (score, i)
+            top = sorted(best.items(), key=lambda kv: -kv[1][0])[:limit]
+            spans = {path: self._files[path]["passages"][i]["span"] for path, (_, i) in top}
+
+        results = []
+        for path, (score, _) in top:
+            try:
+                start, end = spans[path]
+                snippet = make_snippet(read_text(self.docs_dir / path)[start:end], set(terms))
+            except OSError:
+                continue
+            results.append({"source": path, "score": round(score, 3), "snippet": snippet})
+        return results
+
+    def format_results(self, query: str, limit: int = 5) -> str:
+        results = self.search(query, limit)
+        if not results:
+            return f"No local documents match '{query}'."
+        return "\n".join(f"Source: {r['source']} (score {r['score']})\nSnippet: {r['snippet']}\n---"
+                         for r in results)
+
+
+def make_snippet(text: str, terms: set) -> str:
+    """The SNIPPET_WORDS-word window of text with the most query terms."""
+    words = text.split()
+    if len(words) <= SNIPPET_WORDS:
+        return " ".join(words)
+    hits = [1 if set(tokenize(w)) & terms else 0 for w in words]
+    window = sum(hits[:SNIPPET_WORDS])
+    best, best_start = window, 0
+    for start in range(1, len(words) - SNIPPET_WORDS + 1):
+        window += hits[start + SNIPPET_WORDS - 1] - hits[start - 1]
+        if window > best:
+            best, best_start = window, start
+    snippet = " ".join(words[best_start:best_start + SNIPPET_WORDS])
+    prefix = "... " if best_start else ""
+    suffix = " ..." if best_start + SNIPPET_WORDS < len(words) else ""
+    return prefix + snippet + suffix
+
+
+# Singleton instance
+document_index = DocumentIndex(Config.DOCS_DIR, refresh_interval=Config.DOCS_REFRESH_S)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    document_index.refresh(force=True)
+    print(f"{document_index.document_count()} documents indexed from {Config.DOCS_DIR}")
@@ -0,0 +1,270 @@
+"""Adaptive concurrency limiting and per-model rate limiting for LLM calls."""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from stock_research_crew.resilience import is_retryable
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LimiterTimeout(TimeoutError):
+    """No slot or rate-limit token became available within the caller's timeout."""
+
+
+class _Slot:
+    """One admitted LLM attempt; reports its latency and outcome on exit."""
+
+    def __init__(self, limiter: "AdaptiveLimiter", timeout: Optional[float] = None):
+        self._limiter = limiter
+        self._timeout = timeout
+        self._start = 0.0
+
+    def __enter__(self):
+        self._limiter.acquire(self._timeout)
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._limiter.release(time.time() - self._start, ok=exc is None or not is_retryable(exc))
+
+    async def __aenter__(self):
+        await self._limiter.aacquire()
+        self._start = time.time()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._limiter.release(time.time() - self._start, ok=exc is None or not is_retryable(exc))
+
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight LLM requests, shared by threads and event loops.
+
+    While callers are queued and calls finish successfully under
+    latency_target, the limit grows by about one slot per limit's worth of
+    completions. A call failing with a retryable (overload or availability)
+    error, or one slower than latency_target, cuts the
+    limit by backoff, at most once per observed call latency so a burst of
+    failures from one overload only counts once.
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 latency_target: float = 60.0, backoff: float = 0.5, smoothing: float = 0.2):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._waiters = deque()  # threading.Event or (loop, asyncio.Future)
+        self._latency: Optional[float] = None  # EWMA seconds
+        self._error_rate = 0.0  # EWMA of failed attempts
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def set_max_limit(self, max_limit: int):
+        """Lower (or raise) the ceiling; the current limit is clamped to it."""
+        with self._lock:
+            self.max_limit = max(1, max_limit)
+            self.min_limit = min(self.min_limit, self.max_limit)
+            self._limit = min(self._limit, float(self.max_limit))
+
+    def slot(self, timeout: Optional[float] = None) -> _Slot:
+        """Context manager (sync or async) that holds one slot for an attempt.
+        
+        timeout bounds the blocking wait; async waits are bounded by the caller.
+        """
+        return _Slot(self, timeout)
+
+    def _try_acquire_locked(self) -> bool:
+        if not self._waiters and self._inflight < int(self._limit):
+            self._inflight += 1
+            return True
+        return False
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Wait for a slot; raise LimiterTimeout if none is free within timeout seconds."""
+        with self._lock:
+            if self._try_acquire_locked():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        if event.wait(timeout):
+            return  # The slot is handed over by _wake_locked
+        with self._lock:
+            try:
+                self._waiters.remove(event)
+            except ValueError:
+                return  # Granted just as the wait timed out
+        raise LimiterTimeout(f"No LLM slot free within {timeout:.1f}s")
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire_locked():
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            granted = False
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                except ValueError:
+                    # Already granted: give the slot back here, or in _grant if still queued
+                    granted = future.done() and not future.cancelled()
+            if granted:
+                self.release(None, ok=True)
+            raise
+
+    def _grant(self, future: asyncio.Future):
+        if future.done():
+            self.release(None, ok=True)
+        else:
+            future.set_result(None)
+
+    def _wake_locked(self):
+        while self._waiters and self._inflight < int(self._limit):
+            waiter = self._waiters.popleft()
+            self._inflight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+                continue
+            loop, future = waiter
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:  # Loop already closed
+                self._inflight -= 1
+
+    def release(self, latency: Optional[float], ok: bool):
+        """Free a slot and adjust the limit from the attempt's latency and outcome."""
+        with self._lock:
+            saturated = self._inflight >= int(self._limit) or bool(self._waiters)
+            self._inflight -= 1
+            if latency is not None:
+                self._observe(latency, ok, saturated)
+            self._wake_locked()
+
+    def _observe(self, latency: float, ok: bool, saturated: bool):
+        a = self.smoothing
+        self._latency = latency if self._latency is None else (1 - a) * self._latency + a * latency
+        self._error_rate = (1 - a) * self._error_rate + a * (0.0 if ok else 1.0)
+
+        now = time.time()
+        if not ok or latency > self.latency_target:
+            if now - self._last_decrease >= (self._latency or 0):
+                old = self.limit
+                self._limit = max(float(self.min_limit), self._limit * self.backoff)
+                self._last_decrease = now
+                if self.limit != old:
+                    logger.info(f"LLM concurrency limit lowered to {self.limit} "
+                                f"({'error' if not ok else f'{latency:.1f}s call'})")
+        elif saturated and self._limit < self.max_limit:
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "inflight": self._inflight,
+                "queued": len(self._waiters),
+                "latency_s": round(self._latency or 0.0, 3),
+                "error_rate": round(self._error_rate, 3)
+            }
+
+
+class TokenBucket:
+    """Request-rate limit: rate_per_minute sustained with bursts of up to burst calls."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly borrowing ahead; return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Wait for a token; raise LimiterTimeout if that would take longer than timeout."""
+        wait = self._reserve()
+        if timeout is not None and wait > timeout:
+            with self._lock:
+                self._tokens += 1  # Give the reserved token back
+            raise LimiterTimeout(f"Rate limit allows the next call in {wait:.1f}s, after the {timeout:.1f}s budget")
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, float]:
+    """Parse 'ollama/mistral=30,ollama/llama3.1=10' into requests per minute by model."""
+    limits = {}
+    for item in spec.split(","):
+        model, sep, rate = item.strip().rpartition("=")
+        if not sep or not model:
+            continue
+        try:
+            limits[model.strip()] = float(rate)
+        except ValueError:
+            logger.warning(f"Ignoring invalid LLM rate limit: {item}")
+    return limits
+
+
+_buckets: Dict[str, Optional[TokenBucket]] = {}
+_buckets_lock = threading.Lock()
+_process_share = 1  # Processes splitting the host's limits (see share_limits)
+
+
+def rate_limiter_for(model: str) -> Optional[TokenBucket]:
+    """Shared token bucket for model, or None when it has no rate limit."""
+    with _buckets_lock:
+        if model not in _buckets:
+            rate = _parse_rate_limits(Config.LLM_RATE_LIMITS).get(model, Config.LLM_RATE_LIMIT_RPM)
+            burst = max(1, Config.LLM_RATE_LIMIT_BURST // _process_share)
+            _buckets[model] = TokenBucket(rate / _process_share, burst) if rate > 0 else None
+        return _buckets[model]
+
+
+# Singleton instance shared by every LLM wrapper in the process
+llm_limiter = AdaptiveLimiter(
+    initial=Config.LLM_CONCURRENCY_INITIAL,
+    min_limit=Config.LLM_CONCURRENCY_MIN,
+    max_limit=Config.LLM_CONCURRENCY_MAX,
+    latency_target=Config.LLM_LATENCY_TARGET_S
+)
+
+
+def share_limits(processes: int):
+    """Limit this process to its share of the host when processes workers run at once.
+
+    LLM_CONCURRENCY_MAX and every rate limit (and burst) are divided
+    between the processes, so together they stay within the configured
+    totals. Call it before any LLM wrapper is built.
+    """
+    global _process_share
+    _process_share = max(1, processes)
+    llm_limiter.set_max_limit(max(1, Config.LLM_CONCURRENCY_MAX // _process_share))
+    with _buckets_lock:
+        _buckets.clear()
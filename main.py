@@ -1,8 +1,14 @@
 """Improved main entry point with error handling and validation."""
 import sys
+import time
 import logging
-from stock_research_crew.crew import stock_crew
+from stock_research_crew.crew import run_stock_analysis, report_ttl_hours
+from stock_research_crew.revalidate import revalidator
 from stock_research_crew.cache import cache_manager
+from stock_research_crew.symbols import resolve_symbol
+from stock_research_crew.agents import set_stream_callback
+from stock_research_crew.streaming import StreamPrinter
+from stock_research_crew.tokens import track_tokens, format_usage
 from config import Config
 
 # Configure logging
@@ -46,34 +52,60 @@ def main():
             print("Error: Please enter a valid stock name or ticker")
             return 1
         
+        # Resolve names and aliases ("apple", "Apple Inc") to one canonical ticker
+        symbol = resolve_symbol(stock_name)
+        if symbol != stock_name:
+            print(f"  Resolved '{stock_name}' to {symbol}")
+        stock_name = symbol
+        
         logger.info(f"Processing stock: {stock_name}")
         
-        # Check cache
-        cached = cache_manager.get_cached_result(stock_name)
+        # Check cache (stale reports are served at once if enabled; this process
+        # only refreshes one if it is going to wait for the refresh)
+        cached = revalidator.lookup(stock_name, run_stock_analysis, refresh=Config.REVALIDATE_WAIT)
         if cached:
-            print(f"\n✓ Using cached result (saved within last {Config.CACHE_EXPIRY_HOURS} hours)")
-            print_report(cached)
+            if cached["stale"]:
+                age_hours = (time.time() - cached["saved_at"]) / 3600
+                if Config.REVALIDATE_WAIT:
+                    print(f"\n⚠ Showing stale report ({age_hours:.1f} hours old); refreshing in the background")
+                else:
+                    print(f"\n⚠ Showing stale report ({age_hours:.1f} hours old); "
+                          f"set REVALIDATE_WAIT=true to refresh it after it is shown")
+            else:
+                expires_hours = (cached["expires_at"] - time.time()) / 3600
+                print(f"\n✓ Using cached result (expires in {expires_hours:.1f} hours)")
+            print_report(cached["result"])
+            if revalidator.pending():
+                print("\n⚙ Waiting for background refresh to finish (Ctrl+C to skip)...")
+                revalidator.wait()
+                print("✓ Refreshed report cached for next time.")
             return 0
         
         # Run crew
         print(f"\n⚙ Running analysis for {stock_name}...")
         print(f"  Model: {Config.LLM_MODEL}")
-        print(f"  Cache expiry: {Config.CACHE_EXPIRY_HOURS} hours")
+        print(f"  Cache expiry: up to {report_ttl_hours():g} hours (shortest stage TTL)")
         print(f"  This may take several minutes...\n")
         
+        # Show each agent's output as it is generated
+        printer = StreamPrinter() if Config.LLM_STREAM else None
+        if printer:
+            set_stream_callback(printer)
+        
         try:
-            result = stock_crew.kickoff(inputs={"stock": stock_name})
-            output = str(result)
-            
-            # Save to cache
-            cache_manager.save_result(stock_name, output)
-            logger.info(f"Analysis completed and cached for {stock_name}")
+            with track_tokens(stock_name) as usage:
+                output = run_stock_analysis(stock_name)
+            if printer:
+                printer.flush()
             
             # Print result
             print_report(output)
             
             # Print performance summary
-            print(f"\n✓ Analysis complete. Results cached for {Config.CACHE_EXPIRY_HOURS} hours.")
+            entry = cache_manager.get_result_entry(stock_name)
+            cached_hours = (entry["expires_at"] - time.time()) / 3600 if entry else 0.0
+            print(f"\n✓ Analysis complete. Results cached for {cached_hours:.1f} hours.")
+            print(format_usage(usage))
             print(f"  Performance logs: {Config.PROFILE_FILE}")
             
             return 0
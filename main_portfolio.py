@@ -1,9 +1,17 @@
 """Enhanced main entry point with portfolio analysis support."""
 import sys
+import time
 import logging
-from stock_research_crew.crew import stock_crew
+from stock_research_crew.crew import run_stock_analysis
 from stock_research_crew.portfolio_analyzer import PortfolioAnalyzer
+from stock_research_crew.revalidate import revalidator
 from stock_research_crew.cache import cache_manager
+from stock_research_crew.symbols import resolve_symbol
+from stock_research_crew.agents import set_stream_callback
+from stock_research_crew.streaming import StreamPrinter
+from stock_research_crew.decision import InvestmentDecision
+from stock_research_crew.allocation import Allocation, METHODS
+from stock_research_crew.tokens import track_tokens, format_usage
 from config import Config
 
 # Configure logging
@@ -45,13 +53,33 @@ def analyze_single_stock():
         print("Error: Please enter a valid stock name or ticker")
         return 1
     
+    # Resolve names and aliases ("apple", "Apple Inc") to one canonical ticker
+    symbol = resolve_symbol(stock_name)
+    if symbol != stock_name:
+        print(f"  Resolved '{stock_name}' to {symbol}")
+    stock_name = symbol
+    
     logger.info(f"Processing stock: {stock_name}")
     
-    # Check cache
-    cached = cache_manager.get_cached_result(stock_name)
+    # Check cache (stale reports are served at once if enabled; this process
+    # only refreshes one if it is going to wait for the refresh)
+    cached = revalidator.lookup(stock_name, run_stock_analysis, refresh=Config.REVALIDATE_WAIT)
     if cached:
-        print(f"\n✓ Using cached result (saved within last {Config.CACHE_EXPIRY_HOURS} hours)")
-        print_report(cached)
+        if cached["stale"]:
+            age_hours = (time.time() - cached["saved_at"]) / 3600
+            if Config.REVALIDATE_WAIT:
+                print(f"\n⚠ Showing stale report ({age_hours:.1f} hours old); refreshing in the background")
+            else:
+                print(f"\n⚠ Showing stale report ({age_hours:.1f} hours old); "
+                      f"set REVALIDATE_WAIT=true to refresh it after it is shown")
+        else:
+            expires_hours = (cached["expires_at"] - time.time()) / 3600
+            print(f"\n✓ Using cached result (expires in {expires_hours:.1f} hours)")
+        print_report(cached["result"])
+        if revalidator.pending():
+            print("\n⚙ Waiting for background refresh to finish (Ctrl+C to skip)...")
+            revalidator.wait()
+            print("✓ Refreshed report cached for next time.")
         return 0
     
     # Run crew
@@ -59,18 +87,24 @@ def analyze_single_stock():
     print(f"  Model: {Config.LLM_MODEL}")
     print(f"  This may take several minutes...\n")
     
+    # Show each agent's output as it is generated
+    printer = StreamPrinter() if Config.LLM_STREAM else None
+    if printer:
+        set_stream_callback(printer)
+    
     try:
-        result = stock_crew.kickoff(inputs={"stock": stock_name})
-        output = str(result)
-        
-        # Save to cache
-        cache_manager.save_result(stock_name, output)
-        logger.info(f"Analysis completed and cached for {stock_name}")
+        with track_tokens(stock_name) as usage:
+            output = run_stock_analysis(stock_name)
+        if printer:
+            printer.flush()
         
         # Print result
         print_report(output)
         
-        print(f"\n✓ Analysis complete. Results cached for {Config.CACHE_EXPIRY_HOURS} hours.")
+        entry = cache_manager.get_result_entry(stock_name)
+        cached_hours = (entry["expires_at"] - time.time()) / 3600 if entry else 0.0
+        print(f"\n✓ Analysis complete. Results cached for {cached_hours:.1f} hours.")
+        print(format_usage(usage))
         return 0
         
     except Exception as e:
@@ -86,8 +120,16 @@ def analyze_portfolio():
     print("=" * 80)
     
     # Get stocks
-    stocks_input = input("\nEnter stock tickers separated by commas (e.g., AAPL, GOOGL, MSFT): ").strip()
-    stocks = [s.strip().upper() for s in stocks_input.split(",") if s.strip()]
+    stocks_input = input("\nEnter stock tickers or names separated by commas (e.g., AAPL, Google, MSFT): ").strip()
+    stocks = []
+    for entry in (s.strip() for s in stocks_input.split(",")):
+        if not entry:
+            continue
+        symbol = resolve_symbol(entry)
+        if symbol != entry:
+            print(f"  Resolved '{entry}' to {symbol}")
+        if symbol not in stocks:
+            stocks.append(symbol)
     
     if len(stocks) < 2:
         print("Error: Please enter at least 2 stocks for portfolio analysis")
@@ -114,19 +156,38 @@ def analyze_portfolio():
     parallel_input = input("\nUse parallel processing? (y/n, default: n): ").strip().lower()
     parallel = parallel_input == 'y'
     
+    # Allocation method (weights are computed, the LLM only explains them)
+    method_input = input(f"\nAllocation method (score/risk_parity/mean_variance, default: {Config.ALLOCATION_METHOD}): ").strip().lower()
+    allocation_method = method_input or Config.ALLOCATION_METHOD
+    if allocation_method not in METHODS:
+        print(f"Error: Unknown allocation method '{allocation_method}'")
+        return 1
+    
     print(f"\n⚙ Analyzing portfolio of {len(stocks)} stocks...")
     print(f"  Stocks: {', '.join(stocks)}")
     print(f"  Portfolio Size: ${portfolio_size:,.0f}")
-    print(f"  Parallel Processing: {'Yes' if parallel else 'No'}")
+    if parallel and Config.PORTFOLIO_PROCESSES > 0:
+        print(f"  Parallel Processing: Yes ({Config.PORTFOLIO_PROCESSES} worker processes)")
+    else:
+        print(f"  Parallel Processing: {'Yes' if parallel else 'No'}")
+    print(f"  Allocation: {allocation_method}")
     print(f"  Model: {Config.LLM_MODEL}")
     print(f"  This may take several minutes...\n")
     
+    # Stream agent output in sequential mode; parallel analyses would interleave
+    printer = StreamPrinter() if Config.LLM_STREAM and not parallel else None
+    if printer:
+        set_stream_callback(printer)
+    
     try:
         # Create analyzer
-        analyzer = PortfolioAnalyzer(stocks, portfolio_size)
+        analyzer = PortfolioAnalyzer(stocks, portfolio_size, allocation_method=allocation_method)
         
         # Generate full report
-        report = analyzer.generate_full_report(parallel=parallel)
+        with track_tokens("portfolio") as usage:
+            report = analyzer.generate_full_report(parallel=parallel)
+        if printer:
+            printer.flush()
         
         # Print individual analyses
         print("\n" + "=" * 80)
@@ -139,14 +200,34 @@ def analyze_portfolio():
             print(f"{'─' * 80}")
             print(result)
         
+        # Print score ranking
+        if report["ranking"]:
+            print("\n" + "=" * 80)
+            print("RANKING BY SCORE".center(80))
+            print("=" * 80)
+            for i, decision in enumerate(report["ranking"], 1):
+                print(f"  {i}. {InvestmentDecision.from_dict(decision).summary_line()}")
+        
+        # Print computed allocation
+        print_report(Allocation(**report["allocation"]).table(), "COMPUTED ALLOCATION")
+        
         # Print portfolio analysis
         print_report(report["portfolio_analysis"], "PORTFOLIO ANALYSIS & ALLOCATION")
         
         print(f"\n✓ Portfolio analysis complete!")
         print(f"  Stocks analyzed: {len(stocks)}")
         print(f"  Portfolio size: ${portfolio_size:,.0f}")
+        print(format_usage(usage))
         print(f"  Performance logs: {Config.PROFILE_FILE}")
         
+        if revalidator.pending():
+            if Config.REVALIDATE_WAIT:
+                print("\n⚙ Waiting for background refresh of stale reports (Ctrl+C to skip)...")
+                revalidator.wait()
+            else:
+                print(f"\n⚠ {revalidator.pending()} background refresh(es) of stale reports stop on exit; "
+                      f"set REVALIDATE_WAIT=true to wait for them")
+        
         return 0
         
     except Exception as e:
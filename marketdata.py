@@ -0,0 +1,446 @@
+"""Local market-data store: OHLCV history in memory-mapped columns, plus indicators."""
+import csv
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from stock_research_crew.locks import InterProcessLock
+from stock_research_crew.symbols import normalize_ticker
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Optional; Parquet drops are skipped without it
+    pq = None
+
+FIELDS = ("open", "high", "low", "close", "volume")
+FUNDAMENTALS_STEM = "fundamentals"
+TRADING_DAYS = 252
+# Column name spellings accepted in drops, mapped to store fields
+_ALIASES = {
+    "date": "date", "timestamp": "date", "time": "date",
+    "symbol": "symbol", "ticker": "symbol",
+    "open": "open", "high": "high", "low": "low", "close": "close", "volume": "volume",
+    "adj close": "adj_close", "adj_close": "adj_close", "adjclose": "adj_close", "adjusted_close": "adj_close"
+}
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _read_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    """Rows of a CSV or Parquet drop, keyed by lowercased column name."""
+    columns = _read_columns(path)
+    names = list(columns)
+    for values in zip(*(columns[n] for n in names)):
+        yield dict(zip(names, values))
+
+
+def _read_columns(path: Path) -> Dict[str, List[Any]]:
+    """Columns of a CSV or Parquet drop, keyed by lowercased column name."""
+    if path.suffix.lower() == ".parquet":
+        return {n.strip().lower(): v for n, v in pq.read_table(str(path)).to_pydict().items()}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        rows = [row for row in reader if row]
+    width = len(header)
+    columns = list(zip(*(row[:width] + [""] * (width - len(row)) for row in rows))) if rows else [()] * width
+    return {name: list(column) for name, column in zip(header, columns)}
+
+
+def _floats(values: List[Any]) -> np.ndarray:
+    """Vectorized float conversion; blanks and junk become NaN."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_to_float(v) for v in values], dtype=np.float64)
+
+
+def _parse_prices(path: Path) -> Dict[str, Dict[str, np.ndarray]]:
+    """Per-symbol date-sorted OHLCV arrays from one drop file.
+
+    Files without a symbol column hold one symbol named by the file stem.
+    Adjusted close, when present, is used as close so returns include
+    splits and dividends.
+    """
+    raw = {_ALIASES.get(k, k): v for k, v in _read_columns(path).items()}
+    if not raw.get("date"):
+        return {}
+    count = len(raw["date"])
+    columns = {name: raw.get(name) or [None] * count for name in ("date", "symbol") + FIELDS}
+    if raw.get("adj_close"):
+        columns["close"] = [a if a not in (None, "") else c for a, c in zip(raw["adj_close"], columns["close"])]
+    present = np.array([bool(d) for d in columns["date"]])
+    if not present.all():
+        columns = {name: [v for v, p in zip(values, present) if p] for name, values in columns.items()}
+        if not columns["date"]:
+            return {}
+
+    dates = np.array([str(d)[:10] for d in columns["date"]], dtype="datetime64[D]").astype(np.int32)
+    values = {name: _floats(columns[name]) for name in FIELDS}
+    default_symbol = normalize_ticker(path.stem)
+    symbols = np.array([normalize_ticker(str(s)) if s else default_symbol for s in columns["symbol"]])
+
+    parsed = {}
+    for symbol in np.unique(symbols):
+        rows = np.flatnonzero(symbols == symbol)
+        # Sort by date; the last row wins for duplicate dates
+        rows = rows[np.argsort(dates[rows], kind="stable")]
+        keep = np.append(dates[rows][1:] != dates[rows][:-1], True)
+        rows = rows[keep]
+        parsed[str(symbol)] = {"date": dates[rows], **{name: values[name][rows] for name in FIELDS}}
+    return parsed
+
+
+def _parse_fundamentals(path: Path) -> Dict[str, Dict[str, Any]]:
+    """symbol -> {field: value}; numeric strings become floats."""
+    fundamentals = {}
+    for row in _read_rows(path):
+        symbol = row.pop("symbol", None) or row.pop("ticker", None)
+        if not symbol:
+            continue
+        values = {}
+        for key, value in row.items():
+            if value in (None, ""):
+                continue
+            number = _to_float(value)
+            values[key] = value if np.isnan(number) else number
+        fundamentals[normalize_ticker(str(symbol))] = values
+    return fundamentals
+
+
+def compute_indicators(dates: np.ndarray, close: np.ndarray, volume: np.ndarray) -> Dict[str, Any]:
+    """Returns, volatility, drawdown and moving averages from a close series."""
+    valid = ~np.isnan(close)
+    dates, close, volume = dates[valid], close[valid], volume[valid]
+    if len(close) < 2:
+        return {}
+    returns = close[1:] / close[:-1] - 1.0
+    running_max = np.maximum.accumulate(close)
+    drawdown = close / running_max - 1.0
+    cumsum = np.concatenate(([0.0], np.cumsum(close)))
+
+    def sma(window: int) -> Optional[float]:
+        return float((cumsum[-1] - cumsum[-window - 1]) / window) if len(close) >= window else None
+
+    def period_return(days: int) -> Optional[float]:
+        return float(close[-1] / close[-days - 1] - 1.0) if len(close) > days else None
+
+    def volatility(days: int) -> Optional[float]:
+        return float(returns[-days:].std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(returns) >= days else None
+
+    year = close[-TRADING_DAYS:]
+    return {
+        "start": str(np.datetime64(int(dates[0]), "D")),
+        "end": str(np.datetime64(int(dates[-1]), "D")),
+        "observations": int(len(close)),
+        "last_close": float(close[-1]),
+        "return_1m": period_return(21),
+        "return_3m": period_return(63),
+        "return_6m": period_return(126),
+        "return_1y": period_return(TRADING_DAYS),
+        "volatility_1m": volatility(21),
+        "volatility_1y": volatility(TRADING_DAYS),
+        "max_drawdown": float(drawdown.min()),
+        "current_drawdown": float(drawdown[-1]),
+        "sma_50": sma(50),
+        "sma_200": sma(200),
+        "high_52w": float(year.max()),
+        "low_52w": float(year.min()),
+        "avg_volume_20d": float(np.nanmean(volume[-20:])) if not np.isnan(volume[-20:]).all() else None
+    }
+
+
+class MarketDataStore:
+    """Price history and fundamentals ingested from local CSV/Parquet drops.
+
+    Each OHLCV field is one contiguous .npy column for all symbols, with
+    per-symbol [start, end) offsets in index.json. Opening the store reads
+    only the index; columns are memory-mapped on first use, so looking up a
+    symbol touches just its slice. Ingestion writes a new generation
+    directory and then swaps index.json, so readers never see a partial
+    store; only changed drop files are re-parsed. Readers notice a swap
+    (by another process too) on their next lookup, and superseded
+    generations are only deleted grace_period seconds after the swap.
+    """
+
+    def __init__(self, source_dir: Path, store_dir: Path, refresh_interval: float = 60.0,
+                 grace_period: float = 3600.0):
+        self.source_dir = Path(source_dir)
+        self.store_dir = Path(store_dir)
+        self.refresh_interval = refresh_interval
+        self.grace_period = grace_period
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Any]] = None
+        self._index_stamp: Optional[Tuple[int, int]] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._indicators: Dict[str, Dict[str, Any]] = {}
+        self._refreshed_at: Optional[float] = None
+
+    @property
+    def _index_file(self) -> Path:
+        return self.store_dir / "index.json"
+
+    def _sources(self) -> Dict[str, List[int]]:
+        """Drop file name -> [mtime_ns, size] for every CSV/Parquet file."""
+        if not self.source_dir.is_dir():
+            return {}
+        sources = {}
+        for entry in os.scandir(self.source_dir):
+            suffix = Path(entry.name).suffix.lower()
+            if entry.is_file() and (suffix == ".csv" or (suffix == ".parquet" and pq is not None)):
+                stat = entry.stat()
+                sources[entry.name] = [stat.st_mtime_ns, stat.st_size]
+        return sources
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self._index_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_index(self) -> Dict[str, Any]:
+        """Current index, re-read if another process has published a new generation.
+        
+        Caller holds the lock.
+        """
+        stamp = self._stamp()
+        if self._index is None or stamp != self._index_stamp:
+            try:
+                index = json.loads(self._index_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                index = {"generation": None, "symbols": {}, "sources": {}, "fundamentals": {}}
+            self._index, self._columns, self._indicators = index, {}, {}
+            self._index_stamp = stamp
+        return self._index
+
+    def _column(self, name: str) -> np.ndarray:
+        """Memory-mapped column of the current generation."""
+        column = self._columns.get(name)
+        if column is None:
+            path = self.store_dir / self._index["generation"] / f"{name}.npy"
+            column = self._columns[name] = np.load(path, mmap_mode="r")
+        return column
+
+    def refresh(self) -> bool:
+        """Ingest new or changed drop files; True if a new generation was written."""
+        with self._lock:
+            self._refreshed_at = time.time()
+            sources = self._sources()
+            if sources == self._load_index().get("sources"):
+                return False
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            with InterProcessLock(self.store_dir / "ingest.lock"):
+                # Another process may have ingested the same drops meanwhile
+                self._index = None
+                if sources == self._load_index().get("sources"):
+                    return False
+                self._ingest(sources)
+            return True
+
+    def _ingest(self, sources: Dict[str, List[int]]):
+        start_time = time.time()
+        old = self._index
+        fundamentals_files = [n for n in sources if Path(n).stem.lower() == FUNDAMENTALS_STEM]
+        price_files = [n for n in sources if n not in fundamentals_files]
+
+        # Unchanged files keep their parsed symbols from the current generation
+        series: Dict[str, Dict[str, np.ndarray]] = {}
+        symbol_files: Dict[str, List[str]] = {}
+        for name in price_files:
+            previous = old["sources"].get(name)
+            if previous == sources[name] and name in old.get("files", {}):
+                for symbol in old["files"][name]:
+                    series[symbol] = self._slice(symbol)
+                symbol_files[name] = old["files"][name]
+                continue
+            try:
+                parsed = _parse_prices(self.source_dir / name)
+            except Exception as e:
+                logger.error(f"Failed to ingest {name}: {e}")
+                parsed = {}
+            series.update(parsed)
+            symbol_files[name] = sorted(parsed)
+
+        fundamentals: Dict[str, Dict[str, Any]] = {}
+        for name in fundamentals_files:
+            try:
+                fundamentals.update(_parse_fundamentals(self.source_dir / name))
+            except Exception as e:
+                logger.error(f"Failed to ingest {name}: {e}")
+
+        generation = f"gen-{time.time_ns()}-{os.getpid()}"
+        gen_dir = self.store_dir / generation
+        gen_dir.mkdir(parents=True)
+        symbols, offset = {}, 0
+        ordered = sorted(series)
+        for symbol in ordered:
+            length = len(series[symbol]["date"])
+            symbols[symbol] = [offset, offset + length]
+            offset += length
+        for name in ("date",) + FIELDS:
+            dtype = np.int32 if name == "date" else np.float64
+            column = (np.concatenate([series[s][name] for s in ordered]).astype(dtype)
+                      if ordered else np.empty(0, dtype=dtype))
+            np.save(gen_dir / f"{name}.npy", column)
+
+        index = {"generation": generation, "symbols": symbols, "sources": sources,
+                 "files": symbol_files, "fundamentals": fundamentals}
+        tmp = self._index_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index), encoding="utf-8")
+        tmp.replace(self._index_file)
+
+        self._prune_generations(generation)
+        self._index, self._columns, self._indicators = index, {}, {}
+        self._index_stamp = self._stamp()
+        logger.info(f"Ingested {len(symbols)} symbols ({offset} rows) from {len(sources)} files "
+                    f"in {time.time() - start_time:.2f}s")
+
+    def _prune_generations(self, current: str):
+        """Delete generations superseded more than grace_period ago.
+        
+        Readers still on an older index switch on their next lookup, well
+        within the grace period, so they never map a deleted column.
+        """
+        def created(name: str) -> int:
+            try:
+                return int(name.split("-")[1])
+            except (IndexError, ValueError):
+                return 0
+
+        names = sorted((e.name for e in self.store_dir.glob("gen-*")), key=created)
+        now = time.time_ns()
+        for name, successor in zip(names, names[1:]):
+            # A generation is superseded when the next one is created
+            if name != current and now - created(successor) > self.grace_period * 1e9:
+                shutil.rmtree(self.store_dir / name, ignore_errors=True)
+
+    def _ensure_ready(self) -> Dict[str, Any]:
+        """Current index, ingesting changed drops at most every refresh_interval."""
+        if self._refreshed_at is None or time.time() - self._refreshed_at >= self.refresh_interval:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Market data refresh failed: {e}")
+                self._refreshed_at = time.time()
+        with self._lock:
+            return self._load_index()
+
+    def _slice(self, symbol: str) -> Dict[str, np.ndarray]:
+        start, end = self._index["symbols"][symbol]
+        return {name: self._column(name)[start:end] for name in ("date",) + FIELDS}
+
+    def symbols(self) -> List[str]:
+        return list(self._ensure_ready()["symbols"])
+
+    def has(self, symbol: str) -> bool:
+        return normalize_ticker(symbol) in self._ensure_ready()["symbols"]
+
+    def history(self, symbol: str) -> Optional[Dict[str, np.ndarray]]:
+        """Read-only date (days since epoch) and OHLCV arrays for symbol."""
+        symbol = normalize_ticker(symbol)
+        self._ensure_ready()
+        with self._lock:
+            # Same index for the lookup and the slice, even if a new one was published
+            if symbol not in self._load_index()["symbols"]:
+                return None
+            try:
+                return self._slice(symbol)
+            except FileNotFoundError:
+                # Generation deleted under a reader that outlived the grace period
+                self._index = None
+                if symbol not in self._load_index()["symbols"]:
+                    return None
+                return self._slice(symbol)
+
+    def dated_returns(self, symbol: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Daily close-to-close returns and the date each one ends on."""
+        history = self.history(symbol)
+        if history is None:
+            return None
+        valid = ~np.isnan(history["close"])
+        dates, close = history["date"][valid], history["close"][valid]
+        return dates[1:], close[1:] / close[:-1] - 1.0
+
+    def returns(self, symbol: str, days: Optional[int] = None) -> Optional[np.ndarray]:
+        """Daily close-to-close returns, the most recent days of them if given."""
+        dated = self.dated_returns(symbol)
+        if dated is None:
+            return None
+        returns = dated[1]
+        return returns[-days:] if days else returns
+
+    def fundamentals(self, symbol: str) -> Dict[str, Any]:
+        return dict(self._ensure_ready()["fundamentals"].get(normalize_ticker(symbol), {}))
+
+    def indicators(self, symbol: str) -> Dict[str, Any]:
+        """Indicators for symbol (empty without history), computed once per generation."""
+        symbol = normalize_ticker(symbol)
+        self._ensure_ready()
+        with self._lock:
+            # A reload swaps in a fresh dict, so results never outlive their generation
+            indicators = self._indicators
+        cached = indicators.get(symbol)
+        if cached is not None:
+            return cached
+        history = self.history(symbol)
+        result = compute_indicators(history["date"], history["close"], history["volume"]) if history else {}
+        indicators[symbol] = result
+        return result
+
+    def describe(self, symbol: str) -> str:
+        """Compact text summary of indicators and fundamentals for an agent."""
+        symbol = normalize_ticker(symbol)
+        ind, fundamentals = self.indicators(symbol), self.fundamentals(symbol)
+        if not ind and not fundamentals:
+            return f"No local market data for {symbol}."
+
+        def pct(value, sign="+"):
+            return "n/a" if value is None else f"{value:{sign}.1%}"
+
+        lines = []
+        if ind:
+            lines += [
+                f"{symbol} price history {ind['start']} to {ind['end']} ({ind['observations']} days), "
+                f"last close {ind['last_close']:.2f}",
+                f"Returns: 1M {pct(ind['return_1m'])}, 3M {pct(ind['return_3m'])}, "
+                f"6M {pct(ind['return_6m'])}, 1Y {pct(ind['return_1y'])}",
+                f"Annualized volatility: 1M {pct(ind['volatility_1m'], '')}, 1Y {pct(ind['volatility_1y'], '')}",
+                f"Drawdown: max {pct(ind['max_drawdown'])}, current {pct(ind['current_drawdown'])}",
+                f"52-week range {ind['low_52w']:.2f} - {ind['high_52w']:.2f}"
+            ]
+            averages = [f"{name.upper()} {ind[name]:.2f}" for name in ("sma_50", "sma_200") if ind[name] is not None]
+            if averages:
+                lines[-1] += "; " + ", ".join(averages)
+        if fundamentals:
+            lines.append("Fundamentals: " + ", ".join(
+                f"{key} {value:,.4g}" if isinstance(value, float) else f"{key} {value}"
+                for key, value in fundamentals.items()
+            ))
+        return "\n".join(lines)
+
+
+# Singleton instance
+market_store = MarketDataStore(Config.MARKET_DATA_DIR, Config.MARKET_STORE_DIR,
+                               refresh_interval=Config.MARKET_DATA_REFRESH_S,
+                               grace_period=Config.MARKET_STORE_GRACE_S)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    changed = market_store.refresh()
+    print(f"{'Ingested' if changed else 'Up to date'}: {len(market_store.symbols())} symbols "
+          f"from {Config.MARKET_DATA_DIR}")
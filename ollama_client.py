@@ -0,0 +1,171 @@
+"""Ollama client with pooled keep-alive HTTP connections, blocking or async."""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+import httpx
+from stock_research_crew.tokens import backend_usage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Model parameters Ollama accepts under "options"; any other name is rejected
+OLLAMA_OPTIONS = frozenset({
+    "temperature", "top_k", "top_p", "min_p", "typical_p", "tfs_z", "seed", "stop",
+    "num_predict", "num_keep", "num_ctx", "num_batch", "num_thread", "num_gpu", "main_gpu",
+    "repeat_last_n", "repeat_penalty", "presence_penalty", "frequency_penalty",
+    "penalize_newline", "mirostat", "mirostat_tau", "mirostat_eta", "use_mmap", "numa"
+})
+# OpenAI-style names callers commonly pass for Ollama options
+_OPTION_ALIASES = {"max_tokens": "num_predict"}
+
+
+def is_ollama_option(name: str) -> bool:
+    """Whether name (or its alias) is an Ollama model option."""
+    return _OPTION_ALIASES.get(name, name) in OLLAMA_OPTIONS
+
+
+def ollama_model_name(model: str) -> str:
+    """Strip the LiteLLM provider prefix: 'ollama/mistral' -> 'mistral'."""
+    for prefix in ("ollama_chat/", "ollama/"):
+        if model.startswith(prefix):
+            return model[len(prefix):]
+    return model
+
+
+def chunk_text(chunk: Dict[str, Any]) -> str:
+    """Text of one /api/generate or /api/chat response (or streamed chunk)."""
+    if "message" in chunk:
+        return (chunk.get("message") or {}).get("content", "")
+    return chunk.get("response", "")
+
+
+class _ConnectionPools:
+    """HTTP clients for one Ollama host, shared by the per-model OllamaClients."""
+
+    def __init__(self, base_url: str, timeout: httpx.Timeout, limits: httpx.Limits):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limits = limits
+        self.client: Optional[httpx.AsyncClient] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sync_client: Optional[httpx.Client] = None
+        self.lock = threading.Lock()
+
+    def get_async(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.client is None or self.loop is not loop or self.client.is_closed:
+                self.client = httpx.AsyncClient(
+                    base_url=self.base_url, timeout=self.timeout, limits=self.limits
+                )
+                self.loop = loop
+            return self.client
+
+    def get_sync(self) -> httpx.Client:
+        with self.lock:
+            if self.sync_client is None:
+                self.sync_client = httpx.Client(
+                    base_url=self.base_url, timeout=self.timeout, limits=self.limits
+                )
+            return self.sync_client
+
+
+class OllamaClient:
+    """Send completions to the Ollama HTTP API over shared connection pools.
+
+    Blocking calls share one thread-safe httpx.Client. An httpx.AsyncClient
+    belongs to the event loop it was first used on, so one is created
+    lazily per running loop and reused for every request made from that
+    loop. Clients for other models made with for_model share the pools.
+    """
+
+    def __init__(self, base_url: str, model: str, temperature: float = 0.2,
+                 timeout: float = 120, max_connections: int = 32,
+                 pools: Optional[_ConnectionPools] = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = ollama_model_name(model)
+        self.temperature = temperature
+        self._pools = pools or _ConnectionPools(
+            self.base_url,
+            httpx.Timeout(timeout, connect=min(10.0, timeout)),
+            httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    def for_model(self, model: str) -> "OllamaClient":
+        """Client for another model on the same host, sharing this client's connections."""
+        return OllamaClient(self.base_url, model, temperature=self.temperature, pools=self._pools)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        return self._pools.get_async()
+
+    def _get_sync_client(self) -> httpx.Client:
+        return self._pools.get_sync()
+
+    def _request(self, prompt: Union[str, List[Dict[str, Any]]], stream: bool,
+                 options: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Endpoint path and JSON body for a prompt string or a list of chat messages."""
+        unknown = sorted(name for name in options if not is_ollama_option(name))
+        if unknown:
+            raise TypeError(f"Unsupported Ollama options: {', '.join(unknown)}")
+        body_options = {"temperature": self.temperature}
+        for name, value in options.items():
+            if value is not None:
+                body_options[_OPTION_ALIASES.get(name, name)] = value
+        body = {"model": self.model, "stream": stream, "options": body_options}
+        if isinstance(prompt, str):
+            body["prompt"] = prompt
+            return "/api/generate", body
+        body["messages"] = prompt
+        return "/api/chat", body
+
+    async def complete(self, prompt: Union[str, List[Dict[str, Any]]], **options) -> str:
+        """Return the completion text for a prompt string or a list of chat messages."""
+        text, _ = await self.complete_with_usage(prompt, **options)
+        return text
+
+    async def complete_with_usage(self, prompt: Union[str, List[Dict[str, Any]]],
+                                  **options) -> Tuple[str, Optional[Dict[str, int]]]:
+        """complete() plus the prompt/completion token counts Ollama reports."""
+        path, body = self._request(prompt, False, options)
+        response = await self._get_client().post(path, json=body)
+        response.raise_for_status()
+        data = response.json()
+        return chunk_text(data), backend_usage(data)
+
+    def stream(self, prompt: Union[str, List[Dict[str, Any]]], **options) -> Iterator[Dict[str, Any]]:
+        """Yield response chunks as they are generated; the last has done=True and token counts."""
+        path, body = self._request(prompt, True, options)
+        with self._get_sync_client().stream("POST", path, json=body) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    async def astream(self, prompt: Union[str, List[Dict[str, Any]]], **options) -> AsyncIterator[Dict[str, Any]]:
+        """Async stream(): yield response chunks as they are generated."""
+        path, body = self._request(prompt, True, options)
+        async with self._get_client().stream("POST", path, json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+    async def aclose(self):
+        """Close the pooled connections of the current loop's async client."""
+        pools = self._pools
+        if pools.client is not None and not pools.client.is_closed:
+            await pools.client.aclose()
+        pools.client = None
+        pools.loop = None
+
+
+# Singleton instance
+ollama_client = OllamaClient(
+    Config.LLM_BASE_URL,
+    Config.LLM_MODEL,
+    temperature=Config.LLM_TEMPERATURE,
+    timeout=Config.LLM_TIMEOUT,
+    max_connections=Config.LLM_MAX_CONNECTIONS
+)
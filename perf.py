@@ -1,38 +1,206 @@
 """Improved performance wrappers with error handling and retries."""
+import json
 import time
+import asyncio
 import logging
-from typing import Any, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
 from functools import wraps
+from stock_research_crew.singleflight import SingleFlight
+from stock_research_crew.ollama_client import chunk_text, is_ollama_option
+from stock_research_crew.tokens import backend_usage, estimate_tokens, prompt_text, record_usage
+from stock_research_crew.resilience import CircuitBreaker, is_retryable, backoff_delay
+from stock_research_crew.limiter import LimiterTimeout
 from config import Config
 
+try:
+    from crewai import BaseLLM as _CrewAIBaseLLM
+except ImportError:  # Older CrewAI without custom LLM support
+    _CrewAIBaseLLM = object
+
 logger = logging.getLogger(__name__)
 
+# Agent/task on whose behalf LLM calls in this context are made
+current_caller: ContextVar[Optional[str]] = ContextVar("llm_caller", default=None)
+
+
+@contextmanager
+def llm_caller(name: str):
+    """Attribute LLM calls made inside the block to name (profile records, stream headers)."""
+    token = current_caller.set(name)
+    try:
+        yield
+    finally:
+        current_caller.reset(token)
+
+
+def _generation_stats(final: Dict[str, Any], chunks: int, generation: float) -> Dict[str, Any]:
+    """Generation time, tokens/sec and token counts from Ollama's final chunk when it reports them."""
+    usage = backend_usage(final)
+    tokens = usage["completion_tokens"] if usage else chunks
+    eval_s = (final.get("eval_duration") or 0) / 1e9 or generation
+    stats = {
+        "generation_s": round(generation, 3),
+        "tokens_per_s": round(tokens / eval_s, 2) if eval_s > 0 else None
+    }
+    if usage:
+        stats["usage"] = usage
+    return stats
+
+
+def _max_attempts() -> int:
+    """MAX_RETRIES attempts, but always at least one."""
+    return max(1, Config.MAX_RETRIES)
+
+
+# CrewAI bookkeeping arguments that mean nothing to a plain completion
+_CREWAI_CALL_ARGS = {"callbacks", "from_task", "from_agent"}
+
+
+def _uses_tools(kwargs: Dict[str, Any]) -> bool:
+    """True for CrewAI calls that may run native tool/function calling."""
+    return bool(kwargs.get("tools") or kwargs.get("available_functions"))
+
+
+def _client_options(args, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Ollama options for a call the Ollama client can send, or None if it needs the wrapped LLM.
+    
+    CrewAI's bookkeeping arguments are dropped; positional arguments or
+    any other parameter (tools, response formats) keep the call on the
+    wrapped LLM.
+    """
+    if args:
+        return None
+    options = {name: value for name, value in kwargs.items()
+               if name not in _CREWAI_CALL_ARGS and value is not None}
+    if not all(is_ollama_option(name) for name in options):
+        return None
+    return options
+
+
+def _cache_text(messages: Any) -> str:
+    """Stable prompt-cache text for a prompt string or a list of chat messages."""
+    if isinstance(messages, str):
+        return messages
+    return json.dumps(messages, sort_keys=True, default=str)
 
-class TimingLLM:
-    """Wrapper to time LLM calls and log performance."""
+
+class _WrappedLLM(_CrewAIBaseLLM):
+    """Base for the LLM wrappers: delegates everything it does not override.
+    
+    Subclassing CrewAI's BaseLLM makes agents use the wrapper itself; any
+    other object only contributes its model name to a new, unwrapped LLM.
+    Stop words that CrewAI sets on the agent's LLM go to the wrapped LLM.
+    """
     
     def __init__(self, llm, model_name: str = ""):
         self._llm = llm
         self.model_name = model_name
+        if _CrewAIBaseLLM is not object:
+            # BaseLLM assigns stop through our setter; hand it the wrapped LLM's
+            # own stop words so wrapping does not clear them
+            super().__init__(model=model_name, temperature=Config.LLM_TEMPERATURE,
+                             stop=getattr(llm, "stop", None))
+    
+    def __getattr__(self, name: str) -> Any:
+        llm = self.__dict__.get("_llm")
+        if llm is None or name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(llm, name)
+    
+    @property
+    def stop(self):
+        return getattr(self._llm, "stop", None)
+    
+    @stop.setter
+    def stop(self, value):
+        self._llm.stop = value
+    
+    def supports_function_calling(self) -> bool:
+        return self._llm.supports_function_calling()
+    
+    def supports_stop_words(self) -> bool:
+        return self._llm.supports_stop_words()
+    
+    def get_context_window_size(self) -> int:
+        return self._llm.get_context_window_size()
+
+
+class TimingLLM(_WrappedLLM):
+    """Wrapper to time LLM calls and log performance.
+    
+    acall/agenerate send requests through client (an OllamaClient) when
+    one is given; otherwise they use the wrapped LLM's own coroutine, or
+    run the blocking call in a worker thread. stream/astream also need the
+    client; with a stream callback set (and LLM_STREAM on) blocking calls
+    stream too.
+    
+    Every attempt waits for a slot from limiter (an AdaptiveLimiter shared
+    across wrappers) and a token from rate_limiter when they are set, and
+    is refused up front while breaker (a CircuitBreaker) is open.
+    """
+    
+    def __init__(self, llm, model_name: str = "", client=None,
+                 limiter=None, rate_limiter=None, breaker=None):
+        super().__init__(llm, model_name)
+        self._client = client
+        self._limiter = limiter
+        self._rate_limiter = rate_limiter
+        self._breaker = breaker
         self._log_callback = None
+        self.stream_callback: Optional[Callable[[Optional[str], str], None]] = None
     
     def set_log_callback(self, callback):
         """Set callback for logging profile data."""
         self._log_callback = callback
     
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._llm, name)
+    def set_stream_callback(self, callback: Optional[Callable[[Optional[str], str], None]]):
+        """Set callback(caller, text) receiving streamed output as it is generated."""
+        self.stream_callback = callback
     
-    def _record(self, prompt: str, duration: float, response: str, caller: str = None):
-        """Record timing information."""
+    def _record(self, prompt: str, duration: float, response: str, caller: str = None,
+                stream_stats: Optional[Dict[str, Any]] = None,
+                usage: Optional[Dict[str, int]] = None):
+        """Record timing and token information.
+        
+        Token counts come from the backend response when it reports them
+        (token_source "backend"), otherwise from a local estimate. Streamed
+        calls add ttft_s (call start to first token, including limiter
+        queueing and retries) and generation_s; their tokens_per_s is the
+        generation rate, for other calls it is completion tokens over
+        duration_s. Tokens are also added to the current track_tokens run.
+        """
+        caller = caller or current_caller.get()
+        stream_stats = dict(stream_stats or {})
+        usage = usage or stream_stats.pop("usage", None) or backend_usage(response)
+        estimated = usage is None
+        if estimated:
+            usage = {
+                "prompt_tokens": estimate_tokens(prompt_text(prompt)),
+                "completion_tokens": estimate_tokens(str(response))
+            }
+        
         info = {
             "time": time.time(),
             "duration_s": round(duration, 3),
             "model": self.model_name,
             "caller": caller,
-            "prompt_preview": prompt[:200],
-            "response_len": len(str(response))
+            "prompt_preview": prompt_text(prompt)[:200],
+            "response_len": len(str(response)),
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"],
+            "token_source": "estimate" if estimated else "backend",
+            "tokens_per_s": round(usage["completion_tokens"] / duration, 2) if duration > 0 else None
         }
+        info.update(stream_stats)
+        record_usage(caller, self.model_name, usage["prompt_tokens"], usage["completion_tokens"],
+                     duration, estimated)
+        if self._limiter is not None:
+            info["concurrency_limit"] = self._limiter.limit
+        if self._breaker is not None:
+            info["circuit_state"] = self._breaker.state
         
         if self._log_callback:
             try:
@@ -40,23 +208,246 @@ class TimingLLM:
             except Exception as e:
                 logger.error(f"Failed to log profile: {e}")
     
+    def _attempt(self, deadline: float, func, *args, **kwargs):
+        """One call, admitted by the rate and concurrency limiters before deadline."""
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(timeout=max(0.0, deadline - time.monotonic()))
+        if self._limiter is None:
+            return func(*args, **kwargs)
+        with self._limiter.slot(timeout=max(0.0, deadline - time.monotonic())):
+            return func(*args, **kwargs)
+    
+    async def _aattempt(self, func, *args, **kwargs):
+        if self._rate_limiter is not None:
+            await self._rate_limiter.aacquire()
+        if self._limiter is None:
+            return await func(*args, **kwargs)
+        async with self._limiter.slot():
+            return await func(*args, **kwargs)
+    
+    def _on_error(self, e: Exception, attempt: int, deadline: float,
+                  can_retry: bool = True) -> Optional[float]:
+        """Record a failed attempt; return the delay before retrying, or None to give up."""
+        retryable = is_retryable(e)
+        if self._breaker is not None:
+            # A non-retryable error still means the backend answered
+            if retryable:
+                self._breaker.record_failure()
+            else:
+                self._breaker.record_success()
+        if not retryable:
+            logger.error(f"LLM call failed with non-retryable error: {e}")
+            return None
+        if not can_retry:
+            logger.error(f"LLM stream failed after output was shown; not retrying: {e}")
+            return None
+        if attempt >= _max_attempts() - 1:
+            logger.error(f"LLM call failed after {attempt + 1} attempts")
+            return None
+        if self._breaker is not None and self._breaker.state == CircuitBreaker.OPEN:
+            logger.error(f"LLM backend unhealthy; not retrying: {e}")
+            return None
+        delay = backoff_delay(attempt, Config.LLM_RETRY_BASE_DELAY_S, Config.LLM_RETRY_MAX_DELAY_S)
+        if time.monotonic() + delay >= deadline:
+            logger.error(f"LLM retry budget of {Config.LLM_RETRY_BUDGET_S}s exhausted after {attempt + 1} attempts")
+            return None
+        logger.warning(f"LLM call failed (attempt {attempt + 1}/{_max_attempts()}), retrying in {delay:.1f}s: {e}")
+        return delay
+    
     def _execute_with_retry(self, func, *args, **kwargs):
-        """Execute function with retry logic."""
-        last_error = None
+        """Execute function with retry logic.
+        
+        Only retryable errors are retried, with jittered exponential backoff,
+        and never past LLM_RETRY_BUDGET_S from the first attempt.
+        """
+        return self._retry(lambda deadline: self._attempt(deadline, func, *args, **kwargs))
+    
+    def _retry(self, attempt_func: Callable[[float], Any], can_retry: Callable[[], bool] = None):
+        """Run attempt_func(deadline) until it succeeds or retrying stops; can_retry() can veto a retry."""
+        deadline = time.monotonic() + Config.LLM_RETRY_BUDGET_S
+        
+        for attempt in range(_max_attempts()):
+            if self._breaker is not None:
+                self._breaker.allow()
+            try:
+                result = attempt_func(deadline)
+            except LimiterTimeout:
+                # The budget ran out while queued; the backend was never called
+                if self._breaker is not None:
+                    self._breaker.release()
+                logger.error(f"LLM retry budget of {Config.LLM_RETRY_BUDGET_S}s exhausted waiting for a slot")
+                raise
+            except Exception as e:
+                delay = self._on_error(e, attempt, deadline, can_retry() if can_retry else True)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the backend, free a half-open probe
+                if self._breaker is not None:
+                    self._breaker.release()
+                raise
+            if self._breaker is not None:
+                self._breaker.record_success()
+            return result
+    
+    async def _aexecute_with_retry(self, func, *args, **kwargs):
+        """Await coroutine function with the same retry logic as _execute_with_retry.
+        
+        Each attempt is also cancelled once the remaining budget runs out.
+        """
+        return await self._aretry(lambda: self._aattempt(func, *args, **kwargs))
+    
+    async def _aretry(self, attempt_func: Callable[[], Any], can_retry: Callable[[], bool] = None):
+        """Async _retry(); attempt_func returns a coroutine."""
+        deadline = time.monotonic() + Config.LLM_RETRY_BUDGET_S
         
-        for attempt in range(Config.MAX_RETRIES):
+        for attempt in range(_max_attempts()):
+            if self._breaker is not None:
+                self._breaker.allow()
             try:
-                return func(*args, **kwargs)
+                result = await asyncio.wait_for(
+                    attempt_func(),
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
             except Exception as e:
-                last_error = e
-                logger.warning(f"LLM call failed (attempt {attempt + 1}/{Config.MAX_RETRIES}): {e}")
-                if attempt < Config.MAX_RETRIES - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
+                delay = self._on_error(e, attempt, deadline, can_retry() if can_retry else True)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: no verdict on the backend, free a half-open probe
+                if self._breaker is not None:
+                    self._breaker.release()
+                raise
+            if self._breaker is not None:
+                self._breaker.record_success()
+            return result
+    
+    def _async_func(self, method: str, usage: Dict[str, int]):
+        """Coroutine function that performs one attempt of an async call.
+        
+        Token counts reported by the Ollama client are stored in usage.
+        Calls with arguments the client does not take go to the wrapped LLM.
+        """
+        native = getattr(self._llm, method, None)
+        if native is not None and asyncio.iscoroutinefunction(native):
+            fallback = native
+        else:
+            sync = getattr(self._llm, "generate", self._llm) if method == "agenerate" else self._llm
+            
+            async def fallback(*args, **kwargs):
+                return await asyncio.to_thread(sync, *args, **kwargs)
+        if self._client is None:
+            return fallback
         
-        logger.error(f"LLM call failed after {Config.MAX_RETRIES} attempts")
-        raise last_error
+        async def complete(prompt, *args, **kwargs):
+            options = _client_options(args, kwargs)
+            if options is None:
+                return await fallback(prompt, *args, **kwargs)
+            text, reported = await self._client.complete_with_usage(prompt, **options)
+            usage.clear()
+            usage.update(reported or {})
+            return text
+        return complete
+    
+    def will_stream(self, args=(), kwargs: Dict[str, Any] = None) -> bool:
+        """Whether a blocking call with these arguments is streamed to the stream callback."""
+        return (Config.LLM_STREAM and self.stream_callback is not None and self._client is not None
+                and _client_options(args, kwargs or {}) is not None)
+    
+    def _stop_options(self) -> Dict[str, Any]:
+        """The agent's stop words as an Ollama option, for calls sent by the client."""
+        stop = self.stop
+        return {"stop": list(stop)} if stop else {}
+    
+    def _consume_stream(self, chunks, start: float, caller: Optional[str],
+                        on_chunk, stats: Dict[str, Any]) -> str:
+        """Collect one streamed attempt, passing text to on_chunk and filling stats."""
+        parts = []
+        final: Dict[str, Any] = {}
+        first = None
+        for chunk in chunks:
+            text = chunk_text(chunk)
+            if text:
+                if first is None:
+                    first = time.time()
+                    stats["ttft_s"] = round(first - start, 3)
+                parts.append(text)
+                if on_chunk:
+                    on_chunk(caller, text)
+            if chunk.get("done"):
+                final = chunk
+        stats.update(_generation_stats(final, len(parts), time.time() - (first or time.time())))
+        return "".join(parts)
+    
+    async def _aconsume_stream(self, chunks, start: float, caller: Optional[str],
+                               on_chunk, stats: Dict[str, Any]) -> str:
+        parts = []
+        final: Dict[str, Any] = {}
+        first = None
+        async for chunk in chunks:
+            text = chunk_text(chunk)
+            if text:
+                if first is None:
+                    first = time.time()
+                    stats["ttft_s"] = round(first - start, 3)
+                parts.append(text)
+                if on_chunk:
+                    on_chunk(caller, text)
+            if chunk.get("done"):
+                final = chunk
+        stats.update(_generation_stats(final, len(parts), time.time() - (first or time.time())))
+        return "".join(parts)
+    
+    def stream(self, prompt: str, caller: str = None, on_chunk=None, **kwargs) -> str:
+        """Stream a completion to on_chunk(caller, text) (default: the stream callback); return the full text."""
+        if self._client is None:
+            raise RuntimeError(f"Streaming needs an Ollama client; model {self.model_name} has none")
+        caller = caller or current_caller.get()
+        on_chunk = on_chunk or self.stream_callback
+        start = time.time()
+        stats: Dict[str, Any] = {}
+        try:
+            # Chunks already shown cannot be taken back, so only retry before the first one
+            result = self._retry(
+                lambda deadline: self._attempt(
+                    deadline, lambda: self._consume_stream(self._client.stream(prompt, **kwargs), start, caller, on_chunk, stats)
+                ),
+                can_retry=lambda: "ttft_s" not in stats
+            )
+            self._record(prompt, time.time() - start, result, caller=caller, stream_stats=stats)
+            return result
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            raise
+    
+    async def astream(self, prompt: str, caller: str = None, on_chunk=None, **kwargs) -> str:
+        """Async stream()."""
+        if self._client is None:
+            raise RuntimeError(f"Streaming needs an Ollama client; model {self.model_name} has none")
+        caller = caller or current_caller.get()
+        on_chunk = on_chunk or self.stream_callback
+        start = time.time()
+        stats: Dict[str, Any] = {}
+        try:
+            result = await self._aretry(
+                lambda: self._aattempt(
+                    lambda: self._aconsume_stream(self._client.astream(prompt, **kwargs), start, caller, on_chunk, stats)
+                ),
+                can_retry=lambda: "ttft_s" not in stats
+            )
+            self._record(prompt, time.time() - start, result, caller=caller, stream_stats=stats)
+            return result
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            raise
     
     def __call__(self, prompt: str, *args, caller: str = None, **kwargs):
+        if self.will_stream(args, kwargs):
+            return self.stream(prompt, caller=caller, **_client_options(args, kwargs))
         start = time.time()
         try:
             result = self._execute_with_retry(self._llm, prompt, *args, **kwargs)
@@ -67,7 +458,27 @@ class TimingLLM:
             logger.error(f"LLM call failed: {e}")
             raise
     
+    def call(self, messages, *args, caller: str = None, **kwargs):
+        """CrewAI's entry point: call(messages, tools=..., callbacks=..., ...).
+        
+        Plain completions stream through the Ollama client when streaming is
+        on (CrewAI's callbacks are not used there; tokens are counted here).
+        Calls with tools go to the wrapped LLM's call.
+        """
+        if self.will_stream(args, kwargs):
+            return self.stream(messages, caller=caller, **{**self._stop_options(), **_client_options(args, kwargs)})
+        start = time.time()
+        try:
+            result = self._execute_with_retry(self._llm.call, messages, *args, **kwargs)
+            self._record(messages, time.time() - start, result, caller=caller)
+            return result
+        except Exception as e:
+            logger.error(f"LLM call failed: {e}")
+            raise
+    
     def generate(self, prompt: str, *args, caller: str = None, **kwargs):
+        if self.will_stream(args, kwargs):
+            return self.stream(prompt, caller=caller, **_client_options(args, kwargs))
         start = time.time()
         try:
             if hasattr(self._llm, "generate"):
@@ -81,18 +492,45 @@ class TimingLLM:
         except Exception as e:
             logger.error(f"LLM generate failed: {e}")
             raise
+    
+    async def acall(self, prompt: str, *args, caller: str = None, **kwargs):
+        start = time.time()
+        try:
+            usage: Dict[str, int] = {}
+            result = await self._aexecute_with_retry(self._async_func("acall", usage), prompt, *args, **kwargs)
+            duration = time.time() - start
+            self._record(prompt, duration, result, caller=caller, usage=usage or None)
+            return result
+        except Exception as e:
+            logger.error(f"LLM call failed: {e}")
+            raise
+    
+    async def agenerate(self, prompt: str, *args, caller: str = None, **kwargs):
+        start = time.time()
+        try:
+            usage: Dict[str, int] = {}
+            result = await self._aexecute_with_retry(self._async_func("agenerate", usage), prompt, *args, **kwargs)
+            duration = time.time() - start
+            self._record(prompt, duration, result, caller=caller, usage=usage or None)
+            return result
+        except Exception as e:
+            logger.error(f"LLM generate failed: {e}")
+            raise
+
 
+class CachingLLM(_WrappedLLM):
+    """Wrapper to cache LLM responses.
 
-class CachingLLM:
-    """Wrapper to cache LLM responses."""
+    Identical prompts issued while the first is still running wait for
+    its response instead of sending a second request.
+    """
     
     def __init__(self, timing_llm: TimingLLM, model_name: str = "", cache_manager=None):
-        self._llm = timing_llm
-        self.model_name = model_name
+        super().__init__(timing_llm, model_name)
         self._cache_manager = cache_manager
-    
-    def __getattr__(self, name: str) -> Any:
-        return getattr(self._llm, name)
+        self._flight = SingleFlight("prompt")
+        if cache_manager:
+            self._flight.set_log_callback(cache_manager.log_profile)
     
     def _get_cached(self, prompt: str) -> Optional[str]:
         """Get cached response if available."""
@@ -112,28 +550,142 @@ class CachingLLM:
             except Exception as e:
                 logger.error(f"Failed to save to cache: {e}")
     
+    def _flight_label(self, prompt: str, caller: str = None) -> str:
+        return f"{caller or ''} {str(prompt)[:100]}".strip()
+    
+    def _call_once(self, method: str, prompt: str, func, caller: str = None,
+                   streamed: bool = False, on_chunk=None):
+        """Run func() for prompt, sharing the result with identical in-flight calls.
+        
+        Streamed calls only coalesce with each other (method "stream"); a
+        caller that joined someone else's stream gets the response in one piece.
+        """
+        led = []
+        
+        def run():
+            led.append(True)
+            result = func()
+            text = str(result) if not isinstance(result, str) else result
+            self._save_cached(prompt, text)
+            return result
+        
+        key = ("stream" if streamed else method, str(prompt))
+        result = self._flight.do(key, run, label=self._flight_label(prompt, caller))
+        if streamed and not led:
+            self._emit_cached(str(result), caller, on_chunk)
+        return result
+    
+    async def _acall_once(self, method: str, prompt: str, coro_func, caller: str = None,
+                          streamed: bool = False, on_chunk=None):
+        """Await coro_func() for prompt, sharing the result with identical in-flight calls."""
+        led = []
+        
+        async def run():
+            led.append(True)
+            result = await coro_func()
+            text = str(result) if not isinstance(result, str) else result
+            self._save_cached(prompt, text)
+            return result
+        
+        key = ("stream" if streamed else method, str(prompt))
+        result = await self._flight.ado(key, run, label=self._flight_label(prompt, caller))
+        if streamed and not led:
+            self._emit_cached(str(result), caller, on_chunk)
+        return result
+    
+    def _emit_cached(self, text: str, caller: str = None, on_chunk=None):
+        """Show a cached response to whoever is following the stream."""
+        if on_chunk is None and Config.LLM_STREAM:
+            on_chunk = getattr(self._llm, "stream_callback", None)
+        if on_chunk:
+            on_chunk(caller or current_caller.get(), text)
+    
     def __call__(self, prompt: str, *args, caller: str = None, **kwargs):
         cached = self._get_cached(prompt)
         if cached:
             logger.info(f"Using cached response for prompt (caller: {caller})")
+            self._emit_cached(cached, caller)
             return cached
         
-        result = self._llm(prompt, *args, caller=caller, **kwargs)
-        text = str(result) if not isinstance(result, str) else result
-        self._save_cached(prompt, text)
-        return result
+        return self._call_once(
+            "call", prompt, lambda: self._llm(prompt, *args, caller=caller, **kwargs), caller,
+            streamed=self._llm.will_stream(args, kwargs)
+        )
+    
+    def call(self, messages, *args, caller: str = None, **kwargs):
+        """CrewAI's entry point; calls that may run tools bypass the prompt cache."""
+        if _uses_tools(kwargs):
+            return self._llm.call(messages, *args, caller=caller, **kwargs)
+        prompt = _cache_text(messages)
+        cached = self._get_cached(prompt)
+        if cached:
+            logger.info(f"Using cached response for prompt (caller: {caller})")
+            self._emit_cached(cached, caller)
+            return cached
+        
+        return self._call_once(
+            "call", prompt, lambda: self._llm.call(messages, *args, caller=caller, **kwargs), caller,
+            streamed=self._llm.will_stream(args, kwargs)
+        )
     
     def generate(self, prompt: str, *args, caller: str = None, **kwargs):
         cached = self._get_cached(prompt)
         if cached:
             logger.info(f"Using cached response for generate (caller: {caller})")
+            self._emit_cached(cached, caller)
             return cached
         
         if hasattr(self._llm, "generate"):
-            result = self._llm.generate(prompt, *args, caller=caller, **kwargs)
+            func = lambda: self._llm.generate(prompt, *args, caller=caller, **kwargs)
         else:
-            result = self._llm(prompt, *args, caller=caller, **kwargs)
+            func = lambda: self._llm(prompt, *args, caller=caller, **kwargs)
+        return self._call_once("generate", prompt, func, caller, streamed=self._llm.will_stream(args, kwargs))
+    
+    async def acall(self, prompt: str, *args, caller: str = None, **kwargs):
+        cached = self._get_cached(prompt)
+        if cached:
+            logger.info(f"Using cached response for prompt (caller: {caller})")
+            return cached
         
-        text = str(result) if not isinstance(result, str) else result
-        self._save_cached(prompt, text)
-        return result
+        return await self._acall_once(
+            "call", prompt, lambda: self._llm.acall(prompt, *args, caller=caller, **kwargs), caller
+        )
+    
+    async def agenerate(self, prompt: str, *args, caller: str = None, **kwargs):
+        cached = self._get_cached(prompt)
+        if cached:
+            logger.info(f"Using cached response for generate (caller: {caller})")
+            return cached
+        
+        return await self._acall_once(
+            "generate", prompt, lambda: self._llm.agenerate(prompt, *args, caller=caller, **kwargs), caller
+        )
+    
+    def stream(self, prompt: str, caller: str = None, on_chunk=None, **kwargs) -> str:
+        """Streamed call; a cached response is passed to on_chunk in one piece."""
+        cached = self._get_cached(prompt)
+        if cached:
+            logger.info(f"Using cached response for stream (caller: {caller})")
+            self._emit_cached(cached, caller, on_chunk)
+            return cached
+        
+        return self._call_once(
+            "stream", prompt, lambda: self._llm.stream(prompt, caller=caller, on_chunk=on_chunk, **kwargs), caller,
+            streamed=True, on_chunk=on_chunk
+        )
+    
+    async def astream(self, prompt: str, caller: str = None, on_chunk=None, **kwargs) -> str:
+        cached = self._get_cached(prompt)
+        if cached:
+            logger.info(f"Using cached response for stream (caller: {caller})")
+            self._emit_cached(cached, caller, on_chunk)
+            return cached
+        
+        return await self._acall_once(
+            "stream", prompt, lambda: self._llm.astream(prompt, caller=caller, on_chunk=on_chunk, **kwargs), caller,
+            streamed=True, on_chunk=on_chunk
+        )
+    
+    def coalescing_stats(self):
+        """Counts of prompts sent and prompts that joined an in-flight call."""
+        return self._flight.stats()
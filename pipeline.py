@@ -0,0 +1,233 @@
+"""Stage-by-stage execution of the stock research tasks with per-stage caching."""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Set, Tuple
+from crewai import Agent, Crew, Task
+from stock_research_crew.tasks import (
+    research_task,
+    analysis_task,
+    risk_task,
+    investment_decision_task
+)
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.symbols import symbol_index
+from stock_research_crew.perf import llm_caller
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SECTION = """
+
+    Outputs from earlier stages of this analysis:
+
+    {upstream_context}
+    """
+
+
+class Stage:
+    """One task of the stock pipeline with its cache lifetime and upstream stages."""
+
+    def __init__(self, name: str, task: Task, ttl_hours: float, depends_on: List[str],
+                 agent: Agent = None):
+        self.name = name
+        self.task = task
+        self.ttl_hours = ttl_hours
+        self.depends_on = depends_on
+        self.agent = agent or task.agent
+        # Keep the uninterpolated prompt; CrewAI rewrites description on kickoff
+        self.description = getattr(task, "_original_description", None) or task.description
+
+    def build_task(self) -> Task:
+        """Create a fresh Task for one run of this stage."""
+        description = self.description
+        if self.depends_on:
+            description += CONTEXT_SECTION
+        return Task(
+            description=description,
+            expected_output=self.task.expected_output,
+            agent=self.agent
+        )
+
+
+def build_stages(parallel: bool) -> List[Stage]:
+    """The four stages; with parallel, research, analysis and risk are independent.
+    
+    Sequentially each stage sees every earlier output (the original crew's
+    context flow). In parallel mode only the decision joins the other three,
+    so a run takes about the slowest of them plus the decision.
+    """
+    return [
+        Stage("research", research_task, Config.RESEARCH_TTL_HOURS, []),
+        Stage("analysis", analysis_task, Config.ANALYSIS_TTL_HOURS, [] if parallel else ["research"]),
+        Stage("risk", risk_task, Config.RISK_TTL_HOURS, [] if parallel else ["research", "analysis"]),
+        Stage("decision", investment_decision_task, Config.DECISION_TTL_HOURS,
+              ["research", "analysis", "risk"]),
+    ]
+
+
+STAGES = build_stages(Config.ENABLE_PARALLEL_TASKS)
+
+
+def clone_agents(agents: List[Agent]) -> Dict[int, Agent]:
+    """id(agent) -> independent copy; LLM wrappers and tools stay shared.
+    
+    Some CrewAI versions copy the LLM in Agent.copy(); clones get the
+    original wrapper back, so every pipeline shares one per model.
+    """
+    clones = {}
+    for agent in agents:
+        clone = agent.copy()
+        if clone.llm is not agent.llm:
+            clone.llm = agent.llm
+        clones[id(agent)] = clone
+    return clones
+
+
+def clone_stages(stages: List[Stage]) -> List[Stage]:
+    """The stages with their own copies of the agents (one copy per distinct agent)."""
+    clones = clone_agents(list({id(s.agent): s.agent for s in stages}.values()))
+    return [Stage(s.name, s.task, s.ttl_hours, s.depends_on, agent=clones[id(s.agent)])
+            for s in stages]
+
+
+class StockPipeline:
+    """Run the analysis stages as a small DAG, reusing each stage's cached output until it expires.
+    
+    A stage starts as soon as the stages it depends on have finished, so
+    independent stages run concurrently on worker threads. It is rerun
+    when its own cache entry has expired or when any stage it depends on
+    was rerun in this pass; otherwise its cached output is reused as
+    context for the stages downstream.
+    """
+
+    def __init__(self, stages: List[Stage] = None):
+        self.stages = stages or STAGES
+
+    def _format_context(self, stage: Stage, outputs: Dict[str, str]) -> str:
+        return "\n\n".join(
+            f"=== {name.upper()} ===\n{outputs[name]}" for name in stage.depends_on
+        )
+
+    def _run_stage(self, stage: Stage, stock: str, outputs: Dict[str, str]) -> str:
+        """Execute a single stage as a one-task crew."""
+        task = stage.build_task()
+        crew = Crew(agents=[task.agent], tasks=[task], verbose=False)
+        name = symbol_index.display_name(stock)
+        inputs = {"stock": f"{name} ({stock})" if name != stock else stock}
+        if stage.depends_on:
+            inputs["upstream_context"] = self._format_context(stage, outputs)
+        with llm_caller(f"{stock} {stage.name}: {task.agent.role}"):
+            return str(crew.kickoff(inputs=inputs))
+
+    def _stage_output(self, stage: Stage, stock: str, outputs: Dict[str, str],
+                      rerun: Set[str], force: bool) -> Tuple[str, bool, float]:
+        """(output, rerun, expires_at) for stage, from the cache when allowed and valid."""
+        if not force and not rerun.intersection(stage.depends_on):
+            cached = cache_manager.get_task_entry(stock, stage.name)
+            if cached is not None:
+                logger.info(f"Reusing cached {stage.name} output for {stock}")
+                return cached["result"], False, cached["expires_at"]
+
+        logger.info(f"Running {stage.name} stage for {stock}")
+        output = self._run_stage(stage, stock, outputs)
+        cache_manager.save_task_result(stock, stage.name, output, stage.ttl_hours)
+        return output, True, time.time() + stage.ttl_hours * 3600
+
+    def run(self, stock: str, force: bool = False) -> Tuple[Dict[str, str], float]:
+        """Run the pipeline for stock; every stage's output and when the first of them expires.
+        
+        A report built from these outputs is only valid until then.
+        """
+        outputs: Dict[str, str] = {}
+        expires_at = float("inf")
+        rerun: Set[str] = set()
+        pending = list(self.stages)
+
+        with ThreadPoolExecutor(max_workers=len(self.stages),
+                                thread_name_prefix=f"stage-{stock}") as executor:
+            running: Dict[Future, Stage] = {}
+            while pending or running:
+                # Start every stage whose upstream stages have finished; each
+                # runs in a copy of this context so llm_caller/token tracking apply
+                for stage in [s for s in pending if all(d in outputs for d in s.depends_on)]:
+                    pending.remove(stage)
+                    future = executor.submit(contextvars.copy_context().run, self._stage_output,
+                                             stage, stock, dict(outputs), set(rerun), force)
+                    running[future] = stage
+                if not running:
+                    missing = {d for s in pending for d in s.depends_on} - {s.name for s in self.stages}
+                    raise ValueError(f"Stages depend on unknown stages: {', '.join(sorted(missing))}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    # A failed stage fails the run; stages already running finish first
+                    outputs[stage.name], was_rerun, stage_expires_at = future.result()
+                    expires_at = min(expires_at, stage_expires_at)
+                    if was_rerun:
+                        rerun.add(stage.name)
+
+        return outputs, expires_at
+
+
+class PipelinePool:
+    """Isolated pipelines, checked out one per concurrently analyzed stock.
+    
+    CrewAI agents keep per-run executor state, so two stocks must not run
+    through the same Agent objects at once. Every member after the first
+    (the template itself) gets its own copies of the agents; tasks are
+    already built fresh for each stage run. Members are built on demand
+    up to size and reused, and a checkout beyond that waits for a free one.
+    """
+
+    def __init__(self, template: StockPipeline, size: int):
+        self.template = template
+        self.size = max(1, size)
+        self._idle: List[StockPipeline] = []
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def _build(self) -> StockPipeline:
+        pipeline = self.template if not self._created else StockPipeline(clone_stages(self.template.stages))
+        self._created += 1
+        return pipeline
+
+    def ensure(self, count: int):
+        """Grow the pool to at least count members, building them now."""
+        with self._cond:
+            self.size = max(self.size, count)
+            while self._created < count:
+                self._idle.append(self._build())
+            self._cond.notify_all()
+
+    @contextmanager
+    def checkout(self) -> Iterator[StockPipeline]:
+        """Borrow a pipeline no other thread is using for the duration of the block."""
+        start = time.time()
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                self._cond.wait()
+            pipeline = self._idle.pop() if self._idle else self._build()
+        waited = time.time() - start
+        if waited > 0.01:
+            cache_manager.log_profile({"time": time.time(), "event": "pool_wait",
+                                       "wait_s": round(waited, 4), "size": self.size})
+        try:
+            yield pipeline
+        finally:
+            with self._cond:
+                self._idle.append(pipeline)
+                self._cond.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"size": self.size, "created": self._created, "idle": len(self._idle)}
+
+
+# Singleton instances
+stock_pipeline = StockPipeline()
+pipeline_pool = PipelinePool(stock_pipeline, Config.CREW_POOL_SIZE)
@@ -1,6 +1,7 @@
 """Portfolio-specific agents for multi-stock analysis."""
 from crewai import Agent
-from stock_research_crew.agents import llm
+from stock_research_crew.agents import llm_for
+from config import Config
 
 # Portfolio-level agent for comparative analysis
 portfolio_analyst = Agent(
@@ -10,7 +11,7 @@ portfolio_analyst = Agent(
         "Senior portfolio strategist with 20+ years experience in asset allocation and diversification. "
         "Expert at comparing stocks, identifying correlations, and building balanced portfolios."
     ),
-    llm=llm,
+    llm=llm_for(Config.PORTFOLIO_ANALYST_MODEL),
     verbose=False
 )
 
@@ -22,6 +23,6 @@ diversification_analyst = Agent(
         "Risk management expert specializing in portfolio construction and diversification strategies. "
         "Skilled at identifying concentration risks and recommending optimal allocation."
     ),
-    llm=llm,
+    llm=llm_for(Config.DIVERSIFICATION_ANALYST_MODEL),
     verbose=False
 )
@@ -1,69 +1,174 @@
 """Portfolio analyzer for batch processing multiple stocks."""
 import logging
-from typing import List, Dict
+import contextvars
+from typing import List, Dict, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from stock_research_crew.crew import stock_crew
+from stock_research_crew.crew import run_stock_analysis
+from stock_research_crew.pipeline import pipeline_pool
+from stock_research_crew.process_pool import analyze_in_processes
 from stock_research_crew.portfolio_crew import create_portfolio_crew
+from stock_research_crew.revalidate import revalidator
+from stock_research_crew.symbols import resolve_symbol
+from stock_research_crew.perf import llm_caller
 from stock_research_crew.cache import cache_manager
+from stock_research_crew.decision import InvestmentDecision, parse_decision, rank_decisions
+from stock_research_crew.allocation import Allocation, DatedReturns, allocate
+from stock_research_crew.marketdata import market_store
+from stock_research_crew.analytics import PortfolioAnalytics
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 
+def _decision_for(stock: str, result: str, stored: Optional[Dict] = None) -> Optional[InvestmentDecision]:
+    """Structured decision from the cached record, else parsed from the report text."""
+    if stored:
+        return InvestmentDecision.from_dict(stored)
+    return parse_decision(result, stock)
+
+
+def analyze_stock(stock: str) -> Dict:
+    """Analyze a single stock with caching (also the unit of work of worker processes)."""
+    try:
+        # Check cache first (a stale report is used while it refreshes, if enabled)
+        cached = revalidator.lookup(stock, run_stock_analysis)
+        if cached:
+            logger.info(f"Using {'stale' if cached['stale'] else 'cached'} result for {stock}")
+            return {"stock": stock, "result": cached["result"], "cached": True,
+                    "stale": cached["stale"],
+                    "decision": _decision_for(stock, cached["result"], cached.get("decision"))}
+        
+        # Run analysis
+        logger.info(f"Analyzing {stock}...")
+        output = run_stock_analysis(stock)
+        
+        return {"stock": stock, "result": output, "cached": False,
+                "decision": cache_manager.get_decision(stock) or parse_decision(output, stock)}
+        
+    except Exception as e:
+        logger.error(f"Failed to analyze {stock}: {e}")
+        return {"stock": stock, "result": None, "error": str(e)}
+
+
 class PortfolioAnalyzer:
     """Analyze multiple stocks and provide portfolio recommendations."""
     
-    def __init__(self, stocks: List[str], portfolio_size: float = 100000):
-        self.stocks = [s.strip().upper() for s in stocks]
+    def __init__(self, stocks: List[str], portfolio_size: float = 100000, max_workers: int = None,
+                 returns: Optional[Dict[str, DatedReturns]] = None, allocation_method: str = None,
+                 processes: int = None):
+        # Canonical tickers, so aliases of one company share a single analysis
+        self.stocks = list(dict.fromkeys(resolve_symbol(s) for s in stocks))
         self.portfolio_size = portfolio_size
+        # LLM concurrency is governed by the shared adaptive limiter, so
+        # extra workers only queue for LLM slots instead of overloading Ollama
+        self.max_workers = max_workers or Config.PORTFOLIO_WORKERS
+        # Worker processes for parallel mode; 0 uses threads
+        self.processes = Config.PORTFOLIO_PROCESSES if processes is None else processes
         self.individual_results = {}
+        self.decisions: Dict[str, InvestmentDecision] = {}
+        # (dates, daily returns) per stock for risk_parity/mean_variance;
+        # defaults to the local market-data store
+        self.returns = returns if returns is not None else self._stored_returns()
+        self.allocation_method = allocation_method
+        self.allocation: Optional[Allocation] = None
+        # Correlations and clusters over the local return history
+        self.analytics = PortfolioAnalytics()
+        self._add_analytics(self.stocks)
     
-    def analyze_single_stock(self, stock: str) -> Dict:
-        """Analyze a single stock with caching."""
+    def add_stocks(self, stocks: List[str]) -> List[str]:
+        """Add tickers to the portfolio; analytics only compute the new ones."""
+        new = [s for s in dict.fromkeys(resolve_symbol(s) for s in stocks) if s not in self.stocks]
+        self.stocks.extend(new)
+        self.returns.update(self._stored_returns(new))
+        self._add_analytics(new)
+        return new
+    
+    def _add_analytics(self, stocks: List[str]):
+        try:
+            self.analytics.add(stocks)
+        except Exception as e:
+            logger.error(f"Failed to compute portfolio analytics: {e}")
+    
+    def _stored_returns(self, stocks: List[str] = None) -> Dict[str, DatedReturns]:
+        returns = {}
         try:
-            # Check cache first
-            cached = cache_manager.get_cached_result(stock)
-            if cached:
-                logger.info(f"Using cached result for {stock}")
-                return {"stock": stock, "result": cached, "cached": True}
-            
-            # Run analysis
-            logger.info(f"Analyzing {stock}...")
-            result = stock_crew.kickoff(inputs={"stock": stock})
-            output = str(result)
-            
-            # Save to cache
-            cache_manager.save_result(stock, output)
-            
-            return {"stock": stock, "result": output, "cached": False}
-            
+            for stock in stocks or self.stocks:
+                history = market_store.dated_returns(stock)
+                if history is not None:
+                    returns[stock] = history
         except Exception as e:
-            logger.error(f"Failed to analyze {stock}: {e}")
-            return {"stock": stock, "result": None, "error": str(e)}
+            logger.error(f"Failed to read return history: {e}")
+        return returns
+    
+    def analyze_single_stock(self, stock: str) -> Dict:
+        """Analyze a single stock with caching."""
+        return analyze_stock(stock)
     
     def analyze_all_stocks(self, parallel: bool = False) -> Dict[str, str]:
         """Analyze all stocks in the portfolio."""
         logger.info(f"Analyzing {len(self.stocks)} stocks...")
         
-        if parallel and len(self.stocks) > 1:
-            # Parallel processing
-            with ThreadPoolExecutor(max_workers=min(3, len(self.stocks))) as executor:
-                futures = {executor.submit(self.analyze_single_stock, stock): stock 
+        if parallel and len(self.stocks) > 1 and self.processes > 0:
+            # Worker processes; results arrive as each ticker finishes
+            for result in analyze_in_processes(self.stocks, self.processes):
+                self._collect(result)
+        elif parallel and len(self.stocks) > 1:
+            # Parallel processing; every worker checks out its own pipeline
+            # (separate agents), so build them before the workers start
+            workers = min(self.max_workers, len(self.stocks))
+            pipeline_pool.ensure(workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Run each stock in a copy of this context so token usage
+                # rolls up into the caller's track_tokens run
+                futures = {executor.submit(contextvars.copy_context().run, self.analyze_single_stock, stock): stock
                           for stock in self.stocks}
                 
                 for future in as_completed(futures):
-                    result = future.result()
-                    if result.get("result"):
-                        self.individual_results[result["stock"]] = result["result"]
+                    self._collect(future.result())
         else:
             # Sequential processing
             for stock in self.stocks:
-                result = self.analyze_single_stock(stock)
-                if result.get("result"):
-                    self.individual_results[result["stock"]] = result["result"]
+                self._collect(self.analyze_single_stock(stock))
         
         return self.individual_results
     
+    def _collect(self, result: Dict):
+        if result.get("result"):
+            self.individual_results[result["stock"]] = result["result"]
+        if result.get("decision"):
+            self.decisions[result["stock"]] = result["decision"]
+    
+    def rank_stocks(self) -> List[InvestmentDecision]:
+        """Analyzed stocks with a structured decision, best total score first."""
+        return rank_decisions(list(self.decisions.values()))
+    
+    def allocate(self) -> Allocation:
+        """Compute position weights and amounts from the parsed scores."""
+        self.allocation = allocate(self.rank_stocks(), self.portfolio_size,
+                                   returns=self.returns, method=self.allocation_method)
+        for stock in self.individual_results:
+            if stock not in self.decisions:
+                self.allocation.excluded[stock] = "scores unavailable"
+        return self.allocation
+    
+    def _portfolio_context(self) -> str:
+        """Score table and reasoning bullets; full reports only for stocks without parsed scores."""
+        sections = ["RANKING BY TOTAL SCORE (computed from each stock's scores):"]
+        for i, decision in enumerate(self.rank_stocks(), 1):
+            sections.append(f"{i}. {decision.summary_line()}")
+            sections.extend(f"     - {reason}" for reason in decision.reasoning)
+        
+        unparsed = [stock for stock in self.individual_results if stock not in self.decisions]
+        for stock in unparsed:
+            sections.append(f"\n=== {stock} Analysis (scores unavailable) ===\n{self.individual_results[stock]}")
+        
+        sections.append("")
+        sections.append(self.analytics.summary_text(self._weights(), stocks=list(self.individual_results)))
+        return "\n".join(sections)
+    
+    def _weights(self) -> Optional[Dict[str, float]]:
+        return self.allocation.weights if self.allocation and self.allocation.weights else None
+    
     def analyze_portfolio(self) -> str:
         """Perform portfolio-level analysis."""
         if not self.individual_results:
@@ -74,17 +179,20 @@ class PortfolioAnalyzer:
         # Create portfolio crew with stock list
         portfolio_crew = create_portfolio_crew(list(self.individual_results.keys()), self.portfolio_size)
         
-        # Prepare context with all individual analyses
-        context = "\n\n".join([
-            f"=== {stock} Analysis ===\n{result}"
-            for stock, result in self.individual_results.items()
-        ])
+        # Weights are computed here; the LLM only explains them
+        allocation = self.allocate()
+        
+        # Compact score table and computed correlations/concentration
+        # instead of every full report
+        context = self._portfolio_context()
         
         # Run portfolio analysis
-        portfolio_result = portfolio_crew.kickoff(inputs={
-            "stocks": list(self.individual_results.keys()),
-            "context": context
-        })
+        with llm_caller("portfolio"):
+            portfolio_result = portfolio_crew.kickoff(inputs={
+                "stocks": list(self.individual_results.keys()),
+                "context": context,
+                "allocation": allocation.table()
+            })
         
         return str(portfolio_result)
     
@@ -98,6 +206,9 @@ class PortfolioAnalyzer:
         
         return {
             "individual_analyses": self.individual_results,
+            "ranking": [decision.to_dict() for decision in self.rank_stocks()],
+            "allocation": self.allocation.to_dict(),
+            "analytics": self.analytics.summary(self._weights(), stocks=list(self.individual_results)),
             "portfolio_analysis": portfolio_analysis,
             "stocks": self.stocks,
             "portfolio_size": self.portfolio_size
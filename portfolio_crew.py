@@ -1,17 +1,6 @@
 """Portfolio crew for analyzing multiple stocks."""
-from crewai import Crew
-from stock_research_crew.agents import (
-    market_researcher,
-    fundamental_analyst,
-    risk_manager,
-    investment_advisor
-)
-from stock_research_crew.tasks import (
-    research_task,
-    analysis_task,
-    risk_task,
-    investment_decision_task
-)
+from crewai import Crew, Task
+from stock_research_crew.pipeline import build_stages, clone_stages
 from stock_research_crew.portfolio_agents import portfolio_analyst, diversification_analyst
 from stock_research_crew.portfolio_tasks import (
     create_portfolio_comparison_task,
@@ -24,19 +13,18 @@ logger = logging.getLogger(__name__)
 
 
 def create_stock_crew_for_symbol(stock: str):
-    """Create a crew for analyzing a single stock."""
+    """Create a sequential single-stock crew with its own agents and tasks.
+    
+    Safe to kick off alongside other crews; run_stock_analysis uses the
+    pooled pipelines instead (see pipeline.PipelinePool).
+    """
+    stages = clone_stages(build_stages(parallel=False))
     return Crew(
-        agents=[
-            market_researcher,
-            fundamental_analyst,
-            risk_manager,
-            investment_advisor
-        ],
+        agents=[stage.agent for stage in stages],
         tasks=[
-            research_task,
-            analysis_task,
-            risk_task,
-            investment_decision_task
+            Task(description=stage.description, expected_output=stage.task.expected_output,
+                 agent=stage.agent)
+            for stage in stages
         ],
         verbose=False
     )
@@ -10,19 +10,23 @@ def create_portfolio_comparison_task(stocks: list):
         description=f"""
         Compare and analyze the following stocks: {stock_list}
         
+        Individual analysis results:
+        
+        {{context}}
+        
         For each stock, review the individual analysis and provide:
         
         1. COMPARATIVE ANALYSIS:
-           - Rank stocks by overall score (highest to lowest)
+           - Use the ranking above, computed from each stock's scores (do not re-score)
            - Compare business quality across stocks
            - Compare growth potential across stocks
            - Compare valuation attractiveness
            - Compare risk profiles
         
-        2. SECTOR & CORRELATION:
-           - Identify sector distribution
-           - Note any sector concentration
-           - Identify potential correlations between stocks
+        2. SECTOR & CORRELATION (use the computed analytics above; do not estimate):
+           - Interpret the sector weights and HHI concentration
+           - Interpret the most correlated pairs and correlated clusters
+           - For stocks without return history, note likely correlations qualitatively
         
         3. STRENGTHS & WEAKNESSES:
            - Best stock for growth
@@ -51,12 +55,16 @@ def create_portfolio_allocation_task(stocks: list, portfolio_size: float = 10000
         description=f"""
         Based on the comparative analysis of: {stock_list}
         
-        Provide portfolio allocation recommendations for a ${portfolio_size:,.0f} portfolio:
+        The allocation below for a ${portfolio_size:,.0f} portfolio was computed
+        deterministically from the stock scores (and return history, when available):
+        
+        {{allocation}}
+        
+        Do not change the percentages or amounts. Explain the allocation:
         
-        1. RECOMMENDED ALLOCATION:
-           - Percentage allocation for each stock
-           - Dollar amount for each position
-           - Rationale for each allocation
+        1. ALLOCATION RATIONALE:
+           - Why each position has its weight
+           - Why any stock was excluded or capped, and what the cash position means
         
         2. DIVERSIFICATION ASSESSMENT:
            - Sector diversification score (0-100)
@@ -66,7 +74,6 @@ def create_portfolio_allocation_task(stocks: list, portfolio_size: float = 10000
         3. PORTFOLIO STRATEGY:
            - Core holdings (largest positions)
            - Satellite holdings (smaller positions)
-           - Stocks to exclude (if any) and why
         
         4. RISK MANAGEMENT:
            - Overall portfolio risk level (Low/Medium/High)
@@ -79,8 +86,8 @@ def create_portfolio_allocation_task(stocks: list, portfolio_size: float = 10000
            - Key weaknesses or gaps
            - Suggested improvements
         
-        Format as a clear portfolio allocation table with percentages and amounts.
+        Reproduce the allocation table exactly as given, followed by your explanation.
         """,
-        expected_output="Detailed portfolio allocation with percentages, amounts, and diversification analysis",
+        expected_output="The computed allocation table with an explanation and diversification analysis",
         agent=diversification_analyst
     )
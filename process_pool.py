@@ -0,0 +1,85 @@
+"""Analyze a large watchlist across worker processes instead of threads."""
+import json
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.decision import InvestmentDecision
+from stock_research_crew.tokens import track_tokens, merge_usage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_analyze_stock = None  # Set once per worker process by _init_worker
+
+
+def _init_worker(workers: int, analyze_fn: Optional[Callable[[str], Dict[str, Any]]] = None):
+    """Import the crew (agents, LLM clients, cache store) once per worker.
+    
+    analyze_fn replaces portfolio_analyzer.analyze_stock (it must be
+    importable by name, since workers are spawned).
+    """
+    global _analyze_stock
+    # A background refresh would outlive the task that scheduled it and be
+    # lost with the worker, so workers analyze stale tickers up front
+    Config.STALE_WHILE_REVALIDATE = False
+    # Each worker gets its share of the host's LLM limits, before any LLM is built
+    from stock_research_crew.limiter import share_limits
+    share_limits(workers)
+    if analyze_fn is None:
+        # Imported here, not at module level: portfolio_analyzer imports this module
+        from stock_research_crew.portfolio_analyzer import analyze_stock as analyze_fn
+    _analyze_stock = analyze_fn
+
+
+def _work(stock: str) -> bytes:
+    """Analyze stock in a worker; the result goes back as zlib-compressed JSON."""
+    with track_tokens(stock) as usage:
+        result = _analyze_stock(stock)
+    # Commit this worker's queued cache writes before the parent reads them
+    cache_manager.flush()
+    decision = result.get("decision")
+    result["decision"] = decision.to_dict() if decision else None
+    result["usage"] = usage.summary()
+    return zlib.compress(json.dumps(result).encode("utf-8"))
+
+
+def decode_result(payload: bytes) -> Dict[str, Any]:
+    result = json.loads(zlib.decompress(payload).decode("utf-8"))
+    if result.get("decision"):
+        result["decision"] = InvestmentDecision.from_dict(result["decision"])
+    return result
+
+
+def analyze_in_processes(stocks: List[str], workers: int,
+                         analyze_fn: Optional[Callable[[str], Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield analyze_stock (or analyze_fn) results from worker processes as they finish.
+
+    Tickers sit in one shared queue and every worker takes the next one
+    as soon as it is free, so a slow ticker only holds up its own worker.
+    Workers are spawned (not forked) so none inherits the parent's
+    threads or database connections; they share the on-disk cache, and
+    their token usage is added to the caller's track_tokens run. Workers
+    do not serve stale reports, since nothing would await their refresh.
+    Each process has its own LLM limiter and rate limiters, so each gets
+    1/workers of LLM_CONCURRENCY_MAX and of the rate limits, and workers
+    are capped at LLM_CONCURRENCY_MAX; the Ollama host sees no more calls
+    than with threads.
+    """
+    workers = max(1, min(workers, len(stocks), Config.LLM_CONCURRENCY_MAX))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(workers, analyze_fn)) as executor:
+        futures = {executor.submit(_work, stock): stock for stock in stocks}
+        for future in as_completed(futures):
+            stock = futures[future]
+            try:
+                result = decode_result(future.result())
+            except Exception as e:
+                logger.error(f"Worker process failed on {stock}: {e}")
+                yield {"stock": stock, "result": None, "error": str(e)}
+                continue
+            merge_usage(result.pop("usage", {}))
+            yield result
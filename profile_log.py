@@ -0,0 +1,123 @@
+"""Append-only JSONL profile log with buffered background flushing and rotation."""
+import atexit
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+from stock_research_crew.locks import InterProcessLock
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileLog:
+    """Buffer profile records in memory and append them to a JSONL file in batches.
+
+    Appends and rotation hold an inter-process lock, so several processes
+    can share one log file.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = 1.0, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, max_buffer: int = 256):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_buffer = max_buffer
+        self._buffer: List[str] = []
+        self._cond = threading.Condition()
+        self._write_lock = InterProcessLock(self.path.with_name(self.path.name + ".lock"))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="profile-log-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, record: Dict[str, Any]):
+        """Queue a record; it is written by the background flusher."""
+        line = json.dumps(record, default=str)
+        with self._cond:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.max_buffer:
+                self._cond.notify()
+
+    def _run(self):
+        """Flush the buffer every flush_interval seconds or when it fills up."""
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.max_buffer:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self):
+        """Write all buffered records to disk."""
+        with self._cond:
+            lines, self._buffer = self._buffer, []
+        if not lines:
+            return
+        with self._write_lock:
+            try:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                if self.path.stat().st_size > self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                logger.error(f"Failed to write profile log: {e}")
+
+    def _backup_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+    def _rotate(self):
+        """Shift profile.jsonl -> .1 -> .2 ..., dropping the oldest backup."""
+        if self.backup_count <= 0:
+            self.path.unlink()
+            return
+        oldest = self._backup_path(self.backup_count)
+        if oldest.exists():
+            oldest.unlink()
+        for index in range(self.backup_count - 1, 0, -1):
+            src = self._backup_path(index)
+            if src.exists():
+                src.replace(self._backup_path(index + 1))
+        self.path.replace(self._backup_path(1))
+        logger.info(f"Rotated profile log {self.path.name}")
+
+    def iter_records(self, include_rotated: bool = True) -> Iterator[Dict[str, Any]]:
+        """Stream records oldest-first without loading the whole history."""
+        paths = []
+        if include_rotated:
+            paths = [self._backup_path(i) for i in range(self.backup_count, 0, -1)]
+        paths.append(self.path)
+
+        for path in paths:
+            if not path.exists():
+                continue
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping malformed profile record in {path.name}")
+
+    def import_legacy_json(self, path: Path) -> int:
+        """Append the calls from a legacy {"calls": [...]} profile file."""
+        calls = json.loads(Path(path).read_text()).get("calls", [])
+        for call in calls:
+            self.append(call)
+        self.flush()
+        return len(calls)
+
+    def close(self):
+        """Stop the flusher thread and write any remaining records."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
@@ -0,0 +1,159 @@
+"""Retry classification, jittered backoff and circuit breaking for LLM calls."""
+import asyncio
+import logging
+import random
+import socket
+import threading
+import time
+from typing import Dict, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Exception class names (from litellm, httpx, openai) that mean the backend is
+# unavailable or overloaded and the same request may succeed later
+_RETRYABLE_NAMES = {
+    "Timeout", "TimeoutException", "ReadTimeout", "ConnectTimeout", "PoolTimeout",
+    "APIConnectionError", "ConnectError", "ReadError", "RemoteProtocolError", "NetworkError",
+    "RateLimitError", "ServiceUnavailableError", "InternalServerError", "BadGatewayError"
+}
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for timeouts, connection failures, rate limits and 5xx responses."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, socket.timeout, ConnectionError)):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    return any(cls.__name__ in _RETRYABLE_NAMES for cls in type(exc).__mro__)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Fail fast while a backend keeps failing.
+
+    After failure_threshold consecutive retryable failures the circuit
+    opens and calls raise CircuitOpenError without touching the backend.
+    Once recovery_timeout has passed one probe call is let through
+    (half-open): success closes the circuit, failure reopens it. A probe
+    that ends without an outcome (cancelled or interrupted) must call
+    release(); one that never reports is replaced after recovery_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._rejected = 0
+        self._log_callback = None
+
+    def set_log_callback(self, callback):
+        """Set callback for logging state changes to the profile log."""
+        self._log_callback = callback
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _transition(self, state: str):
+        """Change state; caller holds the lock."""
+        if state == self._state:
+            return
+        previous, self._state = self._state, state
+        logger.warning(f"Circuit for {self.name} {previous} -> {state}")
+        if self._log_callback:
+            try:
+                self._log_callback({
+                    "time": time.time(),
+                    "event": "circuit",
+                    "model": self.name,
+                    "state": state,
+                    "previous": previous,
+                    "failures": self._failures,
+                    "rejected": self._rejected
+                })
+            except Exception as e:
+                logger.error(f"Failed to log profile: {e}")
+
+    def allow(self):
+        """Admit a call, or raise CircuitOpenError while the backend is unhealthy."""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.time() - self._opened_at < self.recovery_timeout:
+                    self._rejected += 1
+                    raise CircuitOpenError(f"Circuit for {self.name} is open; failing fast")
+                self._transition(self.HALF_OPEN)
+            if self._state == self.HALF_OPEN:
+                if self._probing and time.time() - self._probe_started < self.recovery_timeout:
+                    self._rejected += 1
+                    raise CircuitOpenError(f"Circuit for {self.name} is half-open; probe in progress")
+                self._probing = True
+                self._probe_started = time.time()
+
+    def release(self):
+        """End an admitted call that has no outcome, so a new probe can run."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.time()
+                self._transition(self.OPEN)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"state": self._state, "failures": self._failures, "rejected": self._rejected}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker_for(model: str) -> CircuitBreaker:
+    """Shared circuit breaker for model."""
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(
+                model,
+                failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=Config.CIRCUIT_RECOVERY_S
+            )
+        return _breakers[model]
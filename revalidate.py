@@ -0,0 +1,80 @@
+"""Stale-while-revalidate support for cached final stock reports."""
+import logging
+import threading
+from concurrent.futures import Future, wait
+from typing import Callable, Dict, Any, Optional
+from stock_research_crew.cache import cache_manager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Revalidator:
+    """Serve stale reports immediately and refresh them in the background.
+
+    At most one refresh per stock runs at a time; callers that find the
+    same stale report while it is being refreshed share that refresh.
+    Refreshes run on daemon threads, so exiting does not wait for them;
+    one cut short leaves the stale report in place.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self._slots = threading.BoundedSemaphore(max(1, max_workers))
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def refresh(self, stock: str, refresh_fn: Callable[[str], str]) -> Future:
+        """Schedule refresh_fn(stock) unless a refresh for stock is already running."""
+        with self._lock:
+            future = self._inflight.get(stock)
+            if future is not None:
+                return future
+            future = Future()
+            self._inflight[stock] = future
+        threading.Thread(target=self._run, args=(stock, refresh_fn, future),
+                         name=f"revalidate-{stock}", daemon=True).start()
+        return future
+
+    def _run(self, stock: str, refresh_fn: Callable[[str], str], future: Future):
+        result = None
+        try:
+            with self._slots:
+                logger.info(f"Refreshing stale report for {stock} in background")
+                result = refresh_fn(stock)
+                logger.info(f"Background refresh completed for {stock}")
+        except Exception as e:
+            logger.error(f"Background refresh failed for {stock}: {e}")
+        finally:
+            with self._lock:
+                self._inflight.pop(stock, None)
+            future.set_result(result)
+
+    def lookup(self, stock: str, refresh_fn: Callable[[str], str],
+               allow_stale: Optional[bool] = None, refresh: bool = True) -> Optional[Dict[str, Any]]:
+        """Return the cached report for stock, scheduling a refresh if it is stale.
+
+        allow_stale defaults to Config.STALE_WHILE_REVALIDATE; when disabled
+        only fresh reports are returned, as with get_cached_result. With
+        refresh=False a stale report is returned without scheduling one.
+        """
+        if allow_stale is None:
+            allow_stale = Config.STALE_WHILE_REVALIDATE
+        entry = cache_manager.get_result_entry(stock, allow_stale=allow_stale)
+        if entry and entry["stale"] and refresh:
+            self.refresh(stock, refresh_fn)
+        return entry
+
+    def pending(self) -> int:
+        """Number of refreshes still running."""
+        with self._lock:
+            return len(self._inflight)
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until all running refreshes finish."""
+        with self._lock:
+            futures = list(self._inflight.values())
+        wait(futures, timeout=timeout)
+
+
+# Singleton instance
+revalidator = Revalidator(max_workers=Config.REVALIDATE_WORKERS)
@@ -0,0 +1,209 @@
+"""Web search with query normalization, a shared TTL cache and in-run deduplication."""
+import hashlib
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import httpx
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.singleflight import SingleFlight
+from stock_research_crew.symbols import symbol_index
+from stock_research_crew.tokens import TokenUsage, current_usage
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9.&-]*")
+_MAX_NAME_WORDS = 4
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: case, spacing and punctuation folded, company names as tickers.
+
+    Words keep their order, so 'Apple Inc. competitors', 'apple competitors'
+    and 'AAPL competitors' share the key 'aapl competitors' but 'Apple vs
+    Samsung' and 'Samsung vs Apple' do not.
+    """
+    words = _WORD_RE.findall(query.lower())
+    tokens, i = [], 0
+    while i < len(words):
+        # Longest company name or alias starting at this word
+        for size in range(min(_MAX_NAME_WORDS, len(words) - i), 0, -1):
+            symbol = symbol_index.exact_name(" ".join(words[i:i + size]))
+            if symbol:
+                tokens.append(symbol.lower())
+                i += size
+                break
+        else:
+            tokens.append(words[i])
+            i += 1
+    return " ".join(tokens) or " ".join(query.lower().split())
+
+
+class SerperClient:
+    """Minimal Serper search API client over a pooled HTTP connection."""
+
+    def __init__(self, api_key: str, url: str, results: int = 10, timeout: float = 15):
+        self.api_key = api_key
+        self.url = url
+        self.results = results
+        self._client = httpx.Client(timeout=timeout)
+
+    def __call__(self, query: str) -> str:
+        response = self._client.post(
+            self.url,
+            json={"q": query, "num": self.results},
+            headers={"X-API-KEY": self.api_key, "Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        return format_results(response.json())
+
+
+def format_results(data: Dict[str, Any]) -> str:
+    """Serper JSON as the compact text SerperDevTool gives agents."""
+    lines = []
+    graph = data.get("knowledgeGraph") or {}
+    if graph.get("description"):
+        lines.append(f"{graph.get('title', '')}: {graph['description']}\n")
+    for item in data.get("organic") or []:
+        lines.append(f"Title: {item.get('title', '')}\nLink: {item.get('link', '')}\n"
+                     f"Snippet: {item.get('snippet', '')}\n---")
+    return "\n".join(lines) if lines else "No results found."
+
+
+class CachedSearch:
+    """Search with three layers in front of the backend.
+
+    Results seen earlier in the same run (the outermost track_tokens
+    block, e.g. one portfolio analysis) are returned from a small memo
+    until the stored entry they came from expires, concurrent identical
+    queries share one request, and results are kept in the CacheManager
+    store for SEARCH_CACHE_TTL_HOURS across runs and tickers. Queries are
+    keyed by normalize_query.
+    """
+
+    def __init__(self, backend: Callable[[str], str], ttl_hours: float = 24, memo_size: int = 256):
+        self.backend = backend
+        self.ttl_hours = ttl_hours
+        self.memo_size = memo_size
+        # Per run: key -> (expires_at, result); dropped with the run
+        self._memos: "weakref.WeakKeyDictionary[TokenUsage, OrderedDict[str, Tuple[float, str]]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("search")
+        self._flight.set_log_callback(cache_manager.log_profile)
+        self._counts = {"memo": 0, "cache": 0, "network": 0, "errors": 0}
+        self._network_s = 0.0
+
+    def _log(self, query: str, key: str, source: str, duration: float):
+        cache_manager.log_profile({
+            "time": time.time(),
+            "event": "search",
+            "query": query[:200],
+            "key": key,
+            "source": source,
+            "latency_s": round(duration, 4)
+        })
+
+    def _count(self, source: str, duration: float = 0.0):
+        with self._lock:
+            self._counts[source] += 1
+            if source == "network":
+                self._network_s += duration
+
+    def _run_memo(self) -> Optional["OrderedDict[str, Tuple[float, str]]"]:
+        """Memo of the current run, or None outside track_tokens. Caller holds the lock."""
+        run = current_usage.get()
+        if run is None:
+            return None
+        while run.parent is not None:
+            run = run.parent
+        memo = self._memos.get(run)
+        if memo is None:
+            memo = self._memos[run] = OrderedDict()
+        return memo
+
+    def _remember(self, key: str, expires_at: float, result: str):
+        with self._lock:
+            memo = self._run_memo()
+            if memo is None:
+                return
+            memo[key] = (expires_at, result)
+            memo.move_to_end(key)
+            while len(memo) > self.memo_size:
+                memo.popitem(last=False)
+
+    def _recall(self, key: str) -> Optional[str]:
+        with self._lock:
+            memo = self._run_memo()
+            entry = memo.get(key) if memo is not None else None
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del memo[key]
+                return None
+            return entry[1]
+
+    def search(self, query: str) -> str:
+        start = time.time()
+        key = normalize_query(query)
+        result = self._recall(key)
+        if result is not None:
+            self._count("memo")
+            self._log(query, key, "memo", time.time() - start)
+            return result
+
+        cache_key = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        expires_at, result = self._flight.do(cache_key, lambda: self._fetch(query, key, cache_key), label=key)
+        self._remember(key, expires_at, result)
+        return result
+
+    def _fetch(self, query: str, key: str, cache_key: str) -> Tuple[float, str]:
+        """(expires_at, result) from the store, or from the backend on a miss."""
+        start = time.time()
+        entry = cache_manager.get_search_entry(cache_key)
+        if entry is not None:
+            self._count("cache")
+            self._log(query, key, "cache", time.time() - start)
+            return entry["expires_at"], entry["result"]
+        try:
+            result = self.backend(query)
+        except Exception:
+            self._count("errors")
+            raise
+        duration = time.time() - start
+        self._count("network", duration)
+        self._log(query, key, "network", duration)
+        cache_manager.save_search_result(cache_key, query, result, self.ttl_hours)
+        return start + self.ttl_hours * 3600, result
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits per layer, hit rate and mean backend latency."""
+        with self._lock:
+            counts = dict(self._counts)
+            network_s = self._network_s
+        coalesced = self._flight.stats().get("coalesced", 0)
+        hits = counts["memo"] + counts["cache"] + coalesced
+        total = hits + counts["network"] + counts["errors"]
+        return {
+            **counts,
+            "coalesced": coalesced,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "avg_network_s": round(network_s / counts["network"], 3) if counts["network"] else None
+        }
+
+
+def create_web_search() -> Optional[CachedSearch]:
+    """Cached Serper search, or None when no API key is configured."""
+    if not Config.SERPER_API_KEY:
+        return None
+    return CachedSearch(
+        SerperClient(Config.SERPER_API_KEY, Config.SERPER_URL, results=Config.SEARCH_RESULTS),
+        ttl_hours=Config.SEARCH_CACHE_TTL_HOURS
+    )
+
+
+# Singleton instance (None without SERPER_API_KEY)
+web_search = create_web_search()
@@ -0,0 +1,104 @@
+"""Single-flight request coalescing: concurrent callers with the same key share one call."""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; later callers wait on the first call's future."""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._log_callback = None
+        self.calls = 0
+        self.coalesced = 0
+
+    def set_log_callback(self, callback):
+        """Set callback for logging coalesced calls to the profile log."""
+        self._log_callback = callback
+
+    def _join(self, key: Hashable):
+        """Return (future, leader) for key, registering a new call if none is in flight."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        return future, leader
+
+    def do(self, key: Hashable, fn: Callable[[], Any], label: str = "") -> Any:
+        """Return fn(), or the result of an identical call already in flight."""
+        future, leader = self._join(key)
+
+        if not leader:
+            start = time.time()
+            logger.info(f"Waiting on in-flight {self.scope} call {label}".rstrip())
+            try:
+                return future.result()
+            finally:
+                self._record(label, time.time() - start)
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        """Async do(): await fn(), or the identical call already in flight (sync or async)."""
+        future, leader = self._join(key)
+
+        if not leader:
+            start = time.time()
+            logger.info(f"Waiting on in-flight {self.scope} call {label}".rstrip())
+            try:
+                return await asyncio.wrap_future(future)
+            finally:
+                self._record(label, time.time() - start)
+
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _record(self, label: str, waited: float):
+        if not self._log_callback:
+            return
+        try:
+            self._log_callback({
+                "time": time.time(),
+                "event": "coalesced",
+                "scope": self.scope,
+                "key": label[:200],
+                "wait_s": round(waited, 3),
+                "calls": self.calls,
+                "coalesced": self.coalesced
+            })
+        except Exception as e:
+            logger.error(f"Failed to log profile: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "inflight": len(self._inflight)}
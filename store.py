@@ -0,0 +1,761 @@
+"""SQLite-backed key/value store for cached results and prompt responses."""
+import atexit
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple, List
+
+logger = logging.getLogger(__name__)
+
+# Values shorter than this are stored uncompressed
+MIN_COMPRESS_BYTES = 128
+
+
+def _encode(value: str, level: int = 6) -> Tuple[str, str, bytes, int, int]:
+    """Return (digest, codec, data, raw_bytes, stored_bytes) for a value."""
+    raw = value.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    if len(raw) >= MIN_COMPRESS_BYTES:
+        data = zlib.compress(raw, level)
+        if len(data) < len(raw):
+            return digest, "zlib", data, len(raw), len(data)
+    return digest, "raw", raw, len(raw), len(raw)
+
+
+def _decode(codec: str, data: bytes) -> str:
+    if codec == "zlib":
+        data = zlib.decompress(data)
+    return data.decode("utf-8")
+
+
+def _entry_overhead(key: str, meta_json: Optional[str]) -> int:
+    """Bytes charged to an entry itself, excluding its (shared) value blob."""
+    size = len(key.encode("utf-8"))
+    if meta_json:
+        size += len(meta_json.encode("utf-8"))
+    return size
+
+
+_CONTENT_ADDRESSED_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries(last_access)",
+    "CREATE INDEX IF NOT EXISTS idx_entries_lfu ON entries(hits, last_access)",
+    # Entries hold a reference on their blob; unreferenced blobs are dropped
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+        UPDATE blobs SET refs = refs + 1 WHERE digest = NEW.digest;
+        UPDATE stats SET value = value + NEW.size_bytes WHERE name = 'total_bytes';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+        UPDATE blobs SET refs = refs - 1 WHERE digest = OLD.digest;
+        DELETE FROM blobs WHERE digest = OLD.digest AND refs <= 0;
+        UPDATE stats SET value = value - OLD.size_bytes WHERE name = 'total_bytes';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF digest, size_bytes ON entries BEGIN
+        UPDATE blobs SET refs = refs + 1 WHERE digest = NEW.digest;
+        UPDATE blobs SET refs = refs - 1 WHERE digest = OLD.digest;
+        DELETE FROM blobs WHERE digest = OLD.digest AND refs <= 0;
+        UPDATE stats SET value = value - OLD.size_bytes + NEW.size_bytes
+        WHERE name = 'total_bytes';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blobs_insert AFTER INSERT ON blobs BEGIN
+        UPDATE stats SET value = value + NEW.stored_bytes
+        WHERE name IN ('total_bytes', 'blob_stored_bytes');
+        UPDATE stats SET value = value + NEW.raw_bytes WHERE name = 'blob_raw_bytes';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blobs_delete AFTER DELETE ON blobs BEGIN
+        UPDATE stats SET value = value - OLD.stored_bytes
+        WHERE name IN ('total_bytes', 'blob_stored_bytes');
+        UPDATE stats SET value = value - OLD.raw_bytes WHERE name = 'blob_raw_bytes';
+    END
+    """,
+]
+
+
+def _migrate_to_content_addressed(store: "SQLiteStore"):
+    """Move entry values into compressed, deduplicated blobs."""
+    conn = store._conn
+    conn.execute("""
+        CREATE TABLE blobs (
+            digest TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            data BLOB NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+            stored_bytes INTEGER NOT NULL,
+            refs INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE entries_v3 (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            meta TEXT,
+            saved_at REAL NOT NULL,
+            size_bytes INTEGER NOT NULL DEFAULT 0,
+            last_access REAL NOT NULL DEFAULT 0,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (namespace, key)
+        )
+    """)
+
+    refs: Dict[str, int] = {}
+    cursor = conn.execute(
+        "SELECT namespace, key, value, meta, saved_at, last_access, hits FROM entries"
+    )
+    for rows in iter(lambda: cursor.fetchmany(500), []):
+        blobs, entries = [], []
+        for namespace, key, value, meta, saved_at, last_access, hits in rows:
+            digest, codec, data, raw_bytes, stored_bytes = _encode(value)
+            blobs.append((digest, codec, data, raw_bytes, stored_bytes))
+            entries.append((namespace, key, digest, meta, saved_at,
+                            _entry_overhead(key, meta), last_access, hits))
+            refs[digest] = refs.get(digest, 0) + 1
+        conn.executemany(
+            "INSERT OR IGNORE INTO blobs (digest, codec, data, raw_bytes, stored_bytes) "
+            "VALUES (?, ?, ?, ?, ?)", blobs
+        )
+        conn.executemany(
+            "INSERT INTO entries_v3 VALUES (?, ?, ?, ?, ?, ?, ?, ?)", entries
+        )
+    conn.executemany("UPDATE blobs SET refs = ? WHERE digest = ?",
+                     [(count, digest) for digest, count in refs.items()])
+
+    conn.execute("DROP TABLE entries")
+    conn.execute("ALTER TABLE entries_v3 RENAME TO entries")
+    for statement in _CONTENT_ADDRESSED_SCHEMA:
+        conn.execute(statement)
+    conn.execute("""
+        INSERT OR REPLACE INTO stats (name, value)
+        SELECT 'total_bytes',
+               (SELECT COALESCE(SUM(size_bytes), 0) FROM entries)
+               + (SELECT COALESCE(SUM(stored_bytes), 0) FROM blobs)
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO stats (name, value)
+        SELECT 'blob_stored_bytes', COALESCE(SUM(stored_bytes), 0) FROM blobs
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO stats (name, value)
+        SELECT 'blob_raw_bytes', COALESCE(SUM(raw_bytes), 0) FROM blobs
+    """)
+
+
+def _migrate_to_expiry_epochs(store: "SQLiteStore"):
+    """Store a precomputed expiry epoch on every entry."""
+    conn = store._conn
+    conn.execute("ALTER TABLE entries ADD COLUMN expires_at REAL NOT NULL DEFAULT 0")
+    conn.execute("UPDATE entries SET expires_at = saved_at + ?", (store.default_ttl,))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries(expires_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_entries_saved_at")
+
+
+def _migrate_to_purge_epochs(store: "SQLiteStore"):
+    """Separate the hard deletion time from expiry so stale entries can be kept."""
+    conn = store._conn
+    conn.execute("ALTER TABLE entries ADD COLUMN purge_at REAL NOT NULL DEFAULT 0")
+    conn.execute("UPDATE entries SET purge_at = expires_at")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_purge ON entries(purge_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_entries_expires")
+
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version).
+# Steps are SQL statements or callables taking the store.
+_MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS entries (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            meta TEXT,
+            saved_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_entries_saved_at ON entries(saved_at)",
+    ],
+    [
+        # Per-entry size and access stats for byte-budgeted LRU/LFU eviction
+        "ALTER TABLE entries ADD COLUMN size_bytes INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE entries ADD COLUMN last_access REAL NOT NULL DEFAULT 0",
+        "ALTER TABLE entries ADD COLUMN hits INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE entries SET
+            size_bytes = length(CAST(key AS BLOB)) + length(CAST(value AS BLOB))
+                         + COALESCE(length(CAST(meta AS BLOB)), 0),
+            last_access = saved_at
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_entries_lru ON entries(last_access)",
+        "CREATE INDEX IF NOT EXISTS idx_entries_lfu ON entries(hits, last_access)",
+        # Running byte total kept by triggers, so budget checks never scan
+        "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        """
+        INSERT OR REPLACE INTO stats (name, value)
+        SELECT 'total_bytes', COALESCE(SUM(size_bytes), 0) FROM entries
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN
+            UPDATE stats SET value = value + NEW.size_bytes WHERE name = 'total_bytes';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN
+            UPDATE stats SET value = value - OLD.size_bytes WHERE name = 'total_bytes';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size_bytes ON entries BEGIN
+            UPDATE stats SET value = value - OLD.size_bytes + NEW.size_bytes
+            WHERE name = 'total_bytes';
+        END
+        """,
+    ],
+    [
+        # Compressed, content-addressed values shared between entries
+        _migrate_to_content_addressed,
+    ],
+    [
+        _migrate_to_expiry_epochs,
+    ],
+    [
+        _migrate_to_purge_epochs,
+    ],
+]
+
+EVICTION_POLICIES = {
+    "lru": "last_access",
+    "lfu": "hits, last_access",
+}
+
+
+def _parse_timestamp(timestamp_str: Optional[str]) -> float:
+    """Convert an ISO timestamp from the legacy JSON cache to a UTC epoch (0 if unknown)."""
+    if not timestamp_str:
+        return 0.0
+    try:
+        ts = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts.timestamp()
+    except Exception:
+        return 0.0
+
+
+class HotTier:
+    """Bounded in-process LRU of recently used entries, sized in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get((namespace, key))
+            if item is None:
+                return None
+            self._entries.move_to_end((namespace, key))
+            return item[0]
+
+    def put(self, namespace: str, key: str, entry: Dict[str, Any], size: int):
+        if size > self.max_bytes:
+            self.discard(namespace, key)
+            return
+        with self._lock:
+            old = self._entries.pop((namespace, key), None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[(namespace, key)] = (entry, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def discard(self, namespace: str, key: str):
+        with self._lock:
+            old = self._entries.pop((namespace, key), None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+class SQLiteStore:
+    """Namespaced key/value store with per-key upserts, using SQLite in WAL mode.
+
+    Writes are queued and committed by a background writer in one
+    transaction per batch, so concurrent savers share a single flush and
+    repeated writes to the same key collapse into one upsert. Reads see
+    queued writes immediately. SQLite's own locking keeps the file
+    consistent across processes.
+
+    Reads are served from a bounded in-process hot tier when possible.
+    SQLite's data_version is checked on every hot hit, and any commit by
+    another connection (process) clears the tier, so overwritten or
+    deleted rows are never served from memory. Accesses are recorded in
+    batches, and after each batch the least recently (or frequently) used
+    entries are evicted until the stored bytes fit max_bytes again.
+    Entries in pinned_namespaces (e.g. an index that is expensive to
+    rebuild) are never evicted, though they count toward max_bytes.
+
+    Values are stored zlib-compressed in a blobs table keyed by their
+    SHA-256, so identical text saved under several keys is kept once.
+    They are decompressed only when read.
+
+    Every entry carries a precomputed expires_at epoch. Callers compare it
+    against the clock. Entries written with a grace period stay readable
+    (as stale) until purge_at = expires_at + grace. A background sweeper
+    deletes rows past purge_at in small batches through that index.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = 0.05, max_bytes: int = 0,
+                 hot_max_bytes: int = 16 * 1024 * 1024, eviction_policy: str = "lru",
+                 compression_level: int = 6, default_ttl: float = 24 * 3600,
+                 sweep_interval: float = 60.0, sweep_batch: int = 500,
+                 pinned_namespaces: Iterable[str] = ()):
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction_policy}")
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        self.compression_level = compression_level
+        self.default_ttl = default_ttl
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self.pinned_namespaces = tuple(pinned_namespaces)
+        self._hot = HotTier(hot_max_bytes)
+        self._data_version: Optional[int] = None  # PRAGMA data_version the hot tier matches
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Tuple] = {}
+        self._touches: Dict[Tuple[str, str], List] = {}
+        self._generation = 0
+        self._pending_cond = threading.Condition()
+        self._closed = False
+        self._conn = self._connect()
+        self._migrate()
+        self._writer = threading.Thread(target=self._run_writer, name="cache-writer", daemon=True)
+        self._writer.start()
+        self._sweeper_stop = threading.Event()
+        self._sweeper = None
+        if sweep_interval > 0:
+            self._sweeper = threading.Thread(target=self._run_sweeper, name="cache-sweeper", daemon=True)
+            self._sweeper.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database in autocommit mode with WAL journaling."""
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _migrate(self):
+        """Apply pending schema migrations."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+                for steps in _MIGRATIONS[version:]:
+                    for step in steps:
+                        if callable(step):
+                            step(self)
+                        else:
+                            self._conn.execute(step)
+                if version < len(_MIGRATIONS):
+                    self._conn.execute(f"PRAGMA user_version = {len(_MIGRATIONS)}")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if version < len(_MIGRATIONS):
+                logger.info(f"Cache schema migrated from version {version} to {len(_MIGRATIONS)}")
+
+    def _touch(self, namespace: str, key: str):
+        """Record an access; written to the database with the next batch."""
+        with self._pending_cond:
+            touch = self._touches.get((namespace, key))
+            if touch is None:
+                self._touches[(namespace, key)] = [time.time(), 1]
+            else:
+                touch[0] = time.time()
+                touch[1] += 1
+
+    def _sync_hot_tier(self) -> int:
+        """Clear the hot tier if another connection committed since it was filled."""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._pending_cond:
+            if version != self._data_version:
+                self._hot.clear()
+                self._data_version = version
+        return version
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry stored under namespace/key, if any."""
+        with self._pending_cond:
+            row = self._pending.get((namespace, key))
+            generation = self._generation
+        if row is not None:
+            _, _, value, meta, saved_at, expires_at, purge_at, _, _ = row
+            return {"value": value, "meta": json.loads(meta) if meta else {},
+                    "saved_at": saved_at, "expires_at": expires_at, "purge_at": purge_at}
+
+        # Read before the row, so a row older than a commit is never cached as current
+        version = self._sync_hot_tier()
+        entry = self._hot.get(namespace, key)
+        if entry is not None:
+            self._touch(namespace, key)
+            return entry
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT e.meta, e.saved_at, e.expires_at, e.purge_at, e.size_bytes, "
+                "b.codec, b.data, b.raw_bytes "
+                "FROM entries e JOIN blobs b ON b.digest = e.digest "
+                "WHERE e.namespace = ? AND e.key = ?",
+                (namespace, key)
+            ).fetchone()
+        if row is None:
+            return None
+        meta, saved_at, expires_at, purge_at, overhead, codec, data, raw_bytes = row
+        value = _decode(codec, data)
+        size = overhead + raw_bytes
+        entry = {"value": value, "meta": json.loads(meta) if meta else {},
+                 "saved_at": saved_at, "expires_at": expires_at, "purge_at": purge_at}
+        with self._pending_cond:
+            # Skip caching a row that a concurrent put or another process may already have replaced
+            if generation == self._generation and version == self._data_version:
+                self._hot.put(namespace, key, entry, size)
+        self._touch(namespace, key)
+        return entry
+
+    def put(self, namespace: str, key: str, value: str,
+            meta: Optional[Dict[str, Any]] = None, saved_at: Optional[float] = None,
+            ttl: Optional[float] = None, grace: float = 0):
+        """Queue an insert-or-replace of a single entry."""
+        self.put_many(namespace, [(key, value, meta, saved_at)], ttl=ttl, grace=grace)
+
+    def put_many(self, namespace: str,
+                 items: Iterable[Tuple[str, str, Optional[Dict[str, Any]], Optional[float]]],
+                 ttl: Optional[float] = None, grace: float = 0):
+        """Queue upserts for several entries; they are committed together.
+
+        Entries expire ttl seconds after saved_at (default_ttl if not given)
+        and are deleted grace seconds after that.
+        """
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._pending_cond:
+            for key, value, meta, saved_at in items:
+                meta_json = json.dumps(meta) if meta else None
+                saved_at = now if saved_at is None else saved_at
+                self._pending[(namespace, key)] = (
+                    namespace, key, value, meta_json, saved_at, saved_at + ttl,
+                    saved_at + ttl + grace, _entry_overhead(key, meta_json), now
+                )
+                self._hot.discard(namespace, key)
+            self._generation += 1
+            self._pending_cond.notify()
+
+    def _run_writer(self):
+        """Commit queued writes in batches until the store is closed."""
+        while True:
+            with self._pending_cond:
+                while not self._pending and not self._touches and not self._closed:
+                    self._pending_cond.wait()
+                closed = self._closed
+            if not closed:
+                # Give concurrent writers a moment to join this batch
+                time.sleep(self.flush_interval)
+            if not self.flush() and not closed:
+                time.sleep(1.0)
+            if closed:
+                return
+
+    def flush(self) -> bool:
+        """Commit all queued writes in a single transaction; False if the commit failed."""
+        with self._flush_lock:
+            with self._pending_cond:
+                if not self._pending and not self._touches:
+                    return True
+                rows = list(self._pending.values())
+                touches, self._touches = self._touches, {}
+            # Compress outside the database lock so readers are not blocked
+            blobs, entries = {}, []
+            for (namespace, key, value, meta_json, saved_at, expires_at, purge_at,
+                 overhead, last_access) in rows:
+                digest, codec, data, raw_bytes, stored_bytes = _encode(value, self.compression_level)
+                blobs[digest] = (digest, codec, data, raw_bytes, stored_bytes)
+                entries.append((namespace, key, digest, meta_json, saved_at, expires_at, purge_at,
+                                overhead, last_access))
+            try:
+                with self._lock:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        self._conn.executemany(
+                            "INSERT OR IGNORE INTO blobs (digest, codec, data, raw_bytes, stored_bytes) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            list(blobs.values())
+                        )
+                        self._conn.executemany(
+                            "INSERT INTO entries "
+                            "(namespace, key, digest, meta, saved_at, expires_at, purge_at, "
+                            "size_bytes, last_access, hits) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0) "
+                            "ON CONFLICT(namespace, key) DO UPDATE SET "
+                            "digest = excluded.digest, meta = excluded.meta, saved_at = excluded.saved_at, "
+                            "expires_at = excluded.expires_at, purge_at = excluded.purge_at, "
+                            "size_bytes = excluded.size_bytes, last_access = excluded.last_access",
+                            entries
+                        )
+                        self._conn.executemany(
+                            "UPDATE entries SET last_access = MAX(last_access, ?), hits = hits + ? "
+                            "WHERE namespace = ? AND key = ?",
+                            [(last, hits, ns, key) for (ns, key), (last, hits) in touches.items()]
+                        )
+                        self._conn.execute("COMMIT")
+                    except Exception:
+                        self._conn.execute("ROLLBACK")
+                        raise
+            except Exception as e:
+                logger.error(f"Failed to flush {len(rows)} cache writes: {e}")
+                return False
+            with self._pending_cond:
+                # Drop flushed rows unless they were overwritten meanwhile
+                for row in rows:
+                    if self._pending.get((row[0], row[1])) is row:
+                        del self._pending[(row[0], row[1])]
+        if rows and self.max_bytes:
+            try:
+                self.enforce_budget()
+            except Exception as e:
+                logger.error(f"Failed to enforce cache budget: {e}")
+        return True
+
+    def _stat(self, name: str) -> int:
+        """Read a counter maintained by the schema triggers."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM stats WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def total_bytes(self) -> int:
+        """Stored size of all entries and their blobs, maintained incrementally."""
+        return self._stat("total_bytes")
+
+    def enforce_budget(self, target_ratio: float = 0.9) -> int:
+        """Evict entries by the eviction policy until total bytes fit max_bytes.
+
+        Evicts down to target_ratio * max_bytes so eviction runs in bursts
+        rather than on every write. Returns the number of evicted entries.
+        """
+        if not self.max_bytes or self.total_bytes() <= self.max_bytes:
+            return 0
+
+        order = EVICTION_POLICIES[self.eviction_policy]
+        pinned = ", ".join("?" * len(self.pinned_namespaces))
+        where = f"WHERE namespace NOT IN ({pinned})" if pinned else ""
+        target = int(self.max_bytes * target_ratio)
+        evicted = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while self._stat("total_bytes") > target:
+                    # Deleting an entry frees its blob only if no other entry shares it,
+                    # so evict in small batches and re-read the running total
+                    batch = self._conn.execute(
+                        f"SELECT namespace, key FROM entries {where} ORDER BY {order} LIMIT 32",
+                        self.pinned_namespaces
+                    ).fetchall()
+                    if not batch:
+                        break
+                    self._conn.executemany(
+                        "DELETE FROM entries WHERE namespace = ? AND key = ?", batch
+                    )
+                    for namespace, key in batch:
+                        self._hot.discard(namespace, key)
+                    evicted += len(batch)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if evicted:
+            logger.info(f"Evicted {evicted} cache entries ({self.eviction_policy}) to fit "
+                        f"{self.max_bytes / (1024 * 1024):.1f}MB budget")
+        return evicted
+
+    def delete_expired(self, now: Optional[float] = None, limit: Optional[int] = None) -> Dict[str, int]:
+        """Delete up to limit entries past their purge time; returns counts per namespace."""
+        self.flush()
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                victims = self._conn.execute(
+                    "SELECT namespace, key FROM entries WHERE purge_at <= ? "
+                    "ORDER BY purge_at LIMIT ?",
+                    (now, -1 if limit is None else limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?", victims
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        removed: Dict[str, int] = {}
+        for namespace, key in victims:
+            self._hot.discard(namespace, key)
+            removed[namespace] = removed.get(namespace, 0) + 1
+        return removed
+
+    def _run_sweeper(self):
+        """Periodically drop expired entries, one small transaction at a time."""
+        while not self._sweeper_stop.wait(self.sweep_interval):
+            try:
+                while not self._sweeper_stop.is_set():
+                    removed = self.delete_expired(limit=self.sweep_batch)
+                    if sum(removed.values()) < self.sweep_batch:
+                        break
+                    # Let writers in between batches
+                    time.sleep(self.flush_interval)
+            except Exception as e:
+                logger.error(f"Cache sweep failed: {e}")
+
+    def items(self, namespace: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (key, entry) for every entry in namespace, without counting as accesses."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT e.key, e.meta, e.saved_at, e.expires_at, e.purge_at, b.codec, b.data "
+                "FROM entries e JOIN blobs b ON b.digest = e.digest WHERE e.namespace = ?",
+                (namespace,)
+            ).fetchall()
+        for key, meta, saved_at, expires_at, purge_at, codec, data in rows:
+            yield key, {"value": _decode(codec, data), "meta": json.loads(meta) if meta else {},
+                        "saved_at": saved_at, "expires_at": expires_at, "purge_at": purge_at}
+
+    def delete(self, namespace: str, keys: Iterable[str]) -> int:
+        """Delete entries now, including queued writes to them; returns how many rows went."""
+        keys = list(keys)
+        with self._pending_cond:
+            for key in keys:
+                self._pending.pop((namespace, key), None)
+                self._hot.discard(namespace, key)
+            self._generation += 1
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = self._conn.executemany(
+                    "DELETE FROM entries WHERE namespace = ? AND key = ?", [(namespace, key) for key in keys]
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return deleted
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        """Count entries, optionally restricted to one namespace."""
+        self.flush()
+        with self._lock:
+            if namespace is None:
+                return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+    def size_bytes(self) -> int:
+        """On-disk size of the database including its WAL file."""
+        total = 0
+        for path in (self.path, self.path.with_name(self.path.name + "-wal")):
+            if path.exists():
+                total += path.stat().st_size
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary of stored and hot-tier sizes."""
+        hot = self._hot.stats()
+        raw_bytes = self._stat("blob_raw_bytes")
+        stored_bytes = self._stat("blob_stored_bytes")
+        with self._lock:
+            blob_count = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        return {
+            "entries": self.count(),
+            "blobs": blob_count,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "compression_ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else 1.0,
+            "total_bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+            "file_bytes": self.size_bytes(),
+            "hot_entries": hot["entries"],
+            "hot_bytes": hot["bytes"],
+            "eviction_policy": self.eviction_policy
+        }
+
+    def import_legacy_json(self, path: Path) -> int:
+        """Import a legacy {"final": ..., "prompts": ...} cache file."""
+        data = json.loads(Path(path).read_text())
+
+        finals = [
+            (stock, entry["result"], None, _parse_timestamp(entry.get("saved_at")))
+            for stock, entry in data.get("final", {}).items()
+            if entry.get("result") is not None
+        ]
+        prompts = [
+            (key, entry["response"],
+             {k: entry.get(k) for k in ("model", "temperature", "prompt")},
+             _parse_timestamp(entry.get("saved_at")))
+            for key, entry in data.get("prompts", {}).items()
+            if entry.get("response") is not None
+        ]
+
+        self.put_many("final", finals)
+        self.put_many("prompts", prompts)
+        self.flush()
+        return len(finals) + len(prompts)
+
+    def close(self):
+        """Flush queued writes, stop the writer and close the connection."""
+        with self._pending_cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending_cond.notify()
+        self._sweeper_stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,62 @@
+"""Console display of streamed LLM output."""
+import sys
+import threading
+from typing import Dict, Optional, TextIO
+
+
+class StreamPrinter:
+    """Stream callback that prints output as it arrives, with a header per caller.
+    
+    Output of the caller currently being shown is written as it arrives.
+    Other concurrent callers (e.g. parallel pipeline stages) are buffered
+    and shown a whole line at a time, so they do not interleave mid-line;
+    call flush() at the end to write whatever is still buffered.
+    """
+
+    def __init__(self, out: TextIO = None):
+        self._out = out or sys.stdout
+        self._lock = threading.Lock()
+        self._caller: Optional[str] = None
+        self._at_line_start = True
+        self._pending: Dict[Optional[str], str] = {}
+
+    def _switch(self, caller: Optional[str]):
+        if not self._at_line_start:
+            self._out.write("\n")
+        self._out.write(f"\n\n--- {caller or 'LLM'} ---\n")
+        self._caller = caller
+        self._at_line_start = True
+
+    def _write(self, text: str):
+        if text:
+            self._out.write(text)
+            self._at_line_start = text.endswith("\n")
+
+    def __call__(self, caller: Optional[str], text: str):
+        with self._lock:
+            if self._caller is None and not self._pending:
+                self._switch(caller)
+            if caller == self._caller:
+                self._write(text)
+            else:
+                buffered = self._pending.get(caller, "") + text
+                lines, newline, rest = buffered.rpartition("\n")
+                if newline:
+                    # Switch to this caller for its complete lines
+                    self._switch(caller)
+                    self._write(lines + newline)
+                    self._pending.pop(caller, None)
+                    if rest:
+                        self._write(rest)
+                else:
+                    self._pending[caller] = buffered
+            self._out.flush()
+
+    def flush(self):
+        """Write output still buffered for callers that were not being shown."""
+        with self._lock:
+            for caller, text in list(self._pending.items()):
+                self._switch(caller)
+                self._write(text)
+            self._pending.clear()
+            self._out.flush()
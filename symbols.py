@@ -0,0 +1,188 @@
+"""Symbol master index that resolves company names and aliases to canonical tickers."""
+import csv
+import difflib
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Words that do not help tell companies apart
+_NOISE_WORDS = {
+    "THE", "INC", "INCORPORATED", "CORP", "CORPORATION", "CO", "COMPANY", "LTD", "LIMITED",
+    "PLC", "HOLDINGS", "HOLDING", "GROUP", "NV", "SA", "AG", "CLASS", "A", "B", "C",
+    "STOCK", "SHARES", "COM"
+}
+# Input shaped like a ticker is never completed or corrected to another one
+_TICKER_SHAPED_RE = re.compile(r"[A-Za-z]{1,5}")
+
+
+def normalize_name(text: str) -> str:
+    """Uppercase, drop punctuation and corporate suffixes: 'Apple Inc.' -> 'APPLE'."""
+    text = text.upper().replace("&", " AND ")
+    words = [w for w in re.split(r"[^A-Z0-9]+", text) if w]
+    meaningful = [w for w in words if w not in _NOISE_WORDS]
+    return " ".join(meaningful or words)
+
+
+def normalize_ticker(text: str) -> str:
+    """Canonical ticker spelling: 'brk-b ' -> 'BRK.B'."""
+    return re.sub(r"[-/]", ".", text.strip().upper())
+
+
+class _TrieNode:
+    __slots__ = ("children", "symbols")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.symbols: Set[str] = set()
+
+
+class SymbolIndex:
+    """Resolve user input ('apple', 'AAPL ', 'Apple Inc') to one canonical ticker.
+
+    Exact tickers and normalized names/aliases are looked up in dicts that
+    are built on first use. The prefix trie and fuzzy matching used for
+    partial or misspelled names are only built when an exact lookup misses,
+    and are skipped for bare 1-5 letter input, which is taken as a ticker
+    ("HOME" stays unknown rather than becoming HD).
+    """
+
+    def __init__(self, path: Path, fuzzy_cutoff: float = 0.8):
+        self.path = Path(path)
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._lock = threading.Lock()
+        self._tickers: Optional[Dict[str, str]] = None  # normalized ticker -> display name
+        self._names: Dict[str, str] = {}  # normalized name/alias -> ticker
+        self._trie: Optional[_TrieNode] = None
+        self._resolved: Dict[str, str] = {}
+
+    def _load(self):
+        """Read the symbol master CSV (symbol,name,aliases with '|' separators)."""
+        tickers: Dict[str, str] = {}
+        names: Dict[str, str] = {}
+        if self.path.exists():
+            try:
+                with self.path.open(newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        symbol = normalize_ticker(row.get("symbol") or "")
+                        if not symbol:
+                            continue
+                        name = (row.get("name") or "").strip()
+                        tickers[symbol] = name or symbol
+                        aliases = [a for a in (row.get("aliases") or "").split("|") if a.strip()]
+                        for alias in [name] + aliases:
+                            if not alias:
+                                continue
+                            # Aliases that look like tickers ("GOOG", "BRK-B") map too
+                            names.setdefault(normalize_name(alias), symbol)
+                            names.setdefault(normalize_ticker(alias), symbol)
+            except Exception as e:
+                logger.error(f"Failed to load symbol master {self.path}: {e}")
+        else:
+            logger.warning(f"Symbol master not found: {self.path}")
+        self._names = names
+        self._tickers = tickers
+        logger.info(f"Loaded {len(tickers)} symbols, {len(names)} names/aliases")
+
+    def _ensure_loaded(self):
+        if self._tickers is None:
+            with self._lock:
+                if self._tickers is None:
+                    self._load()
+
+    def _ensure_trie(self) -> _TrieNode:
+        if self._trie is None:
+            with self._lock:
+                if self._trie is None:
+                    root = _TrieNode()
+                    for name, symbol in self._names.items():
+                        node = root
+                        for ch in name:
+                            node = node.children.setdefault(ch, _TrieNode())
+                            node.symbols.add(symbol)
+                    self._trie = root
+        return self._trie
+
+    def _prefix_symbols(self, prefix: str) -> Set[str]:
+        node = self._ensure_trie()
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.symbols
+
+    def lookup(self, query: str) -> Optional[str]:
+        """Return the canonical ticker for query, or None if it is unknown."""
+        self._ensure_loaded()
+        ticker = normalize_ticker(query)
+        if ticker in self._tickers:
+            return ticker
+        name = normalize_name(query)
+        if not name:
+            return None
+        if name in self._names:
+            return self._names[name]
+        if ticker in self._names:
+            return self._names[ticker]
+        if _TICKER_SHAPED_RE.fullmatch(query.strip()):
+            return None
+
+        # Unique completion of a partial name ("micros" -> MSFT)
+        candidates = self._prefix_symbols(name)
+        if len(candidates) == 1:
+            return self._approximate(query, next(iter(candidates)))
+
+        # Misspellings ("nvidai" -> NVDA)
+        matches = difflib.get_close_matches(name, self._names.keys(), n=1, cutoff=self.fuzzy_cutoff)
+        if matches:
+            return self._approximate(query, self._names[matches[0]])
+        return None
+
+    def _approximate(self, query: str, symbol: str) -> str:
+        logger.warning(f"No exact match for '{query.strip()}'; using closest name {symbol} "
+                       f"({self._tickers.get(symbol, symbol)})")
+        return symbol
+
+    def exact_name(self, text: str) -> Optional[str]:
+        """Ticker whose company name or alias is exactly text (after normalization)."""
+        self._ensure_loaded()
+        name = normalize_name(text)
+        return self._names.get(name) if name else None
+
+    def resolve(self, query: str) -> str:
+        """Canonical ticker for query; unknown input falls back to its normalized ticker form."""
+        key = query.strip()
+        cached = self._resolved.get(key)
+        if cached is not None:
+            return cached
+        symbol = self.lookup(key) or normalize_ticker(key)
+        self._resolved[key] = symbol
+        if symbol != key:
+            logger.info(f"Resolved '{key}' to {symbol}")
+        return symbol
+
+    def display_name(self, symbol: str) -> str:
+        """Company name for a canonical ticker, or the ticker itself."""
+        self._ensure_loaded()
+        return self._tickers.get(symbol, symbol)
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[Tuple[str, str]]:
+        """(ticker, name) pairs whose name or alias starts with prefix."""
+        self._ensure_loaded()
+        name = normalize_name(prefix)
+        if not name:
+            return []
+        symbols = sorted(self._prefix_symbols(name))[:limit]
+        return [(symbol, self._tickers.get(symbol, symbol)) for symbol in symbols]
+
+
+# Singleton instance
+symbol_index = SymbolIndex(Config.SYMBOL_MASTER_FILE)
+
+
+def resolve_symbol(query: str) -> str:
+    return symbol_index.resolve(query)
@@ -6,6 +6,7 @@ from stock_research_crew.agents import (
     risk_manager,
     investment_advisor
 )
+from stock_research_crew.decision import JSON_INSTRUCTIONS
 
 research_task = Task(
     description="""
@@ -34,6 +35,8 @@ analysis_task = Task(
     - Competitive moat and market position
     - Valuation assessment (overvalued/undervalued/fairly valued)
     - Key financial metrics and ratios (if available)
+    - Price performance, trend vs moving averages and fundamentals from the
+      Market Data tool (if available)
     
     Provide clear reasoning for all assessments.
     """,
@@ -51,6 +54,7 @@ risk_task = Task(
     - Financial risks (debt, cash flow, profitability)
     - Regulatory and legal risks
     - Management and governance risks
+    - Price risk: volatility and drawdowns from the Market Data tool (if available)
     
     Rate each risk as Low/Medium/High severity.
     """,
@@ -86,7 +90,7 @@ investment_decision_task = Task(
        - Catalysts or triggers to watch
     
     Format output clearly with sections for scores, decision, confidence, and reasoning.
-    """,
+    """ + JSON_INSTRUCTIONS,
     expected_output="Complete investment recommendation with scores, decision, confidence, and detailed reasoning",
     agent=investment_advisor
 )
@@ -0,0 +1,23 @@
+"""Import the package from this checkout and keep test caches out of .cache."""
+import importlib.util
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules import `config` from the checkout and each other as stock_research_crew.*;
+# via sys.path (not sys.modules) so spawned worker processes can import them too
+sys.path.insert(0, str(ROOT))
+if importlib.util.find_spec("stock_research_crew") is None:
+    if ROOT.name == "stock_research_crew":
+        sys.path.insert(0, str(ROOT.parent))
+    else:
+        _package_dir = Path(tempfile.mkdtemp(prefix="stock-research-package-"))
+        (_package_dir / "stock_research_crew").symlink_to(ROOT, target_is_directory=True)
+        sys.path.insert(0, str(_package_dir))
+
+# Module singletons (cache_manager, market_store) open their files on import;
+# set through the environment so spawned worker processes use it too
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="stock-research-tests-")
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("httpx")
+
+from stock_research_crew.agents import llm_for, set_stream_callback, _timed_llms
+from config import Config
+
+
+def test_one_wrapper_stack_per_model(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_RATE_LIMIT_RPM", 60)
+    small = llm_for("ollama/tier-small")
+    big = llm_for("ollama/tier-big")
+
+    assert llm_for("ollama/tier-small") is small
+    assert small is not big
+    assert small.model_name == "ollama/tier-small"
+    timed_small, timed_big = _timed_llms["ollama/tier-small"], _timed_llms["ollama/tier-big"]
+    # Per-model rate limits and breakers, one concurrency limit for the shared host
+    assert timed_small._rate_limiter is not timed_big._rate_limiter
+    assert timed_small._breaker is not timed_big._breaker
+    assert timed_small._limiter is timed_big._limiter
+    assert timed_small._client._pools is timed_big._client._pools
+
+
+def test_stream_callback_reaches_every_model():
+    llm_for("ollama/tier-small")
+    llm_for("ollama/tier-big")
+    callback = lambda caller, text: None
+    try:
+        set_stream_callback(callback)
+        assert all(timed.stream_callback is callback for timed in _timed_llms.values())
+    finally:
+        set_stream_callback(None)
@@ -0,0 +1,212 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from stock_research_crew.allocation import (
+    MIN_HISTORY, TRADING_DAYS, _history_matrix, _pairwise_covariance, allocate, cap_weights,
+    estimate_moments, mean_variance_weights, project_capped_simplex, risk_parity_weights
+)
+from stock_research_crew.decision import InvestmentDecision
+
+
+def _decision(stock, total):
+    return InvestmentDecision(stock, 20, 20, 15, 20, total, "BUY")
+
+
+def _business_days(start, count):
+    return np.busday_offset(np.datetime64(start), np.arange(count), roll="forward")
+
+
+def _random_cov(rng, n):
+    a = rng.normal(size=(n, n))
+    return a @ a.T / n + np.diag(rng.uniform(0.01, 0.1, n))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cap_weights_respects_the_cap(seed):
+    rng = np.random.default_rng(seed)
+    weights = cap_weights(rng.exponential(size=8) ** 3, 0.2)
+
+    assert weights.sum() <= 1 + 1e-9
+    assert weights.max() <= 0.2 + 1e-9
+    assert weights.sum() == pytest.approx(1.0)
+
+
+def test_cap_weights_with_too_few_names_leaves_cash():
+    weights = cap_weights(np.array([5.0, 1.0, 1.0]), 0.25)
+
+    np.testing.assert_allclose(weights, [0.25, 0.25, 0.25])
+
+
+def test_project_capped_simplex():
+    np.testing.assert_allclose(project_capped_simplex(np.array([0.5, 0.3, 0.2]), 0.4),
+                               [0.4, 0.35, 0.25], atol=1e-9)
+    np.testing.assert_allclose(project_capped_simplex(np.array([3.0, -1.0, 0.0, 0.5]), 1.0),
+                               [1.0, 0.0, 0.0, 0.0], atol=1e-9)
+    np.testing.assert_allclose(project_capped_simplex(np.array([0.9, 0.1]), 0.4), [0.4, 0.4])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_risk_parity_equalizes_risk_contributions(seed):
+    cov = _random_cov(np.random.default_rng(seed), 6)
+
+    weights = risk_parity_weights(cov)
+    contributions = weights * (cov @ weights)
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert (weights > 0).all()
+    np.testing.assert_allclose(contributions, contributions.mean(), rtol=1e-6)
+
+
+def test_mean_variance_matches_closed_form_when_uncapped():
+    rng = np.random.default_rng(7)
+    cov = _random_cov(rng, 4)
+    mu = np.array([0.08, 0.1, 0.09, 0.11])
+    risk_aversion = 50.0
+    inverse = np.linalg.inv(cov)
+    ones = np.ones(4)
+    # Fully invested optimum: w = inv(Σ)(mu - λ1) / γ with λ making the weights sum to one
+    lam = (ones @ inverse @ mu - risk_aversion) / (ones @ inverse @ ones)
+    expected = inverse @ (mu - lam) / risk_aversion
+    assert (expected > 0).all()
+
+    weights = mean_variance_weights(mu, cov, risk_aversion, max_weight=1.0, iterations=20000)
+
+    np.testing.assert_allclose(weights, expected, atol=1e-6)
+
+
+def test_mean_variance_capped_beats_other_feasible_portfolios():
+    rng = np.random.default_rng(3)
+    cov = _random_cov(rng, 5)
+    mu = rng.uniform(0.0, 0.3, 5)
+
+    def utility(w):
+        return mu @ w - 1.5 * (w @ cov @ w)
+
+    weights = mean_variance_weights(mu, cov, 3.0, max_weight=0.3)
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert weights.max() <= 0.3 + 1e-9
+    for _ in range(200):
+        other = project_capped_simplex(rng.dirichlet(np.ones(5)), 0.3)
+        assert utility(weights) >= utility(other) - 1e-9
+
+
+def test_history_matrix_joins_series_on_business_days():
+    days = _business_days("2024-01-02", 40)
+    a = np.arange(40, dtype=float)
+    # B starts 5 days later, skips day 20 and has a weekend date that is dropped
+    b_dates = np.concatenate([np.delete(days[5:], 15), [np.datetime64("2024-01-06")]])
+    b = np.concatenate([np.delete(a[5:], 15), [999.0]]) + 100
+
+    matrix = _history_matrix(["A", "B"], {"A": (days, a), "B": (b_dates, b)}, window=30)
+
+    assert matrix.shape == (30, 2)
+    np.testing.assert_array_equal(matrix[:, 0], a[10:])
+    expected_b = a[10:] + 100
+    expected_b[10] = np.nan
+    np.testing.assert_array_equal(matrix[:, 1], expected_b)
+
+
+def test_history_matrix_needs_min_history():
+    days = _business_days("2024-01-02", MIN_HISTORY)
+
+    matrix = _history_matrix(["A", "B", "C"], {
+        "A": (days, np.ones(MIN_HISTORY)),
+        "B": (days[1:], np.ones(MIN_HISTORY - 1))
+    })
+
+    # The calendar spans ANALYTICS_WINDOW_DAYS; A fills its last MIN_HISTORY days
+    np.testing.assert_array_equal(matrix[-MIN_HISTORY:, 0], 1.0)
+    assert np.count_nonzero(~np.isnan(matrix[:, 0])) == MIN_HISTORY
+    assert np.isnan(matrix[:, 1]).all()
+    assert np.isnan(matrix[:, 2]).all()
+    assert _history_matrix(["B"], {"B": (days[1:], np.ones(MIN_HISTORY - 1))}) is None
+    assert _history_matrix(["A"], {}) is None
+
+
+def test_pairwise_covariance_uses_overlapping_days():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(50, 3))
+    data[:10, 1] = np.nan
+    data[30:, 2] = np.nan
+
+    cov = _pairwise_covariance(data)
+
+    for i in range(3):
+        for j in range(3):
+            both = ~np.isnan(data[:, i]) & ~np.isnan(data[:, j])
+            assert cov[i, j] == pytest.approx(np.cov(data[both, i], data[both, j])[0, 1])
+
+
+def test_estimate_moments_fills_stocks_without_history():
+    rng = np.random.default_rng(2)
+    history = np.full((60, 3), np.nan)
+    history[:, 0] = rng.normal(0.001, 0.01, 60)
+    history[:, 1] = rng.normal(0.002, 0.02, 60)
+
+    mu, cov = estimate_moments(history, shrinkage=0.0)
+
+    np.testing.assert_allclose(mu[:2], history[:, :2].mean(axis=0) * TRADING_DAYS)
+    np.testing.assert_allclose(cov[:2, :2], np.cov(history[:, :2], rowvar=False) * TRADING_DAYS)
+    assert mu[2] == pytest.approx(np.median(mu[:2]))
+    assert cov[2, 2] == pytest.approx(np.median(np.diag(cov[:2, :2])))
+    assert cov[2, 0] == cov[2, 1] == 0.0
+
+
+def test_allocate_without_history_falls_back_to_scores():
+    decisions = [_decision("AAPL", 80), _decision("MSFT", 70), _decision("XOM", 40)]
+
+    allocation = allocate(decisions, 10000, method="risk_parity", max_weight=1.0, min_score=50)
+
+    assert allocation.method == "score"
+    # Weights proportional to score - floor + 1
+    assert allocation.weights == {"AAPL": pytest.approx(31 / 52), "MSFT": pytest.approx(21 / 52)}
+    assert "XOM" in allocation.excluded
+    assert allocation.expected_return is None
+
+
+def test_allocate_joins_misaligned_series_by_date():
+    rng = np.random.default_rng(4)
+    days = _business_days("2024-01-02", 80)
+    a = rng.normal(0.0, 0.01, 80)
+    b = rng.normal(0.0, 0.02, 80)
+    decisions = [_decision("A", 80), _decision("B", 80)]
+
+    aligned = allocate(decisions, 1000, returns={"A": (days, a), "B": (days, b)},
+                       method="risk_parity", max_weight=1.0)
+    # B's series starts later; the shared days must still line up by date
+    shifted = allocate(decisions, 1000, returns={"A": (days, a), "B": (days[10:], b[10:])},
+                       method="risk_parity", max_weight=1.0)
+
+    history = _history_matrix(["A", "B"], {"A": (days, a), "B": (days[10:], b[10:])})
+    np.testing.assert_array_equal(history[-80:, 0], a)
+    np.testing.assert_array_equal(history[-70:, 1], b[10:])
+    # B is twice as volatile, so it gets about a third of the weight either way
+    assert aligned.weights["B"] == pytest.approx(1 / 3, abs=0.05)
+    assert shifted.weights["B"] == pytest.approx(1 / 3, abs=0.05)
+    assert sum(shifted.weights.values()) == pytest.approx(1.0)
+
+    # A later series that tracks A day for day is perfectly correlated once joined by date
+    mu, cov = estimate_moments(_history_matrix(["A", "C"], {"A": (days, a), "C": (days[10:], 2 * a[10:])}),
+                               shrinkage=0.0)
+    assert cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1]) == pytest.approx(1.0, abs=0.05)
+
+
+def test_allocate_risk_parity_caps_weights():
+    rng = np.random.default_rng(5)
+    days = _business_days("2024-01-02", 60)
+    vols = [0.005, 0.01, 0.02, 0.04]
+    returns = {f"S{i}": (days, rng.normal(0.0, vol, 60)) for i, vol in enumerate(vols)}
+    decisions = [_decision(stock, 80) for stock in returns]
+
+    allocation = allocate(decisions, 1000, returns=returns, method="risk_parity", max_weight=0.3)
+
+    assert max(allocation.weights.values()) <= 0.3 + 1e-6
+    assert sum(allocation.weights.values()) + allocation.cash == pytest.approx(1.0)
+    assert allocation.volatility is not None
+
+
+def test_allocate_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        allocate([_decision("AAPL", 80)], 1000, method="equal")
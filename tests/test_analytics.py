@@ -0,0 +1,106 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from stock_research_crew.analytics import PortfolioAnalytics
+from stock_research_crew.marketdata import TRADING_DAYS
+
+
+class StubStore:
+    """Dated returns and sectors in place of the market-data store."""
+
+    def __init__(self, returns, sectors=None):
+        self._returns = returns
+        self._sectors = sectors or {}
+
+    def dated_returns(self, stock):
+        return self._returns.get(stock)
+
+    def fundamentals(self, stock):
+        sector = self._sectors.get(stock)
+        return {"sector": sector} if sector else {}
+
+
+def _business_days(start, count):
+    return np.busday_offset(np.datetime64(start), np.arange(count), roll="forward").astype(np.int32)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    days = _business_days("2024-01-02", 120)
+    market = rng.normal(0, 0.01, 120)
+    series = {
+        "AAPL": (days, market + rng.normal(0, 0.005, 120)),
+        # Starts later and has gaps
+        "MSFT": (np.delete(days[30:], [10, 11, 40]), np.delete(market[30:] + rng.normal(0, 0.01, 90), [10, 11, 40])),
+        # Ends earlier, with a missing value
+        "XOM": (days[:100], np.where(np.arange(100) == 50, np.nan, rng.normal(0, 0.02, 100))),
+        "NVDA": (days, 2 * market + rng.normal(0, 0.01, 120)),
+        "TINY": (days[-10:], rng.normal(0, 0.01, 10)),
+    }
+    return series
+
+
+def _joined(returns, stocks, calendar):
+    """Batch reference: each stock's returns on the calendar, NaN where missing."""
+    matrix = np.full((len(calendar), len(stocks)), np.nan)
+    for i, stock in enumerate(stocks):
+        dates, values = returns[stock]
+        for date, value in zip(dates, values):
+            row = np.searchsorted(calendar, date)
+            if row < len(calendar) and calendar[row] == date:
+                matrix[row, i] = value
+    return matrix
+
+
+def test_incremental_add_matches_batch_statistics(returns):
+    analytics = PortfolioAnalytics(StubStore(returns), window=100)
+
+    assert analytics.add(["AAPL", "MSFT"]) == ["AAPL", "MSFT"]
+    assert analytics.add(["XOM", "AAPL", "TINY"]) == ["XOM"]
+    assert analytics.add(["NVDA"]) == ["NVDA"]
+    assert analytics.missing == ["TINY"]
+
+    stocks = analytics.symbols
+    matrix = _joined(returns, stocks, analytics._calendar)
+    correlation, covariance = analytics.correlation(), analytics.covariance()
+    for i in range(len(stocks)):
+        for j in range(len(stocks)):
+            both = ~np.isnan(matrix[:, i]) & ~np.isnan(matrix[:, j])
+            x, y = matrix[both, i], matrix[both, j]
+            assert correlation[i, j] == pytest.approx(np.corrcoef(x, y)[0, 1])
+            assert covariance[i, j] == pytest.approx(np.cov(x, y)[0, 1] * TRADING_DAYS)
+            assert analytics._overlap[i, j] == both.sum()
+
+
+def test_calendar_is_the_window_before_the_latest_date(returns):
+    analytics = PortfolioAnalytics(StubStore(returns), window=100)
+    analytics.add(["AAPL"])
+
+    assert len(analytics._calendar) == 100
+    assert analytics._calendar[-1] == returns["AAPL"][0][-1]
+
+
+def test_sector_concentration_hhi():
+    store = StubStore({}, sectors={"AAPL": "Technology", "MSFT": "Technology", "XOM": "Energy"})
+    analytics = PortfolioAnalytics(store, window=100)
+
+    equal = analytics.sector_concentration(stocks=["AAPL", "MSFT", "XOM", "ACME"])
+    weighted = analytics.sector_concentration(weights={"AAPL": 0.3, "MSFT": 0.3, "XOM": 0.2, "ACME": 0.2})
+
+    assert equal == {
+        "sectors": {"Technology": 0.5, "Energy": 0.25, "Unknown": 0.25},
+        "hhi": 0.375,
+        "effective_sectors": 2.67
+    }
+    assert weighted["sectors"] == {"Technology": 0.6, "Energy": 0.2, "Unknown": 0.2}
+    assert weighted["hhi"] == pytest.approx(0.44)
+
+
+def test_clusters_group_correlated_stocks(returns):
+    analytics = PortfolioAnalytics(StubStore(returns), window=100)
+    analytics.add(["AAPL", "NVDA", "XOM"])
+
+    assert analytics.clusters(threshold=0.5) == [["AAPL", "NVDA"], ["XOM"]]
+    assert analytics.top_pairs(limit=1)[0]["pair"] == ("AAPL", "NVDA")
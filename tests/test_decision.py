@@ -0,0 +1,76 @@
+from stock_research_crew.decision import InvestmentDecision, decision_for_score, parse_decision, rank_decisions
+
+JSON_OUTPUT = """
+Final assessment follows.
+
+```json
+{"business_quality": 25, "growth_potential": 20, "valuation": 15, "risk_profile": 20,
+ "total_score": 80, "decision": "BUY", "confidence": "high",
+ "reasoning": ["Strong moat", "Services growth"]}
+```
+"""
+
+PROSE_OUTPUT = """
+1. SCORES:
+   - Business Quality (0-30): 20
+   - Growth Potential (0-25): 15
+   - Valuation (0-20): 10
+   - Risk Profile (0-25): 12
+   Total Score: 57
+2. DECISION: HOLD
+3. CONFIDENCE: Medium
+4. REASONING:
+   - **Solid** balance sheet
+   - Slowing growth
+"""
+
+
+def test_parse_json_block():
+    decision = parse_decision(JSON_OUTPUT, "AAPL")
+    assert decision.total_score == 80
+    assert decision.decision == "BUY"
+    assert decision.confidence == "High"
+    assert decision.reasoning == ["Strong moat", "Services growth"]
+
+
+def test_parse_prose_skips_score_ranges():
+    decision = parse_decision(PROSE_OUTPUT, "MSFT")
+    assert (decision.business_quality, decision.growth_potential,
+            decision.valuation, decision.risk_profile) == (20, 15, 10, 12)
+    assert decision.total_score == 57
+    assert decision.decision == "HOLD"
+    assert decision.confidence == "Medium"
+    assert decision.reasoning == ["Solid balance sheet", "Slowing growth"]
+
+
+def test_scores_are_clamped_and_total_recomputed():
+    text = ('{"business_quality": 45, "growth_potential": 20, "valuation": -3, '
+            '"risk_profile": 20, "total_score": 99}')
+    decision = parse_decision(text, "NVDA")
+    assert decision.business_quality == 30
+    assert decision.valuation == 0
+    assert decision.total_score == 70
+    assert decision.decision == "HOLD"  # Missing decision falls back to the score band
+
+
+def test_missing_scores_give_none():
+    assert parse_decision("No scores here.", "XOM") is None
+    assert parse_decision("", "XOM") is None
+
+
+def test_decision_bands():
+    assert [decision_for_score(s) for s in (75, 74, 50, 49)] == ["BUY", "HOLD", "HOLD", "AVOID"]
+
+
+def test_dict_round_trip_ignores_unknown_keys():
+    decision = parse_decision(JSON_OUTPUT, "AAPL")
+    data = dict(decision.to_dict(), extra="ignored")
+    assert InvestmentDecision.from_dict(data) == decision
+
+
+def test_rank_by_score_then_confidence():
+    def make(stock, total, confidence):
+        return InvestmentDecision(stock, 0, 0, 0, 0, total, decision_for_score(total), confidence)
+
+    ranked = rank_decisions([make("A", 60, "Low"), make("B", 80, None), make("C", 60, "High")])
+    assert [d.stock for d in ranked] == ["B", "C", "A"]
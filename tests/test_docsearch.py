@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.docsearch import DocumentIndex, make_snippet, passages, tokenize
+
+
+@pytest.fixture
+def docs(tmp_path):
+    root = tmp_path / "docs"
+    (root / "news").mkdir(parents=True)
+    (root / "aapl_10k.txt").write_text(
+        "filler text about markets. " * 100
+        + "Apple services revenue grew 14% driven by App Store subscriptions. "
+        + "more filler words here. " * 100
+    )
+    (root / "news" / "msft.html").write_text(
+        "<html><script>var hidden = 1;</script><p>Microsoft Azure cloud growth &amp; AI demand.</p></html>"
+    )
+    (root / "xom.md").write_text("# Exxon\nRefining margins weighed on Exxon Mobil earnings.")
+    (root / "notes.csv").write_text("not,indexed\n")
+    yield root
+    cache_manager.delete_documents([path for path, _ in cache_manager.iter_documents()])
+
+
+def test_tokenize_drops_stopwords_and_keeps_decimals():
+    assert tokenize("The EPS was 1.25 in Q3") == ["eps", "1.25", "q3"]
+
+
+def test_passages_split_long_text():
+    text = " ".join(f"w{i}" for i in range(450))
+    spans = passages(text)
+    assert len(spans) == 3
+    assert text[spans[-1][0]:spans[-1][1]].split() == [f"w{i}" for i in range(400, 450)]
+
+
+def test_snippet_is_the_window_with_the_query_terms():
+    text = " ".join(["filler"] * 100 + ["revenue", "grew"] + ["filler"] * 100)
+    snippet = make_snippet(text, {"revenue", "grew"})
+    assert "revenue grew" in snippet
+    assert snippet.startswith("... ") and snippet.endswith(" ...")
+
+
+def test_search_ranks_matching_documents(docs):
+    index = DocumentIndex(docs, refresh_interval=0)
+    assert index.has_documents()
+    assert index.document_count() == 3
+
+    results = index.search("Apple services revenue")
+    assert results[0]["source"] == "aapl_10k.txt"
+    assert "services revenue grew" in results[0]["snippet"]
+    assert index.search("azure")[0]["source"] == "news/msft.html"
+    assert index.search("hidden") == []  # Script contents are not indexed
+    assert index.search("quantum entanglement") == []
+
+
+def test_refresh_reindexes_only_changed_and_removed_files(docs):
+    index = DocumentIndex(docs, refresh_interval=0)
+    index.refresh()
+    (docs / "xom.md").write_text("# Exxon\nNatural gas volumes rose.")
+    os.utime(docs / "xom.md", ns=(1, 1))
+    os.remove(docs / "news" / "msft.html")
+
+    assert index.refresh(force=True) == 2
+    assert index.search("refining") == []
+    assert index.search("natural gas")[0]["source"] == "xom.md"
+    assert index.search("azure") == []
+
+
+def test_a_new_index_loads_stored_documents_without_reindexing(docs):
+    DocumentIndex(docs, refresh_interval=0).refresh()
+    assert sorted(path for path, _ in cache_manager.iter_documents()) == [
+        "aapl_10k.txt", "news/msft.html", "xom.md"
+    ]
+    reopened = DocumentIndex(docs, refresh_interval=0)
+    assert reopened.refresh() == 0
+    assert reopened.search("exxon")[0]["source"] == "xom.md"
+
+
+def test_empty_directory(tmp_path):
+    index = DocumentIndex(tmp_path / "missing")
+    assert not index.has_documents()
+    assert index.search("anything") == []
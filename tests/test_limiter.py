@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from stock_research_crew.limiter import AdaptiveLimiter, LimiterTimeout, TokenBucket, _parse_rate_limits
+
+
+def test_acquire_times_out_when_all_slots_are_busy():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    limiter.acquire()
+    with pytest.raises(LimiterTimeout):
+        limiter.acquire(timeout=0)
+    assert limiter.stats()["queued"] == 0  # The timed-out waiter left the queue
+
+
+def test_release_hands_the_slot_to_a_waiter():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def waiter():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    limiter.release(None, ok=True)
+    thread.join(timeout=5)
+    assert acquired.is_set()
+    assert limiter.stats()["inflight"] == 1
+
+
+def test_failure_halves_the_limit_but_not_below_min():
+    limiter = AdaptiveLimiter(initial=8, min_limit=2, max_limit=16)
+    limiter.acquire()
+    limiter.release(0.1, ok=False)
+    assert limiter.limit == 4
+
+    limiter = AdaptiveLimiter(initial=3, min_limit=2, max_limit=16)
+    limiter.acquire()
+    limiter.release(0.1, ok=False)
+    assert limiter.limit == 2
+
+
+def test_slow_calls_count_as_overload():
+    limiter = AdaptiveLimiter(initial=4, latency_target=1.0)
+    with limiter.slot():
+        pass
+    limiter.acquire()
+    limiter.release(5.0, ok=True)
+    assert limiter.limit == 2
+
+
+def test_limit_grows_only_while_saturated():
+    limiter = AdaptiveLimiter(initial=1, max_limit=4)
+    limiter.acquire()
+    limiter.release(0.1, ok=True)
+    assert limiter.limit == 2
+
+    limiter.acquire()  # One of two slots used: not saturated
+    limiter.release(0.1, ok=True)
+    assert limiter.limit == 2
+
+
+def test_slot_reports_retryable_errors_as_failures():
+    limiter = AdaptiveLimiter(initial=4)
+    with pytest.raises(TimeoutError):
+        with limiter.slot():
+            raise TimeoutError("backend timed out")
+    assert limiter.limit == 2
+    assert limiter.stats()["inflight"] == 0
+
+
+def test_token_bucket_allows_a_burst_then_enforces_the_rate():
+    bucket = TokenBucket(rate_per_minute=600, burst=2)  # One token per 0.1s
+    bucket.acquire(timeout=0)
+    bucket.acquire(timeout=0)
+    with pytest.raises(LimiterTimeout):
+        bucket.acquire(timeout=0.05)
+    # The refused call gave its token back, so the next one waits 0.1s, not 0.2s
+    bucket.acquire(timeout=0.15)
+
+
+def test_parse_rate_limits_skips_malformed_entries():
+    assert _parse_rate_limits("ollama/mistral=30, bad, ollama/llama3=x,ollama/phi=10") == {
+        "ollama/mistral": 30.0, "ollama/phi": 10.0
+    }
+
+
+def test_lowering_the_max_clamps_the_limit():
+    limiter = AdaptiveLimiter(initial=8, min_limit=4, max_limit=16)
+
+    limiter.set_max_limit(2)
+
+    assert limiter.limit == 2
+    assert limiter.min_limit == 2
+    limiter.acquire(timeout=0)
+    limiter.acquire(timeout=0)
+    with pytest.raises(LimiterTimeout):
+        limiter.acquire(timeout=0)
@@ -0,0 +1,135 @@
+import math
+import statistics
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from stock_research_crew.marketdata import MarketDataStore, TRADING_DAYS, compute_indicators
+
+
+def _write_prices(path, closes, start="2024-01-02", volume=1000):
+    days = np.busday_offset(np.datetime64(start), np.arange(len(closes)), roll="forward")
+    lines = ["Date,Open,High,Low,Close,Volume"]
+    for day, close in zip(days, closes):
+        lines.append(f"{day},{close},{close},{close},{close},{volume}")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _store(tmp_path, grace_period=3600.0):
+    return MarketDataStore(tmp_path / "drops", tmp_path / "store", refresh_interval=0, grace_period=grace_period)
+
+
+def _generations(tmp_path):
+    return sorted(p.name for p in (tmp_path / "store").glob("gen-*"))
+
+
+@pytest.fixture
+def drops(tmp_path):
+    (tmp_path / "drops").mkdir()
+    return tmp_path / "drops"
+
+
+def test_ingests_drops(tmp_path, drops):
+    _write_prices(drops / "aapl.csv", [10.0, 11.0, 12.0])
+    (drops / "fundamentals.csv").write_text("Ticker,PE,Sector\naapl,28.5,Technology\n", encoding="utf-8")
+    store = _store(tmp_path)
+
+    assert store.symbols() == ["AAPL"]
+    history = store.history("aapl")
+    np.testing.assert_array_equal(history["close"], [10.0, 11.0, 12.0])
+    np.testing.assert_allclose(store.returns("AAPL"), [0.1, 1 / 11])
+    assert store.fundamentals("AAPL") == {"pe": 28.5, "sector": "Technology"}
+    assert store.history("MSFT") is None
+
+
+def test_new_generation_leaves_old_readers_valid(tmp_path, drops):
+    _write_prices(drops / "aapl.csv", [10.0, 11.0, 12.0])
+    reader = _store(tmp_path)
+    old = reader.history("AAPL")
+    old_generation = _generations(tmp_path)
+
+    # Another process ingests a changed drop
+    time.sleep(0.01)
+    _write_prices(drops / "aapl.csv", [20.0, 21.0, 22.0, 23.0])
+    assert _store(tmp_path).refresh()
+
+    assert len(_generations(tmp_path)) == 2
+    assert set(old_generation) < set(_generations(tmp_path))
+    # The old slice is still mapped and readable
+    np.testing.assert_array_equal(old["close"], [10.0, 11.0, 12.0])
+    # The reader switches on its next lookup
+    np.testing.assert_array_equal(reader.history("AAPL")["close"], [20.0, 21.0, 22.0, 23.0])
+
+
+def test_prunes_only_generations_past_the_grace_period(tmp_path, drops):
+    _write_prices(drops / "aapl.csv", [10.0, 11.0])
+    store = _store(tmp_path, grace_period=3600)
+    store.refresh()
+    (current,) = _generations(tmp_path)
+    now = time.time_ns()
+    # Superseded two hours ago by the next one, and one superseded only now
+    expired = f"gen-{now - 3 * 3600 * 10**9}-1"
+    recent = f"gen-{now - 2 * 3600 * 10**9}-1"
+    for name in (expired, recent):
+        (tmp_path / "store" / name).mkdir()
+
+    store._prune_generations(current)
+
+    assert _generations(tmp_path) == sorted([recent, current])
+
+
+def test_superseded_generations_are_kept_within_the_grace_period(tmp_path, drops):
+    store = _store(tmp_path, grace_period=3600)
+    for closes in ([10.0, 11.0], [12.0, 13.0], [14.0, 15.0]):
+        _write_prices(drops / "aapl.csv", closes)
+        time.sleep(0.01)
+        store.refresh()
+
+    assert len(_generations(tmp_path)) == 3
+
+    store.grace_period = 0
+    _write_prices(drops / "aapl.csv", [16.0, 17.0])
+    store.refresh()
+
+    assert len(_generations(tmp_path)) == 1
+    np.testing.assert_array_equal(store.history("AAPL")["close"], [16.0, 17.0])
+
+
+def test_indicators_match_hand_computed_values():
+    closes = [100.0 + 3 * math.sin(i / 3) + i * 0.5 for i in range(60)]
+    closes[40] = 90.0  # A drawdown
+    volumes = [float(1000 + 10 * i) for i in range(60)]
+    dates = np.arange(19724, 19784, dtype=np.int32)
+
+    ind = compute_indicators(dates, np.array(closes), np.array(volumes))
+
+    returns = [b / a - 1 for a, b in zip(closes, closes[1:])]
+    peak, drawdowns = closes[0], []
+    for close in closes:
+        peak = max(peak, close)
+        drawdowns.append(close / peak - 1)
+    assert ind["start"] == "2024-01-02"
+    assert ind["observations"] == 60
+    assert ind["last_close"] == closes[-1]
+    assert ind["return_1m"] == pytest.approx(closes[-1] / closes[-22] - 1)
+    assert ind["return_3m"] is None
+    assert ind["volatility_1m"] == pytest.approx(statistics.stdev(returns[-21:]) * math.sqrt(TRADING_DAYS))
+    assert ind["volatility_1y"] is None
+    assert ind["max_drawdown"] == pytest.approx(min(drawdowns))
+    assert ind["current_drawdown"] == pytest.approx(drawdowns[-1])
+    assert ind["sma_50"] == pytest.approx(sum(closes[-50:]) / 50)
+    assert ind["sma_200"] is None
+    assert ind["high_52w"] == max(closes)
+    assert ind["low_52w"] == 90.0
+    assert ind["avg_volume_20d"] == pytest.approx(sum(volumes[-20:]) / 20)
+
+
+def test_indicators_skip_missing_closes():
+    ind = compute_indicators(np.arange(4, dtype=np.int32), np.array([10.0, np.nan, 12.0, 9.0]),
+                             np.full(4, np.nan))
+
+    assert ind["observations"] == 3
+    assert ind["max_drawdown"] == pytest.approx(9.0 / 12.0 - 1)
+    assert ind["avg_volume_20d"] is None
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from stock_research_crew.ollama_client import OllamaClient
+from stock_research_crew.perf import TimingLLM
+
+
+class Backend:
+    """MockTransport handler recording request bodies and answering like Ollama."""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request):
+        body = json.loads(request.content)
+        self.requests.append((request.url.path, body))
+        if body["stream"]:
+            lines = [{"response": "Hel", "done": False},
+                     {"response": "lo", "done": False},
+                     {"response": "", "done": True, "prompt_eval_count": 4, "eval_count": 2}]
+            return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines))
+        if request.url.path == "/api/chat":
+            return httpx.Response(200, json={"message": {"content": "chat reply"}, "done": True,
+                                             "prompt_eval_count": 5, "eval_count": 3})
+        return httpx.Response(200, json={"response": "reply", "done": True,
+                                         "prompt_eval_count": 4, "eval_count": 2})
+
+
+@pytest.fixture
+def backend():
+    return Backend()
+
+
+@pytest.fixture
+def client(backend):
+    client = OllamaClient("http://ollama.test", "ollama/stub", temperature=0.2)
+    client._pools.sync_client = httpx.Client(base_url=client.base_url, transport=httpx.MockTransport(backend))
+    return client
+
+
+def _use_mock(client, backend):
+    """Make the current loop's pooled async client talk to backend."""
+    pools = client._pools
+    pools.client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(backend))
+    pools.loop = asyncio.get_running_loop()
+
+
+def test_only_ollama_options_are_sent(client, backend):
+    async def main():
+        _use_mock(client, backend)
+        return await client.complete_with_usage("prompt", max_tokens=50, seed=7, top_p=None)
+
+    text, usage = asyncio.run(main())
+
+    assert text == "reply"
+    assert usage == {"prompt_tokens": 4, "completion_tokens": 2}
+    path, body = backend.requests[0]
+    assert path == "/api/generate"
+    assert body["model"] == "stub"
+    assert body["options"] == {"temperature": 0.2, "num_predict": 50, "seed": 7}
+
+
+def test_unknown_option_is_rejected(client, backend):
+    with pytest.raises(TypeError, match="response_format"):
+        list(client.stream("prompt", response_format={"type": "json"}))
+    assert backend.requests == []
+
+
+def test_stream_parses_chunks(client, backend):
+    chunks = list(client.stream([{"role": "user", "content": "hi"}], stop=["\n"]))
+
+    assert "".join(chunk.get("response", "") for chunk in chunks) == "Hello"
+    assert chunks[-1]["eval_count"] == 2
+    path, body = backend.requests[0]
+    assert path == "/api/chat"
+    assert body["stream"] is True
+    assert body["options"]["stop"] == ["\n"]
+
+
+def test_async_requests_share_one_pooled_client(client, backend):
+    async def main():
+        _use_mock(client, backend)
+        pooled = client._get_client()
+        await client.complete("one")
+        await client.complete([{"role": "user", "content": "two"}])
+        return pooled is client._get_client()
+
+    assert asyncio.run(main())
+    assert [path for path, _ in backend.requests] == ["/api/generate", "/api/chat"]
+
+
+class AsyncStubLLM:
+    def __init__(self):
+        self.calls = []
+
+    async def acall(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        return "wrapped reply"
+
+
+def test_acall_drops_crewai_arguments(client, backend):
+    wrapped = AsyncStubLLM()
+    llm = TimingLLM(wrapped, model_name="ollama/stub", client=client)
+
+    async def main():
+        _use_mock(client, backend)
+        return await llm.acall("prompt", callbacks=[], from_task=None, from_agent=None, temperature=0.0)
+
+    assert asyncio.run(main()) == "reply"
+    assert backend.requests[0][1]["options"] == {"temperature": 0.0}
+    assert wrapped.calls == []
+
+
+def test_acall_with_other_arguments_uses_wrapped_llm(client, backend):
+    wrapped = AsyncStubLLM()
+    llm = TimingLLM(wrapped, model_name="ollama/stub", client=client)
+
+    async def main():
+        _use_mock(client, backend)
+        return await llm.acall("prompt", tools=[{"name": "search"}])
+
+    assert asyncio.run(main()) == "wrapped reply"
+    assert wrapped.calls == [{"tools": [{"name": "search"}]}]
+    assert backend.requests == []
+
+
+def test_model_clients_share_connections(client, backend):
+    other = client.for_model("ollama/other")
+
+    async def main():
+        _use_mock(client, backend)
+        await client.complete("one")
+        await other.complete("two")
+        return client._get_client() is other._get_client()
+
+    assert asyncio.run(main())
+    assert other._pools is client._pools
+    assert [body["model"] for _, body in backend.requests] == ["stub", "other"]
@@ -0,0 +1,110 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.perf import CachingLLM, TimingLLM
+from config import Config
+
+
+class StubLLM:
+    """Blocking LLM that must not be reached by streamed calls."""
+
+    def __init__(self):
+        self.stop = ["Observation:"]
+        self.calls = 0
+
+    def __call__(self, prompt, **kwargs):
+        self.calls += 1
+        return "blocking response"
+
+    def call(self, messages, **kwargs):
+        return self(messages, **kwargs)
+
+
+class StubClient:
+    """Ollama client whose streams replay scripted attempts.
+
+    Each attempt is a list of chunk texts; an exception in the list is
+    raised at that point of the stream.
+    """
+
+    def __init__(self, *attempts):
+        self.attempts = list(attempts)
+        self.streams = []
+
+    def stream(self, prompt, **options):
+        self.streams.append(options)
+        for item in self.attempts.pop(0):
+            if isinstance(item, Exception):
+                raise item
+            yield {"response": item, "done": False}
+        yield {"response": "", "done": True, "prompt_eval_count": 3, "eval_count": 2}
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(Config, "MAX_RETRIES", 3)
+    monkeypatch.setattr(Config, "LLM_RETRY_BASE_DELAY_S", 0.0)
+    monkeypatch.setattr(Config, "LLM_RETRY_MAX_DELAY_S", 0.0)
+
+
+def test_stream_retries_before_first_chunk():
+    client = StubClient([ConnectionError("refused")], ["Hel", "lo"])
+    shown = []
+    llm = TimingLLM(StubLLM(), model_name="stub", client=client)
+
+    assert llm.stream("prompt", on_chunk=lambda caller, text: shown.append(text)) == "Hello"
+    assert shown == ["Hel", "lo"]
+    assert len(client.streams) == 2
+
+
+def test_stream_is_not_retried_after_output_is_shown():
+    client = StubClient(["Hel", ConnectionError("reset")], ["Hello"])
+    shown = []
+    llm = TimingLLM(StubLLM(), model_name="stub", client=client)
+
+    with pytest.raises(ConnectionError):
+        llm.stream("prompt", on_chunk=lambda caller, text: shown.append(text))
+    assert shown == ["Hel"]
+    assert len(client.streams) == 1
+
+
+def test_call_streams_with_the_agent_stop_words(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_STREAM", True)
+    client = StubClient(["Thought"])
+    base = StubLLM()
+    llm = TimingLLM(base, model_name="stub", client=client)
+    llm.set_stream_callback(lambda caller, text: None)
+
+    assert llm.call([{"role": "user", "content": "prompt"}], callbacks=[], from_agent=None) == "Thought"
+    assert client.streams == [{"stop": ["Observation:"]}]
+    assert base.calls == 0
+
+
+def test_cache_hit_skips_the_client():
+    client = StubClient(["fresh ", "answer"])
+    shown = []
+    llm = CachingLLM(TimingLLM(StubLLM(), model_name="stub-cache", client=client),
+                     model_name="stub-cache", cache_manager=cache_manager)
+
+    first = llm.stream("cache me", on_chunk=lambda caller, text: shown.append(text))
+    second = llm.stream("cache me", on_chunk=lambda caller, text: shown.append(text))
+
+    assert first == second == "fresh answer"
+    assert len(client.streams) == 1
+    # The cached response is shown in one piece
+    assert shown == ["fresh ", "answer", "fresh answer"]
+
+
+def test_wrapping_keeps_the_wrapped_stop_words():
+    pytest.importorskip("crewai")
+    base = StubLLM()
+    timed = TimingLLM(base, model_name="stub")
+    cached = CachingLLM(timed, model_name="stub")
+
+    assert base.stop == ["Observation:"]
+    assert cached.stop == ["Observation:"]
+
+    cached.stop = ["Final Answer:"]
+    assert base.stop == ["Final Answer:"]
@@ -0,0 +1,125 @@
+import threading
+import time
+import types
+from contextvars import ContextVar
+
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("httpx")
+
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.perf import current_caller, llm_caller
+from stock_research_crew.pipeline import Stage, StockPipeline
+from stock_research_crew.tokens import record_usage, track_tokens
+
+request_id: ContextVar[str] = ContextVar("request_id", default="")
+
+
+def _stage(name, depends_on, ttl_hours=1.0):
+    task = types.SimpleNamespace(description=f"{name} {{stock}}", expected_output="text", agent=None)
+    return Stage(name, task, ttl_hours, depends_on)
+
+
+def _diamond():
+    """research -> (analysis, risk) -> decision."""
+    return [
+        _stage("research", []),
+        _stage("analysis", ["research"]),
+        _stage("risk", ["research"]),
+        _stage("decision", ["analysis", "risk"], ttl_hours=2.0),
+    ]
+
+
+class StubPipeline(StockPipeline):
+    """Pipeline whose stages record when they run instead of calling an LLM."""
+
+    def __init__(self, stages, barrier=None):
+        super().__init__(stages)
+        self.barrier = barrier
+        self.events = []
+        self.contexts = {}
+        self._lock = threading.Lock()
+
+    def _run_stage(self, stage, stock, outputs):
+        with self._lock:
+            self.events.append(("start", stage.name))
+        assert set(outputs) >= set(stage.depends_on)
+        if self.barrier is not None and stage.name in ("analysis", "risk"):
+            # Both independent stages must be running at once to get past this
+            self.barrier.wait(5)
+        self.contexts[stage.name] = (request_id.get(), current_caller.get())
+        record_usage(stage.name, "stub", 10, 1, 0.0, False)
+        with self._lock:
+            self.events.append(("end", stage.name))
+        return f"{stage.name}({','.join(outputs[d] for d in stage.depends_on)})"
+
+    def ran(self):
+        return [name for event, name in self.events if event == "start"]
+
+
+def test_stages_run_after_their_dependencies():
+    pipeline = StubPipeline(_diamond(), barrier=threading.Barrier(2))
+
+    outputs, _ = pipeline.run("DAGA")
+
+    assert outputs["decision"] == "decision(analysis(research()),risk(research()))"
+    position = {event: i for i, event in enumerate(pipeline.events)}
+    for stage in pipeline.stages:
+        for dependency in stage.depends_on:
+            assert position[("end", dependency)] < position[("start", stage.name)]
+
+
+def test_cached_stages_are_reused():
+    first = StubPipeline(_diamond())
+    outputs, _ = first.run("DAGB")
+
+    second = StubPipeline(_diamond())
+    assert second.run("DAGB")[0] == outputs
+    assert second.ran() == []
+
+    forced = StubPipeline(_diamond())
+    forced.run("DAGB", force=True)
+    assert sorted(forced.ran()) == ["analysis", "decision", "research", "risk"]
+
+
+def test_a_miss_reruns_only_downstream_stages():
+    StubPipeline(_diamond()).run("DAGC")
+    cache_manager.save_task_result("DAGC", "analysis", "old analysis", ttl_hours=-1)
+
+    pipeline = StubPipeline(_diamond())
+    outputs, _ = pipeline.run("DAGC")
+
+    assert sorted(pipeline.ran()) == ["analysis", "decision"]
+    assert outputs["analysis"] == "analysis(research())"
+
+
+def test_expiry_is_capped_by_reused_stages():
+    StubPipeline(_diamond()).run("DAGD")
+    cache_manager.save_task_result("DAGD", "risk", "risk(research())", ttl_hours=0.1)
+
+    start = time.time()
+    _, expires_at = StubPipeline(_diamond()).run("DAGD")
+
+    assert expires_at == pytest.approx(start + 0.1 * 3600, abs=5)
+
+
+def test_stages_inherit_the_callers_context():
+    pipeline = StubPipeline(_diamond())
+    token = request_id.set("run-42")
+    try:
+        with track_tokens("DAGE") as usage, llm_caller("DAGE"):
+            pipeline.run("DAGE")
+    finally:
+        request_id.reset(token)
+
+    assert set(pipeline.contexts.values()) == {("run-42", "DAGE")}
+    assert usage.totals()["calls"] == 4
+    assert set(usage.by_caller()) == {"research", "analysis", "risk", "decision"}
+
+
+def test_unknown_dependency_is_rejected():
+    pipeline = StubPipeline([_stage("research", []), _stage("decision", ["research", "news"])])
+
+    with pytest.raises(ValueError, match="news"):
+        pipeline.run("DAGF")
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("httpx")
+
+from stock_research_crew.pipeline import PipelinePool, StockPipeline, clone_agents
+
+
+def test_concurrent_checkouts_get_separate_agents_and_tasks():
+    template = StockPipeline()
+    pool = PipelinePool(template, size=2)
+    checked_out = []
+    both = threading.Barrier(2)
+
+    def borrow():
+        with pool.checkout() as pipeline:
+            checked_out.append(pipeline)
+            both.wait(5)
+
+    threads = [threading.Thread(target=borrow) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first, second = checked_out
+    assert first is not second
+    assert pool.stats() == {"size": 2, "created": 2, "idle": 2}
+    for a, b, original in zip(first.stages, second.stages, template.stages):
+        assert a.name == b.name == original.name
+        assert a.agent is not b.agent
+        assert a.agent.role == b.agent.role == original.agent.role
+        # Same LLM wrapper (and so the same model) as the shared agent
+        assert a.agent.llm is b.agent.llm is original.agent.llm
+        task_a, task_b = a.build_task(), b.build_task()
+        assert task_a is not task_b
+        assert task_a.agent is a.agent
+        assert task_b.agent is b.agent
+
+
+def test_a_stage_agent_is_copied_once_per_pipeline():
+    template = StockPipeline()
+    pool = PipelinePool(template, size=2)
+    pool.ensure(2)
+
+    with pool.checkout() as first, pool.checkout() as second:
+        clone = first if first is not template else second
+        agents = {id(stage.agent) for stage in clone.stages}
+        originals = {id(stage.agent) for stage in template.stages}
+        assert len(agents) == len(originals)
+        assert not agents & originals
+
+
+def test_agent_copy_keeps_llm_and_tools():
+    template = StockPipeline()
+    agents = list({id(s.agent): s.agent for s in template.stages}.values())
+
+    clones = clone_agents(agents)
+
+    for agent in agents:
+        clone = clones[id(agent)]
+        assert clone is not agent
+        assert clone.llm is agent.llm
+        tools = getattr(agent, "tools", None) or []
+        assert [id(tool) for tool in getattr(clone, "tools", None) or []] == [id(tool) for tool in tools]
+        assert clone.role == agent.role
+        assert clone.goal == agent.goal
@@ -0,0 +1,50 @@
+import os
+
+from stock_research_crew.decision import InvestmentDecision
+from stock_research_crew.process_pool import analyze_in_processes
+from stock_research_crew.tokens import record_usage, track_tokens
+
+
+def stub_analyze(stock):
+    """Worker-side analysis reporting the limits its process was given."""
+    from stock_research_crew.limiter import llm_limiter, rate_limiter_for
+
+    record_usage(f"{stock} analyst", "stub", 100, 10, 0.5, False)
+    bucket = rate_limiter_for("stub")
+    return {
+        "stock": stock,
+        "result": f"report for {stock} " + "ü" * 1000,
+        "decision": InvestmentDecision(stock, 25, 20, 15, 20, 80, "BUY", "High", ["moat"]),
+        "pid": os.getpid(),
+        "limits": {"max": llm_limiter.max_limit, "rpm": bucket.rate * 60, "burst": bucket.burst}
+    }
+
+
+def failing_analyze(stock):
+    raise RuntimeError(f"analysis of {stock} failed")
+
+
+def test_workers_round_trip_results_and_share_limits(monkeypatch):
+    monkeypatch.setenv("LLM_CONCURRENCY_MAX", "8")
+    monkeypatch.setenv("LLM_RATE_LIMIT_RPM", "60")
+    monkeypatch.setenv("LLM_RATE_LIMIT_BURST", "4")
+    stocks = ["AAPL", "MSFT", "GOOGL", "AMZN"]
+
+    with track_tokens("portfolio") as usage:
+        results = {r["stock"]: r for r in analyze_in_processes(stocks, workers=2, analyze_fn=stub_analyze)}
+
+    assert set(results) == set(stocks)
+    for stock, result in results.items():
+        assert result["result"] == f"report for {stock} " + "ü" * 1000
+        assert result["decision"] == InvestmentDecision(stock, 25, 20, 15, 20, 80, "BUY", "High", ["moat"])
+        assert result["pid"] != os.getpid()
+        # Two workers split the host's 8 slots, 60 requests/minute and burst of 4
+        assert result["limits"] == {"max": 4, "rpm": 30.0, "burst": 2}
+    assert usage.totals()["calls"] == 4
+    assert usage.by_caller()["AAPL analyst"]["prompt_tokens"] == 100
+
+
+def test_worker_failure_is_reported_per_stock():
+    results = list(analyze_in_processes(["BAD"], workers=1, analyze_fn=failing_analyze))
+
+    assert results == [{"stock": "BAD", "result": None, "error": "analysis of BAD failed"}]
@@ -0,0 +1,47 @@
+import json
+import multiprocessing
+
+from stock_research_crew.profile_log import ProfileLog
+
+RECORDS_PER_PROCESS = 400
+
+
+def _append_records(path, writer):
+    log = ProfileLog(path, flush_interval=0.01, max_bytes=4096, backup_count=1000, max_buffer=16)
+    for i in range(RECORDS_PER_PROCESS):
+        log.append({"writer": writer, "seq": i, "padding": "x" * 40})
+        if i % 20 == 19:
+            log.flush()  # Many small appends, racing the other process's appends and rotations
+    log.close()
+
+
+def test_concurrent_processes_rotate_without_losing_or_mixing_lines(tmp_path):
+    path = tmp_path / "profile.jsonl"
+    context = multiprocessing.get_context("spawn")
+    writers = [context.Process(target=_append_records, args=(path, name)) for name in ("a", "b")]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    files = [p for p in [path] if p.exists()] + sorted(tmp_path.glob("profile.jsonl.[0-9]*"), key=lambda p: int(p.suffix[1:]))
+    assert len(files) > 2  # Rotated several times while both were writing
+    seen = {"a": [], "b": []}
+    for file in files:
+        for line in file.read_text(encoding="utf-8").splitlines():
+            record = json.loads(line)  # Interleaved writes would not parse
+            seen[record["writer"]].append(record["seq"])
+    for seqs in seen.values():
+        assert sorted(seqs) == list(range(RECORDS_PER_PROCESS))
+
+
+def test_iter_records_reads_backups_oldest_first(tmp_path):
+    log = ProfileLog(tmp_path / "profile.jsonl", flush_interval=60, max_bytes=100, backup_count=10)
+    for i in range(5):
+        log.append({"seq": i, "padding": "x" * 80})
+        log.flush()  # Every flush rotates past 100 bytes
+    log.append({"seq": 5})
+    log.close()
+    assert [record["seq"] for record in log.iter_records()] == list(range(6))
+    assert [record["seq"] for record in log.iter_records(include_rotated=False)] == [5]
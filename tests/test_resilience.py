@@ -0,0 +1,107 @@
+import types
+
+import pytest
+
+from stock_research_crew import resilience
+from stock_research_crew.resilience import CircuitBreaker, CircuitOpenError, backoff_delay, is_retryable
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manually advanced time for the breaker."""
+    now = [1000.0]
+    monkeypatch.setattr(resilience, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (TimeoutError(), True),
+    (ConnectionError(), True),
+    (_HTTPError(503), True),
+    (_HTTPError(429), True),
+    (_HTTPError(400), False),
+    (RateLimitError(), True),
+    (ValueError(), False),
+    (CircuitOpenError(), False),
+])
+def test_is_retryable(exc, expected):
+    assert is_retryable(exc) is expected
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=1.0, cap=5.0) <= min(5.0, 2 ** attempt)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("m", failure_threshold=2, recovery_timeout=30)
+    breaker.allow()
+    breaker.record_failure()
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("m", failure_threshold=2, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_admits_one_probe(clock):
+    breaker = CircuitBreaker("m", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker("m", failure_threshold=3, recovery_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 31
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_released_probe_lets_the_next_call_probe(clock):
+    breaker = CircuitBreaker("m", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    breaker.allow()
+    breaker.release()  # Cancelled without an outcome
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_abandoned_probe_is_replaced_after_recovery_timeout(clock):
+    breaker = CircuitBreaker("m", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    breaker.allow()
+    clock[0] += 31
+    breaker.allow()
+    assert breaker.stats()["rejected"] == 0
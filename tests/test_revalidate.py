@@ -0,0 +1,75 @@
+import threading
+import time
+
+from stock_research_crew.cache import cache_manager
+from stock_research_crew.revalidate import Revalidator
+
+
+def _save_stale(stock, result="old report"):
+    cache_manager.save_result(stock, result, ttl_hours=-1)  # Expired an hour ago, within the grace period
+
+
+def test_stale_hit_returns_before_the_refresh_finishes():
+    _save_stale("STALEA")
+    release = threading.Event()
+
+    def refresh(stock):
+        release.wait(5)
+        cache_manager.save_result(stock, "new report")
+        return "new report"
+
+    revalidator = Revalidator(max_workers=2)
+    start = time.monotonic()
+    entry = revalidator.lookup("STALEA", refresh, allow_stale=True)
+    assert time.monotonic() - start < 1
+    assert entry["result"] == "old report"
+    assert entry["stale"]
+    assert revalidator.pending() == 1
+
+    release.set()
+    revalidator.wait(timeout=5)
+    entry = revalidator.lookup("STALEA", refresh, allow_stale=True)
+    assert entry["result"] == "new report"
+    assert not entry["stale"]
+
+
+def test_one_refresh_per_stock_at_a_time():
+    _save_stale("STALEB")
+    release = threading.Event()
+    calls = []
+
+    def refresh(stock):
+        calls.append(stock)
+        release.wait(5)
+        return "new report"
+
+    revalidator = Revalidator(max_workers=4)
+    for _ in range(5):
+        revalidator.lookup("STALEB", refresh, allow_stale=True)
+    release.set()
+    revalidator.wait(timeout=5)
+    assert calls == ["STALEB"]
+
+
+def test_failed_refresh_keeps_the_stale_report():
+    _save_stale("STALEC")
+
+    def refresh(stock):
+        raise RuntimeError("backend down")
+
+    revalidator = Revalidator()
+    future = revalidator.refresh("STALEC", refresh)
+    assert future.result(timeout=5) is None
+    entry = revalidator.lookup("STALEC", refresh, allow_stale=True, refresh=False)
+    assert entry["result"] == "old report"
+    assert entry["stale"]
+    assert revalidator.pending() == 0
+
+
+def test_stale_reports_need_opt_in_and_refresh_can_be_skipped():
+    _save_stale("STALED")
+    calls = []
+    revalidator = Revalidator()
+    assert revalidator.lookup("STALED", calls.append, allow_stale=False) is None
+    assert revalidator.lookup("STALED", calls.append, allow_stale=True, refresh=False)["stale"]
+    assert calls == [] and revalidator.pending() == 0
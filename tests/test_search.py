@@ -0,0 +1,89 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from stock_research_crew.search import create_web_search, normalize_query
+from stock_research_crew.tokens import track_tokens
+from config import Config
+
+
+@pytest.mark.parametrize("query, key", [
+    ("AAPL  Competitors", "aapl competitors"),
+    ("Apple competitors", "aapl competitors"),
+    ("Apple Inc. competitors?", "aapl competitors"),
+    ("apple vs microsoft corporation", "aapl vs msft"),
+    ("Microsoft vs Apple", "msft vs aapl"),
+    ("General Motors EV plans", "gm ev plans"),
+])
+def test_normalize_query(query, key):
+    assert normalize_query(query) == key
+
+
+@pytest.fixture
+def serper(monkeypatch):
+    """Local stand-in for the Serper API; records every query it receives."""
+    queries = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            queries.append(body["q"])
+            payload = json.dumps({"organic": [{"title": body["q"], "link": "http://example.test",
+                                               "snippet": "result"}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(Config, "SERPER_API_KEY", "test-key")
+    monkeypatch.setattr(Config, "SERPER_URL", f"http://127.0.0.1:{server.server_port}/search")
+    yield queries
+    server.shutdown()
+    server.server_close()
+
+
+def test_duplicate_and_alias_queries_hit_the_backend_once(serper):
+    search = create_web_search()
+
+    with track_tokens("AAPL"):
+        first = search.search("Apple supplier risks")
+        assert search.search("apple  supplier risks") == first
+        assert search.search("AAPL supplier risks") == first
+        assert search.search("Apple Inc. supplier risks") == first
+        search.search("supplier risks Apple")
+
+    assert serper == ["Apple supplier risks", "supplier risks Apple"]
+    stats = search.stats()
+    assert stats["network"] == 2
+    assert stats["memo"] == 3
+
+
+def test_memo_is_scoped_to_a_run(serper):
+    search = create_web_search()
+
+    with track_tokens("portfolio"):
+        with track_tokens("MSFT"):
+            search.search("Microsoft cloud margins")
+        with track_tokens("GOOGL"):
+            # Same outer run: answered from its memo
+            search.search("MSFT cloud margins")
+    with track_tokens("MSFT"):
+        # A new run starts without a memo and reads the stored result
+        search.search("Microsoft cloud margins")
+    # Outside any run nothing is memoized
+    search.search("Microsoft cloud margins")
+
+    assert serper == ["Microsoft cloud margins"]
+    stats = search.stats()
+    assert (stats["network"], stats["memo"], stats["cache"]) == (1, 1, 2)
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from stock_research_crew.singleflight import SingleFlight
+
+CALLERS = 8
+
+
+def _gated(fn):
+    """fn held until every caller has joined, so they all overlap one call."""
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return fn()
+
+    return call, release, calls
+
+
+def _run_concurrently(flight, call, release):
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        futures = [pool.submit(flight.do, "AAPL", call, "AAPL") for _ in range(CALLERS)]
+        while flight.stats()["coalesced"] < CALLERS - 1:
+            time.sleep(0.01)
+        release.set()
+    return futures
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    result = object()
+    call, release, calls = _gated(lambda: result)
+
+    futures = _run_concurrently(flight, call, release)
+
+    assert len(calls) == 1
+    assert all(f.result() is result for f in futures)
+    assert flight.stats() == {"calls": 1, "coalesced": CALLERS - 1, "inflight": 0}
+
+
+def test_concurrent_callers_all_receive_the_exception():
+    flight = SingleFlight("test")
+    error = RuntimeError("analysis failed")
+
+    def fail():
+        raise error
+
+    call, release, calls = _gated(fail)
+
+    futures = _run_concurrently(flight, call, release)
+
+    assert len(calls) == 1
+    for future in futures:
+        with pytest.raises(RuntimeError) as info:
+            future.result()
+        assert info.value is error
+
+
+def test_key_is_released_after_call():
+    flight = SingleFlight("test")
+
+    assert flight.do("AAPL", lambda: 1) == 1
+    assert flight.do("AAPL", lambda: 2) == 2
+    assert flight.stats() == {"calls": 2, "coalesced": 0, "inflight": 0}
+
+
+def test_async_callers_join_threaded_call():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "report"
+
+    async def fail_if_called():
+        raise AssertionError("async caller should have joined the threaded call")
+
+    async def main():
+        leader = asyncio.get_running_loop().run_in_executor(None, flight.do, "AAPL", call)
+        while flight.stats()["inflight"] == 0:
+            await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("AAPL", fail_if_called))
+        while flight.stats()["coalesced"] == 0:
+            await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(leader, follower)
+
+    assert asyncio.run(main()) == ["report", "report"]
+    assert len(calls) == 1
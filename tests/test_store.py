@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+from stock_research_crew.store import SQLiteStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(tmp_path / "cache.db", sweep_interval=0)
+    yield store
+    store.close()
+
+
+def test_put_is_readable_before_and_after_flush(store):
+    store.put("final", "AAPL", "report", {"decision": "BUY"})
+    assert store.get("final", "AAPL")["value"] == "report"
+    assert store.flush()
+    entry = store.get("final", "AAPL")
+    assert entry["value"] == "report"
+    assert entry["meta"] == {"decision": "BUY"}
+
+
+def test_entries_survive_reopening(tmp_path):
+    store = SQLiteStore(tmp_path / "cache.db", sweep_interval=0)
+    store.put("final", "AAPL", "report")
+    store.close()
+    reopened = SQLiteStore(tmp_path / "cache.db", sweep_interval=0)
+    try:
+        assert reopened.get("final", "AAPL")["value"] == "report"
+    finally:
+        reopened.close()
+
+
+def test_identical_values_share_one_blob(store):
+    store.put_many("prompts", [("a", "same text", None, None), ("b", "same text", None, None)])
+    store.flush()
+    stats = store.stats()
+    assert stats["entries"] == 2
+    assert stats["blobs"] == 1
+
+
+def test_ttl_and_grace_set_expiry_and_purge(store):
+    store.put("search", "q", "results", saved_at=1000.0, ttl=60, grace=30)
+    entry = store.get("search", "q")
+    assert entry["expires_at"] == 1060.0
+    assert entry["purge_at"] == 1090.0
+
+
+def test_delete_expired_only_removes_entries_past_purge(store):
+    now = time.time()
+    store.put("search", "old", "x", saved_at=now - 100, ttl=10)
+    store.put("search", "new", "y", saved_at=now, ttl=10)
+    assert store.delete_expired(now=now) == {"search": 1}
+    assert store.get("search", "old") is None
+    assert store.get("search", "new") is not None
+
+
+def test_items_and_delete_cover_queued_writes(store):
+    store.put("docs", "a.txt", "1")
+    store.put("docs", "b.txt", "2")
+    store.put("final", "AAPL", "report")
+    assert dict((key, entry["value"]) for key, entry in store.items("docs")) == {"a.txt": "1", "b.txt": "2"}
+
+    store.put("docs", "a.txt", "3")  # Still queued when deleted
+    assert store.delete("docs", ["a.txt", "missing.txt"]) == 1
+    store.flush()
+    assert store.get("docs", "a.txt") is None
+    assert [key for key, _ in store.items("docs")] == ["b.txt"]
+
+
+def test_budget_evicts_least_recently_used(tmp_path):
+    store = SQLiteStore(tmp_path / "cache.db", sweep_interval=0, max_bytes=10 ** 9, hot_max_bytes=0)
+    try:
+        # Eviction deletes in batches of 32, so use enough entries to keep some
+        for i in range(100):
+            store.put("prompts", f"k{i}", f"value {i} " * 50)
+        store.flush()
+        store.get("prompts", "k0")  # Most recently used from now on
+        store.flush()
+        store.max_bytes = store.total_bytes() // 2
+        assert store.enforce_budget() > 0
+        assert store.total_bytes() <= store.max_bytes
+        assert store.get("prompts", "k0") is not None
+        assert store.get("prompts", "k1") is None
+    finally:
+        store.close()
+
+
+def test_budget_never_evicts_pinned_namespaces(tmp_path):
+    store = SQLiteStore(tmp_path / "cache.db", sweep_interval=0, max_bytes=10 ** 9, hot_max_bytes=0,
+                        pinned_namespaces=("docs",))
+    try:
+        # Documents are the least recently used entries
+        for i in range(50):
+            store.put("docs", f"doc{i}.txt", f"passage {i} " * 50, ttl=float("inf"))
+        store.flush()
+        for i in range(50):
+            store.put("prompts", f"k{i}", f"value {i} " * 50)
+        store.flush()
+        store.max_bytes = store.total_bytes() // 4
+        assert store.enforce_budget() == 50
+        assert len(list(store.items("docs"))) == 50
+        assert store.get("prompts", "k49") is None
+    finally:
+        store.close()
+
+
+def test_unknown_eviction_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SQLiteStore(tmp_path / "cache.db", eviction_policy="fifo")
+
+
+def test_hot_tier_sees_writes_from_other_connections(tmp_path):
+    writer = SQLiteStore(tmp_path / "cache.db", sweep_interval=0)
+    reader = SQLiteStore(tmp_path / "cache.db", sweep_interval=0)
+    try:
+        writer.put("final", "AAPL", "old report")
+        writer.put("docs", "a.txt", "passages")
+        writer.flush()
+        assert reader.get("final", "AAPL")["value"] == "old report"
+        assert reader.get("docs", "a.txt") is not None
+        assert reader.stats()["hot_entries"] == 2
+
+        writer.put("final", "AAPL", "new report")
+        writer.flush()
+        writer.delete("docs", ["a.txt"])
+        assert reader.get("final", "AAPL")["value"] == "new report"
+        assert reader.get("docs", "a.txt") is None
+    finally:
+        writer.close()
+        reader.close()
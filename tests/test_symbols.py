@@ -0,0 +1,66 @@
+import pytest
+
+from stock_research_crew.symbols import SymbolIndex, normalize_name, normalize_ticker
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "symbols.csv"
+    path.write_text(
+        "symbol,name,aliases\n"
+        "AAPL,Apple Inc.,Apple\n"
+        "MSFT,Microsoft Corporation,Microsoft\n"
+        "NVDA,NVIDIA Corporation,Nvidia\n"
+        "GOOGL,Alphabet Inc. Class A,Alphabet|Google|GOOG\n"
+        "BRK-B,Berkshire Hathaway Inc. Class B,Berkshire\n"
+        "HD,The Home Depot Inc.,Home Depot\n"
+        "WMT,Walmart Inc.,Walmart\n",
+        encoding="utf-8"
+    )
+    return SymbolIndex(path)
+
+
+def test_normalization():
+    assert normalize_ticker(" brk-b ") == "BRK.B"
+    assert normalize_name("Apple Inc.") == "APPLE"
+    assert normalize_name("AT&T Inc") == "AT AND T"
+
+
+@pytest.mark.parametrize("query, symbol", [
+    ("AAPL", "AAPL"),
+    ("aapl ", "AAPL"),
+    ("apple", "AAPL"),
+    ("Apple Inc", "AAPL"),
+    ("google", "GOOGL"),
+    ("GOOG", "GOOGL"),
+    ("brk/b", "BRK.B"),
+    ("the home depot", "HD"),
+])
+def test_exact_lookups(index, query, symbol):
+    assert index.lookup(query) == symbol
+
+
+def test_partial_and_misspelled_names(index):
+    assert index.lookup("micros") == "MSFT"
+    assert index.lookup("nvidai") == "NVDA"
+
+
+@pytest.mark.parametrize("query", ["HOME", "WALM", "micr", "ZZZZ"])
+def test_ticker_shaped_input_is_not_approximated(index, query):
+    assert index.lookup(query) is None
+
+
+def test_resolve_falls_back_to_the_ticker_form(index):
+    assert index.resolve("apple") == "AAPL"
+    assert index.resolve("zz-z") == "ZZ.Z"
+
+
+def test_suggest_by_prefix(index):
+    assert index.suggest("ber") == [("BRK.B", "Berkshire Hathaway Inc. Class B")]
+    assert index.suggest("") == []
+
+
+def test_missing_master_resolves_nothing(tmp_path):
+    index = SymbolIndex(tmp_path / "missing.csv")
+    assert index.lookup("apple") is None
+    assert index.resolve("aapl") == "AAPL"
@@ -0,0 +1,118 @@
+import contextvars
+import threading
+import types
+
+import pytest
+
+from stock_research_crew.tokens import (
+    backend_usage, current_usage, estimate_tokens, format_usage, merge_usage, record_usage, track_tokens
+)
+
+
+def test_backend_usage_formats():
+    assert backend_usage({"usage": {"prompt_tokens": 3, "completion_tokens": 4}}) == \
+        {"prompt_tokens": 3, "completion_tokens": 4}
+    assert backend_usage(types.SimpleNamespace(usage=types.SimpleNamespace(prompt_tokens=5, completion_tokens=None))) == \
+        {"prompt_tokens": 5, "completion_tokens": 0}
+    assert backend_usage({"prompt_eval_count": 7, "eval_count": 2}) == \
+        {"prompt_tokens": 7, "completion_tokens": 2}
+    assert backend_usage("plain text") is None
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Apple reported record revenue.") > 0
+
+
+def test_usage_outside_a_run_is_dropped():
+    assert current_usage.get() is None
+    record_usage("agent", "model", 10, 5, 1.0, False)
+
+
+def test_nested_runs_add_to_the_enclosing_run():
+    with track_tokens("portfolio") as outer:
+        record_usage("manager", "big", 10, 5, 1.0, False)
+        with track_tokens("AAPL") as inner:
+            record_usage("analyst", "small", 3, 2, 0.5, True)
+        assert current_usage.get() is outer
+
+    assert inner.totals()["total_tokens"] == 5
+    totals = outer.totals()
+    assert totals["calls"] == 2
+    assert totals["prompt_tokens"] == 13
+    assert totals["completion_tokens"] == 7
+    assert totals["estimated_calls"] == 1
+    assert set(outer.by_caller()) == {"manager", "analyst"}
+    assert outer.by_model()["small"]["calls"] == 1
+
+
+def test_concurrent_runs_are_kept_apart():
+    runs = {}
+    barrier = threading.Barrier(2)
+
+    def analyze(stock, tokens):
+        with track_tokens(stock) as usage:
+            barrier.wait(5)
+            for _ in range(100):
+                record_usage(f"{stock} analyst", "model", tokens, 1, 0.0, False)
+            runs[stock] = usage
+
+    with track_tokens("portfolio") as portfolio:
+        threads = [
+            threading.Thread(target=contextvars.copy_context().run, args=(analyze, stock, tokens))
+            for stock, tokens in (("AAPL", 1), ("MSFT", 2))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert runs["AAPL"].totals()["prompt_tokens"] == 100
+    assert list(runs["AAPL"].by_caller()) == ["AAPL analyst"]
+    assert runs["MSFT"].totals()["prompt_tokens"] == 200
+    assert portfolio.totals()["prompt_tokens"] == 300
+    assert portfolio.totals()["calls"] == 200
+
+
+def test_merge_adds_a_worker_summary():
+    with track_tokens("AAPL") as worker:
+        record_usage("analyst", "model", 4, 6, 2.0, False)
+    summary = worker.summary()
+
+    with track_tokens("portfolio") as portfolio:
+        merge_usage(summary)
+        merge_usage(summary)
+
+    assert portfolio.totals()["total_tokens"] == 20
+    assert portfolio.by_caller()["analyst"]["calls"] == 2
+
+
+def test_timing_llm_records_tokens_in_the_current_run():
+    pytest.importorskip("httpx")
+    from stock_research_crew.perf import TimingLLM, llm_caller
+
+    def reply(prompt, **kwargs):
+        return {"response": "ok", "prompt_eval_count": 12, "eval_count": 3}
+
+    llm = TimingLLM(reply, model_name="stub")
+    with track_tokens("AAPL") as usage, llm_caller("AAPL research: analyst"):
+        llm("prompt")
+        llm("prompt")
+
+    row = usage.by_caller()["AAPL research: analyst"]
+    assert row["calls"] == 2
+    assert row["prompt_tokens"] == 24
+    assert row["completion_tokens"] == 6
+    assert row["estimated_calls"] == 0
+
+
+def test_format_usage_breaks_down_by_model():
+    with track_tokens("AAPL") as usage:
+        record_usage("researcher", "ollama/small", 100, 10, 2.0, False)
+        record_usage("advisor", "ollama/big", 300, 30, 6.0, False)
+
+    text = format_usage(usage)
+
+    assert "400 prompt + 40 completion in 2 LLM calls" in text
+    assert "ollama/small: 1 calls, avg 2.0s, 110 tokens" in text
+    assert "ollama/big: 1 calls, avg 6.0s, 330 tokens" in text
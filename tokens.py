@@ -0,0 +1,175 @@
+"""Token counting for LLM calls and per-run token totals by agent/task."""
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # Optional; fall back to a word/punctuation count
+    _encoding = None
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def prompt_text(prompt: Any) -> str:
+    """Plain text of a prompt string or a list of chat messages."""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(
+            str(m.get("content", "")) if isinstance(m, dict) else str(m) for m in prompt
+        )
+    return str(prompt)
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate: tiktoken when installed, else words and punctuation."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # BPE tokenizers split long words; about 1.3 tokens per word in English prose
+    return int(len(_TOKEN_RE.findall(text)) * 1.3) + 1
+
+
+def backend_usage(result: Any) -> Optional[Dict[str, int]]:
+    """Prompt/completion token counts reported by the backend, if the result carries them.
+
+    Understands OpenAI/LiteLLM style ``usage`` (attribute or key) and
+    Ollama's ``prompt_eval_count``/``eval_count`` fields.
+    """
+    usage = result.get("usage") if isinstance(result, dict) else getattr(result, "usage", None)
+    if usage is not None:
+        get = usage.get if isinstance(usage, dict) else lambda k: getattr(usage, k, None)
+        prompt, completion = get("prompt_tokens"), get("completion_tokens")
+        if prompt is not None or completion is not None:
+            return {"prompt_tokens": prompt or 0, "completion_tokens": completion or 0}
+    if isinstance(result, dict) and ("eval_count" in result or "prompt_eval_count" in result):
+        return {
+            "prompt_tokens": result.get("prompt_eval_count") or 0,
+            "completion_tokens": result.get("eval_count") or 0
+        }
+    return None
+
+
+def _empty_row() -> Dict[str, float]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "duration_s": 0.0, "estimated_calls": 0}
+
+
+class TokenUsage:
+    """Thread-safe token totals for one run, broken down by caller (agent/task) and model.
+
+    Usage recorded inside a nested run is added to the enclosing runs too.
+    """
+
+    def __init__(self, name: str, parent: Optional["TokenUsage"] = None):
+        self.name = name
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._by_caller: Dict[str, Dict[str, float]] = {}
+        self._by_model: Dict[str, Dict[str, float]] = {}
+
+    def add(self, caller: Optional[str], model: Optional[str], prompt_tokens: int,
+            completion_tokens: int, duration: float, estimated: bool):
+        with self._lock:
+            for row in (self._by_caller.setdefault(caller or "unknown", _empty_row()),
+                        self._by_model.setdefault(model or "unknown", _empty_row())):
+                row["calls"] += 1
+                row["prompt_tokens"] += prompt_tokens
+                row["completion_tokens"] += completion_tokens
+                row["duration_s"] += duration
+                row["estimated_calls"] += int(estimated)
+        if self.parent is not None:
+            self.parent.add(caller, model, prompt_tokens, completion_tokens, duration, estimated)
+
+    def merge(self, summary: Dict[str, Any]):
+        """Add the rows of another run's summary(), e.g. one from a worker process."""
+        with self._lock:
+            for rows, target in ((summary.get("by_caller", {}), self._by_caller),
+                                 (summary.get("by_model", {}), self._by_model)):
+                for name, row in rows.items():
+                    totals = target.setdefault(name, _empty_row())
+                    for key in totals:
+                        totals[key] += row.get(key, 0)
+        if self.parent is not None:
+            self.parent.merge(summary)
+
+    def by_caller(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {caller: dict(row) for caller, row in self._by_caller.items()}
+
+    def by_model(self) -> Dict[str, Dict[str, float]]:
+        """Per-model totals, to compare the latency and token cost of each tier."""
+        with self._lock:
+            return {model: dict(row) for model, row in self._by_model.items()}
+
+    def totals(self) -> Dict[str, float]:
+        totals = _empty_row()
+        for row in self.by_caller().values():
+            for key in totals:
+                totals[key] += row[key]
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        totals["duration_s"] = round(totals["duration_s"], 3)
+        return totals
+
+    def summary(self) -> Dict[str, Any]:
+        by_caller, by_model = self.by_caller(), self.by_model()
+        for row in list(by_caller.values()) + list(by_model.values()):
+            row["duration_s"] = round(row["duration_s"], 3)
+        return {"run": self.name, "totals": self.totals(), "by_caller": by_caller, "by_model": by_model}
+
+
+current_usage: ContextVar[Optional[TokenUsage]] = ContextVar("token_usage", default=None)
+
+
+@contextmanager
+def track_tokens(name: str) -> Iterator[TokenUsage]:
+    """Collect token usage of LLM calls made inside the block (and nested runs)."""
+    usage = TokenUsage(name, parent=current_usage.get())
+    token = current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        current_usage.reset(token)
+
+
+def record_usage(caller: Optional[str], model: Optional[str], prompt_tokens: int,
+                 completion_tokens: int, duration: float, estimated: bool):
+    """Add one call's tokens to the current run, if any."""
+    usage = current_usage.get()
+    if usage is not None:
+        usage.add(caller, model, prompt_tokens, completion_tokens, duration, estimated)
+
+
+def merge_usage(summary: Dict[str, Any]):
+    """Add a finished run's summary() to the current run, if any."""
+    usage = current_usage.get()
+    if usage is not None:
+        usage.merge(summary)
+
+
+def format_usage(usage: TokenUsage) -> str:
+    """Human-readable token table for the console."""
+    totals = usage.totals()
+    lines = [f"  Tokens: {totals['prompt_tokens']:,} prompt + {totals['completion_tokens']:,} completion "
+             f"in {totals['calls']} LLM calls"]
+    if totals["estimated_calls"]:
+        lines[0] += f" ({totals['estimated_calls']} estimated)"
+    rows = sorted(usage.by_caller().items(), key=lambda kv: -kv[1]["prompt_tokens"])
+    for caller, row in rows:
+        lines.append(f"    {caller}: {row['prompt_tokens']:,} prompt / {row['completion_tokens']:,} "
+                     f"completion, {row['calls']} calls, {row['duration_s']:.1f}s")
+    by_model = usage.by_model()
+    if len(by_model) > 1:
+        lines.append("  By model:")
+        for model, row in sorted(by_model.items()):
+            avg = row["duration_s"] / row["calls"] if row["calls"] else 0
+            lines.append(f"    {model}: {row['calls']} calls, avg {avg:.1f}s, "
+                         f"{row['prompt_tokens'] + row['completion_tokens']:,} tokens")
+    return "\n".join(lines)
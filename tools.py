@@ -0,0 +1,52 @@
+"""CrewAI tools: local market data, local documents and cached web search."""
+from crewai.tools import BaseTool
+from stock_research_crew.marketdata import market_store
+from stock_research_crew.search import web_search
+from stock_research_crew.docsearch import document_index
+from stock_research_crew.symbols import resolve_symbol
+
+
+class MarketDataTool(BaseTool):
+    """Price-history indicators and fundamentals from the local market-data store."""
+
+    name: str = "Market Data"
+    description: str = (
+        "Look up local price history for a stock ticker: returns (1M/3M/6M/1Y), annualized "
+        "volatility, max and current drawdown, 52-week range, 50/200-day moving averages "
+        "and fundamentals. Input: the ticker symbol, e.g. AAPL."
+    )
+
+    def _run(self, symbol: str) -> str:
+        return market_store.describe(resolve_symbol(symbol.strip()))
+
+
+class CachedSearchTool(BaseTool):
+    """Web search through the cached, deduplicating Serper client."""
+
+    name: str = "Search the internet"
+    description: str = (
+        "Search the internet for company news, competitors and developments. "
+        "Input: a search query, e.g. 'AAPL competitors'."
+    )
+
+    def _run(self, search_query: str) -> str:
+        return web_search.search(search_query)
+
+
+class LocalSearchTool(BaseTool):
+    """BM25 search over the local filings, transcripts and news in DOCS_DIR."""
+
+    name: str = "Search local documents"
+    description: str = (
+        "Search locally stored filings, earnings call transcripts and news articles. "
+        "Returns the best matching passages with their source file. "
+        "Input: a search query, e.g. 'AAPL services revenue growth'."
+    )
+
+    def _run(self, search_query: str) -> str:
+        return document_index.format_results(search_query)
+
+
+market_data_tool = MarketDataTool()
+local_search_tool = LocalSearchTool()
+search_tool = CachedSearchTool() if web_search else None